@@ -0,0 +1,234 @@
+"""Benchmark fixtures and baseline comparison.
+
+Run from `backend/`:
+
+    python -m pytest benchmarks                        # 10k catalog
+    BENCH_SIZE=100k python -m pytest benchmarks        # 10k | 100k | 1m
+    BENCH_UPDATE_BASELINE=1 python -m pytest benchmarks
+
+Generated catalogs are cached under `benchmarks/.data/` and copied per run,
+so scenarios that write (checkout) never change the cached database. Each
+scenario's latency percentiles and queries per request are compared with
+`baseline.json`: more (rounded) queries per request than the baseline, or a median
+(p50) above `BENCH_TOLERANCE` (default 2.0) times the baseline median, fails the
+scenario. A scenario whose median looks too slow is measured for more rounds before
+failing, so a burst of machine load does not fail the run. p95 and p99 are reported but
+not gated: over 30 rounds they are one or two samples. A scenario without a baseline
+for the selected size fails; record one with BENCH_UPDATE_BASELINE=1.
+"""
+import json
+import os
+import shutil
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.api.v1.routes.router import api_v1_router
+from src.core.database import Base, create_db_engine, ensure_indexes, get_db
+from src.core.metrics import MetricsMiddleware
+from src.services.catalog_generator import CatalogSize, generate_catalog
+
+BENCH_DIR = Path(__file__).parent
+DATA_DIR = BENCH_DIR / ".data"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+# Part of the cached catalog's file name: bump it whenever the catalog generator's output changes
+# (2: units_sold recount, 3: daily sales rollups)
+GENERATOR_VERSION = 3
+
+SIZES = {
+    "10k": CatalogSize(books=10_000, orders=10_000, authors=1_000, genres=40, publishers=100),
+    "100k": CatalogSize(books=100_000, orders=100_000, authors=10_000, genres=60, publishers=500),
+    "1m": CatalogSize(books=1_000_000, orders=1_000_000, authors=50_000, genres=80, publishers=2_000),
+}
+
+SIZE_NAME = os.getenv("BENCH_SIZE", "10k").lower()
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "2.0"))
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE") == "1"
+# A scenario slower than the baseline is re-measured up to this many times its rounds in all
+MAX_ROUND_SETS = 3
+
+results: dict[str, dict] = {}
+reports: dict[str, dict] = {}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@pytest.fixture(scope="session")
+def catalog_path(tmp_path_factory) -> Path:
+    """A private copy of the cached synthetic catalog for this run"""
+    if SIZE_NAME not in SIZES:
+        pytest.exit(f"BENCH_SIZE must be one of {', '.join(SIZES)}", returncode=2)
+
+    cached = DATA_DIR / f"catalog-{SIZE_NAME}-v{GENERATOR_VERSION}.db"
+    if not cached.exists():
+        DATA_DIR.mkdir(exist_ok=True)
+        partial = cached.with_suffix(".tmp")
+        partial.unlink(missing_ok=True)
+        engine = create_engine(f"sqlite:///{partial}")
+        Base.metadata.create_all(bind=engine)
+        generate_catalog(engine, SIZES[SIZE_NAME])
+        engine.dispose()
+        partial.rename(cached)
+
+    path = tmp_path_factory.mktemp("catalog") / "bookstore.db"
+    shutil.copyfile(cached, path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def catalog_engine(catalog_path):
+    # Pooled as configured for the application (DB_POOL_SIZE etc.)
+    engine = create_db_engine(f"sqlite:///{catalog_path}")
+    # Bring a cached catalog up to the current schema (new tables, indexes, triggers)
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def statement_counter(catalog_engine):
+    """Running count of statements executed on the catalog engine"""
+    counter = {"statements": 0}
+
+    @event.listens_for(catalog_engine, "after_cursor_execute")
+    def count(*args):
+        counter["statements"] += 1
+
+    return counter
+
+
+@pytest.fixture(scope="session")
+def client(catalog_engine):
+    """Test client for the v1 API backed by the synthetic catalog"""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(api_v1_router, prefix="/api/v1")
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=catalog_engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def bench(statement_counter):
+    """Time a callable like pytest-benchmark and check it against the baseline.
+
+    `bench(name, fn, rounds=..., warmup=...)` calls `fn` (which must issue one
+    request and return the response) `warmup + rounds` times and records
+    latency percentiles and statements per request for the last `rounds`,
+    up to `MAX_ROUND_SETS` times as many if the median exceeds the baseline's.
+    """
+
+    def measure(fn, rounds: int, latencies: list, queries: list) -> None:
+        for _ in range(rounds):
+            before = statement_counter["statements"]
+            start = time.perf_counter()
+            response = fn()
+            latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(statement_counter["statements"] - before)
+            assert response.status_code < 400, response.text
+
+    def run(name: str, fn, rounds: int = 30, warmup: int = 3) -> dict:
+        for _ in range(warmup):
+            fn()
+        baseline = _load_baseline().get(SIZE_NAME, {}).get(name)
+        # Without a baseline nothing could regress, so a scenario must record one first
+        assert baseline or UPDATE_BASELINE, (
+            f"{name}: no {SIZE_NAME} baseline, record one with BENCH_UPDATE_BASELINE=1 BENCH_SIZE={SIZE_NAME}"
+        )
+        latencies, queries = [], []
+        measure(fn, rounds, latencies, queries)
+        if not UPDATE_BASELINE:
+            while (
+                percentile(latencies, 50) > baseline["p50_ms"] * TOLERANCE
+                and len(latencies) < rounds * MAX_ROUND_SETS
+            ):
+                measure(fn, rounds, latencies, queries)
+
+        result = {
+            "rounds": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+            "queries_per_request": round(statistics.fmean(queries), 2),
+            "max_queries": max(queries),
+        }
+        results[name] = result
+
+        if not UPDATE_BASELINE:
+            # Rounded, so the catalog snapshot's once-a-second sync poll landing in a run is not a regression
+            assert round(result["queries_per_request"]) <= round(baseline["queries_per_request"]), (
+                f"{name}: {result['queries_per_request']} queries per request, "
+                f"baseline {baseline['queries_per_request']}"
+            )
+            assert result["p50_ms"] <= baseline["p50_ms"] * TOLERANCE, (
+                f"{name}: p50 {result['p50_ms']}ms exceeds {TOLERANCE}x baseline {baseline['p50_ms']}ms"
+            )
+        return result
+
+    return run
+
+
+@pytest.fixture
+def report():
+    """Record non-latency measurements (e.g. memory) for the summary and results file"""
+
+    def run(name: str, values: dict) -> None:
+        reports[name] = values
+
+    return run
+
+
+def _load_baseline() -> dict:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results and not reports:
+        return
+    terminalreporter.section(f"benchmarks ({SIZE_NAME})")
+    terminalreporter.write_line(
+        f"{'scenario':<44}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}"
+    )
+    for name, result in sorted(results.items()):
+        terminalreporter.write_line(
+            f"{name:<44}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['queries_per_request']:>10.2f}"
+        )
+
+    for name, values in sorted(reports.items()):
+        terminalreporter.write_line(f"{name}: " + ", ".join(f"{key}={value}" for key, value in values.items()))
+
+    DATA_DIR.mkdir(exist_ok=True)
+    (DATA_DIR / f"results-{SIZE_NAME}.json").write_text(
+        json.dumps({**results, **reports}, indent=2, sort_keys=True)
+    )
+
+    if UPDATE_BASELINE:
+        baseline = _load_baseline()
+        baseline.setdefault(SIZE_NAME, {}).update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        terminalreporter.write_line(f"baseline updated: {BASELINE_PATH}")
@@ -0,0 +1,386 @@
+"""Catalog, checkout and dashboard benchmarks"""
+import asyncio
+import itertools
+import time
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from benchmarks.conftest import percentile
+from src.api.v1.endpoints import orders as orders_endpoints
+from src.core.config import settings
+from src.services.also_bought import rebuild_co_purchases
+from src.services.catalog_generator import ADJECTIVES, FIRST_NAMES, LAST_NAMES, NOUNS
+from src.services.catalog_snapshot import catalog_snapshot
+from src.services.jobs import wait_for_job
+from src.services.order_archive import archive_orders
+from src.services.suggest import MEMORY_BUDGET_PER_100K, suggest_index
+
+SORTED_LISTINGS = {
+    "price_asc": "/api/v1/books/?sort=price_asc&page=20",
+    "title_genre": "/api/v1/books/?sort=title&genre_ids=3",
+    "newest_price_range": "/api/v1/books/?sort=newest&min_price=10&max_price=30",
+    "bestselling_genre": "/api/v1/books/?sort=bestselling&genre_ids=3",
+}
+
+
+def test_list_books_first_page(client, bench):
+    bench("list_books_first_page", lambda: client.get("/api/v1/books/"))
+
+
+def test_list_books_deep_page(client, bench):
+    bench("list_books_deep_page", lambda: client.get("/api/v1/books/?page=200&limit=24"))
+
+
+def test_list_books_search(client, bench):
+    bench("list_books_search", lambda: client.get("/api/v1/books/?search=crimson"))
+
+
+def test_list_books_fuzzy_search(client, bench):
+    bench("list_books_fuzzy_search", lambda: client.get("/api/v1/books/?search=crimsn kingdm"))
+
+
+def test_list_books_fuzzy_search_author(client, bench):
+    bench("list_books_fuzzy_search_author", lambda: client.get("/api/v1/books/?search=tokarczk"))
+
+
+def test_list_books_genre_filter(client, bench):
+    bench("list_books_genre_filter", lambda: client.get("/api/v1/books/?genre_ids=3&genre_ids=7"))
+
+
+def test_list_books_author_filter(client, bench):
+    bench("list_books_author_filter", lambda: client.get("/api/v1/books/?author_ids=1&author_ids=12"))
+
+
+def test_list_books_combined_filters(client, bench):
+    bench(
+        "list_books_combined_filters",
+        lambda: client.get("/api/v1/books/?genre_ids=2&publisher_ids=1&min_price=10&max_price=30"),
+    )
+
+
+def test_list_books_all_genres(client, bench):
+    bench("list_books_all_genres", lambda: client.get("/api/v1/books/?genre_ids=2&genre_ids=3&genre_match=all"))
+
+
+@pytest.mark.parametrize("name", SORTED_LISTINGS)
+def test_list_books_sorted(client, bench, name):
+    bench(f"list_books_sorted_{name}", lambda: client.get(SORTED_LISTINGS[name]))
+
+
+@pytest.mark.parametrize("name", SORTED_LISTINGS)
+def test_list_books_sorted_sql(client, bench, monkeypatch, name):
+    """The same listings on the SQL path, for comparison with the snapshot"""
+    monkeypatch.setattr(settings, "catalog_snapshot", False)
+    bench(f"list_books_sorted_{name}_sql", lambda: client.get(SORTED_LISTINGS[name]))
+
+
+def _cursor_walk(client, pages: int):
+    """Follow next_cursor from the first page; returns the last response"""
+    url = "/api/v1/books/?sort=price_desc&limit=24"
+    response = client.get(url)
+    for _ in range(pages - 1):
+        response = client.get(f"{url}&cursor={response.json()['next_cursor']}")
+    return response
+
+
+def test_list_books_cursor_walk(client, bench):
+    bench("list_books_cursor_walk_10_pages", lambda: _cursor_walk(client, 10), rounds=10)
+
+
+def test_list_books_cursor_walk_sql(client, bench, monkeypatch):
+    monkeypatch.setattr(settings, "catalog_snapshot", False)
+    bench("list_books_cursor_walk_10_pages_sql", lambda: _cursor_walk(client, 10), rounds=10)
+
+
+def test_catalog_snapshot_memory(client, catalog_engine, report):
+    for sort in ("price_asc", "title", "newest", "bestselling"):
+        client.get(f"/api/v1/books/?sort={sort}")
+    with Session(catalog_engine) as db:
+        report("catalog_snapshot_memory", catalog_snapshot(db).memory())
+
+
+def test_bestsellers(client, bench):
+    bench("bestsellers", lambda: client.get("/api/v1/books/bestsellers"))
+
+
+def test_bestsellers_genre(client, bench):
+    bench("bestsellers_genre", lambda: client.get("/api/v1/books/bestsellers?genre_id=3&limit=24"))
+
+
+def test_get_book(client, bench):
+    ids = itertools.cycle(range(1, 1000, 37))
+    bench("get_book", lambda: client.get(f"/api/v1/books/{next(ids)}"))
+
+
+def test_books_batch_cart(client, bench):
+    """A 15-book cart refreshed repeatedly, served from the book cache after the first request"""
+    cart = list(range(5, 5 + 15 * 53, 53))
+    bench("books_batch_cart", lambda: client.get("/api/v1/books/batch", params={"ids": cart}))
+
+
+def test_books_batch_cold(client, bench):
+    """Distinct 100-book lists, all cache misses"""
+    batches = (list(range(start, start + 100)) for start in itertools.count(2000, 100))
+    bench("books_batch_cold", lambda: client.post("/api/v1/books/batch", json={"ids": next(batches)}))
+
+
+def test_books_metadata(client, bench):
+    bench("books_metadata", lambda: client.get("/api/v1/books/metadata"), rounds=10)
+
+
+def test_also_bought_rebuild(catalog_engine, report):
+    start = time.perf_counter()
+    with Session(catalog_engine) as db:
+        pairs = rebuild_co_purchases(db)
+    report("also_bought_rebuild", {"pairs": pairs, "seconds": round(time.perf_counter() - start, 2)})
+
+
+def test_also_bought(client, bench):
+    # Popular books have the longest co-purchase lists; cycling past the LRU is not the point here
+    ids = itertools.cycle(range(1, 200, 7))
+    bench("also_bought", lambda: client.get(f"/api/v1/books/{next(ids)}/also-bought"))
+
+
+def test_checkout(client, bench, catalog_engine):
+    with catalog_engine.connect() as conn:
+        in_stock = list(conn.scalars(text("SELECT id FROM books WHERE stock >= 50 ORDER BY id LIMIT 200")))
+    book_ids = itertools.cycle(in_stock)
+
+    def checkout():
+        return client.post("/api/v1/orders/", json={
+            "customer_name": "Bench Customer",
+            "email": "bench@example.com",
+            "address": "1 Bench Street",
+            "postal_code": "00001",
+            "total_price": 10.0,
+            "items": [
+                {"book_id": next(book_ids), "quantity": 1},
+                {"book_id": next(book_ids), "quantity": 1},
+            ],
+        })
+
+    bench("checkout", checkout)
+
+
+def test_changes_feed(client, bench):
+    """An admin page catching up on the last few hundred changes, after the checkouts above"""
+    last_seq = client.get("/api/v1/changes/").json()["last_seq"]
+    since = max(0, last_seq - 300)
+    bench("changes_feed", lambda: client.get("/api/v1/changes/", params={"since": since, "types": ["order"]}))
+
+
+def test_checkout_group_commit(client, bench, catalog_engine, monkeypatch):
+    """A lone checkout through the group commit writer: the latency it adds without concurrency"""
+    monkeypatch.setattr(settings, "checkout_group_commit", True)
+    with catalog_engine.connect() as conn:
+        in_stock = list(conn.scalars(text("SELECT id FROM books WHERE stock >= 50 ORDER BY id LIMIT 200 OFFSET 200")))
+    book_ids = itertools.cycle(in_stock)
+
+    def checkout():
+        return client.post("/api/v1/orders/", json={
+            "customer_name": "Bench Customer",
+            "email": "bench@example.com",
+            "address": "1 Bench Street",
+            "postal_code": "00001",
+            "total_price": 10.0,
+            "items": [
+                {"book_id": next(book_ids), "quantity": 1},
+                {"book_id": next(book_ids), "quantity": 1},
+            ],
+        })
+
+    bench("checkout_group_commit", checkout)
+    client.portal.call(orders_endpoints._checkout_writers[catalog_engine].close)
+
+
+CONCURRENT_CHECKOUTS = 256
+# Below the pool's 15 connections: handlers hold theirs until their response is sent
+CHECKOUT_CONCURRENCY = 12
+
+
+@pytest.mark.parametrize("group_commit", [False, True])
+def test_checkout_throughput(client, catalog_engine, report, monkeypatch, group_commit):
+    """Checkouts per second with CHECKOUT_CONCURRENCY clients, committed one by one or in groups"""
+    monkeypatch.setattr(settings, "checkout_group_commit", group_commit)
+    with catalog_engine.connect() as conn:
+        in_stock = list(conn.scalars(text("SELECT id FROM books WHERE stock >= 50 ORDER BY id LIMIT 500")))
+    book_ids = itertools.cycle(in_stock)
+    payloads = [
+        {
+            "customer_name": "Bench Customer", "email": "bench@example.com",
+            "address": "1 Bench Street", "postal_code": "00001", "total_price": 10.0,
+            "items": [{"book_id": next(book_ids), "quantity": 1}, {"book_id": next(book_ids), "quantity": 1}],
+        }
+        for _ in range(CONCURRENT_CHECKOUTS)
+    ]
+
+    async def run():
+        latencies = []
+        pending = iter(payloads)
+
+        async def customer(http):
+            for payload in pending:
+                start = time.perf_counter()
+                response = await http.post("/api/v1/orders/", json=payload)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 201, response.text
+
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            start = time.perf_counter()
+            await asyncio.gather(*(customer(http) for _ in range(CHECKOUT_CONCURRENCY)))
+            seconds = time.perf_counter() - start
+        writer = orders_endpoints._checkout_writers.get(catalog_engine)
+        batches = None
+        if group_commit:
+            batches = writer.batches
+            await writer.close()
+        return seconds, latencies, batches
+
+    seconds, latencies, batches = asyncio.run(run())
+    values = {
+        "orders_per_s": round(CONCURRENT_CHECKOUTS / seconds),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+    }
+    if batches:
+        values["mean_batch"] = round(CONCURRENT_CHECKOUTS / batches, 1)
+    report(f"checkout_throughput_{'group_commit' if group_commit else 'direct'}", values)
+
+
+def _cart_items(catalog_engine, books: int) -> list[dict]:
+    with catalog_engine.connect() as conn:
+        book_ids = conn.scalars(text("SELECT id FROM books WHERE stock >= 50 ORDER BY id DESC LIMIT :n"), {"n": books})
+        return [{"book_id": book_id, "quantity": 1} for book_id in book_ids]
+
+
+def test_cart_quote(client, bench, catalog_engine):
+    """Pricing a 15-book cart: one batched read"""
+    items = _cart_items(catalog_engine, 15)
+    bench("cart_quote", lambda: client.post("/api/v1/orders/quote", json={"items": items}))
+
+
+def test_checkout_quoted(client, bench, catalog_engine):
+    """Checking out a 15-book cart with a quote fetched beforehand, so no book is read again"""
+    items = _cart_items(catalog_engine, 15)
+    quotes = iter([
+        client.post("/api/v1/orders/quote", json={"items": items}).json()["quote"] for _ in range(33)
+    ])
+    customer = {
+        "customer_name": "Bench Customer", "email": "bench@example.com",
+        "address": "1 Bench Street", "postal_code": "00001",
+    }
+    bench("checkout_quoted", lambda: client.post("/api/v1/orders/", json={
+        **customer, "items": items, "quote": next(quotes),
+    }))
+
+
+def test_checkout_during_bulk_job(client, catalog_engine, report):
+    """Checkouts while a bulk status job rewrites every order in chunks, taking turns at the write lock"""
+    with catalog_engine.connect() as conn:
+        order_ids = list(conn.scalars(text("SELECT id FROM orders ORDER BY id")))
+        in_stock = list(conn.scalars(text("SELECT id FROM books WHERE stock >= 50 ORDER BY id LIMIT 100 OFFSET 400")))
+    book_ids = itertools.cycle(in_stock)
+
+    start = time.perf_counter()
+    response = client.put("/api/v1/orders/bulk-status", json={"order_ids": order_ids, "status": "pending"})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    latencies = []
+    while client.get(f"/api/v1/jobs/{job_id}").json()["status"] in ("queued", "running"):
+        checkout_start = time.perf_counter()
+        response = client.post("/api/v1/orders/", json={
+            "customer_name": "Bench Customer", "email": "bench@example.com",
+            "address": "1 Bench Street", "postal_code": "00001", "total_price": 10.0,
+            "items": [{"book_id": next(book_ids), "quantity": 1}],
+        })
+        latencies.append((time.perf_counter() - checkout_start) * 1000)
+        assert response.status_code == 201, response.text
+    wait_for_job(job_id)
+    job = client.get(f"/api/v1/jobs/{job_id}").json()
+    assert job["status"] == "done"
+    report("checkout_during_bulk_job", {
+        "orders": len(order_ids),
+        "job_seconds": round(time.perf_counter() - start, 2),
+        "checkouts": len(latencies),
+        "checkout_p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "checkout_max_ms": round(max(latencies), 2) if latencies else None,
+    })
+
+
+def test_stats(client, bench):
+    bench("stats", lambda: client.get("/api/v1/stats/"), rounds=10)
+
+
+def test_price_stats(client, bench):
+    bench("price_stats", lambda: client.get("/api/v1/books/price-stats"))
+
+
+def test_price_stats_filtered(client, bench):
+    bench("price_stats_filtered", lambda: client.get("/api/v1/books/price-stats?genre_ids=3"))
+
+
+# Distinct two-word prefixes, so no request is answered from the query cache
+SUGGEST_QUERIES = [
+    f"{adjective[:3]} {noun[:2]}" for adjective in ADJECTIVES for noun in NOUNS
+] + [f"{first[:4]} {last[:3]}" for first in FIRST_NAMES for last in LAST_NAMES]
+
+
+def test_search_suggest(client, bench):
+    queries = itertools.cycle(SUGGEST_QUERIES)
+    bench("search_suggest", lambda: client.get("/api/v1/search/suggest", params={"q": next(queries)}))
+
+
+def test_search_suggest_single_word(client, bench):
+    queries = itertools.cycle(adjective[:2] for adjective in ADJECTIVES)
+    bench("search_suggest_single_word", lambda: client.get("/api/v1/search/suggest", params={"q": next(queries)}))
+
+
+def test_search_suggest_index(catalog_engine, report):
+    """Lookups on the index itself, without HTTP and with an empty query cache, and its memory"""
+    with Session(catalog_engine) as db:
+        index = suggest_index(db)
+    latencies = []
+    for query in SUGGEST_QUERIES + [name[:2] for name in ADJECTIVES + NOUNS + LAST_NAMES]:
+        index._cache.clear()
+        start = time.perf_counter()
+        index.suggest(query, 8)
+        latencies.append((time.perf_counter() - start) * 1000)
+    memory = index.memory()
+    report("search_suggest_index", {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "max_ms": round(max(latencies), 3),
+        **memory,
+    })
+    assert memory["bytes_per_100k_books"] <= MEMORY_BUDGET_PER_100K
+
+
+def test_order_archive(client, bench, catalog_engine, report):
+    """Archive orders older than 180 days, then read an archived order through the union"""
+    with catalog_engine.begin() as conn:
+        conn.execute(text("UPDATE orders SET status = 'done'"))
+        hot_before = conn.scalar(text("SELECT count(*) FROM orders"))
+    stats_before = client.get("/api/v1/stats/").json()
+
+    start = time.perf_counter()
+    with Session(catalog_engine) as db:
+        archived = archive_orders(db, older_than_days=180)
+    seconds = time.perf_counter() - start
+    with catalog_engine.connect() as conn:
+        archived_id = conn.scalar(text("SELECT min(id) FROM archive.orders"))
+    stats = client.get("/api/v1/stats/").json()
+    assert (stats["total_orders"], stats["total_revenue"]) == (
+        stats_before["total_orders"], pytest.approx(stats_before["total_revenue"])
+    )
+    report("order_archive", {
+        "orders": hot_before,
+        "archived": archived,
+        "seconds": round(seconds, 2),
+        "orders_per_s": round(archived / seconds),
+    })
+
+    bench("order_get_archived", lambda: client.get(f"/api/v1/orders/{archived_id}", params={"include_archived": True}))
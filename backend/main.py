@@ -1,14 +1,23 @@
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 import uvicorn
 from dotenv import load_dotenv
 import os
 from pathlib import Path
 
 from src.core.config import settings
-from src.core.database import create_tables
+from src.core.database import SessionLocal, create_tables
+from src.core.metrics import MetricsMiddleware
 from src.api.v1.routes.router import api_v1_router
+from src.services.bitmap_index import bitmap_index
+from src.services.catalog_snapshot import catalog_snapshot
+from src.services.jobs import fail_interrupted_jobs
+from src.services.sales import run_sales_window_refresh
+from src.services.suggest import suggest_index
 
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
@@ -18,7 +27,14 @@ load_dotenv(env_path)
 async def lifespan(app: FastAPI):
     print("🚀 Application starting...")
     create_tables()
+    with SessionLocal() as db:
+        fail_interrupted_jobs(db)
+        catalog_snapshot(db)
+        bitmap_index(db)
+        suggest_index(db)
+    sales_window_refresh = asyncio.create_task(run_sales_window_refresh(SessionLocal))
     yield
+    sales_window_refresh.cancel()
     print("🛑 Application shutting down...")
 
 
@@ -29,6 +45,7 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -45,6 +62,18 @@ app.add_middleware(
 app.include_router(api_v1_router, prefix="/api/v1")
 
 
+@app.exception_handler(OperationalError)
+async def database_error_handler(request: Request, exc: OperationalError):
+    """Report SQLite lock contention as a retryable 503 instead of a bare 500"""
+    if "database is locked" in str(exc.orig):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "database is locked"},
+            headers={"Retry-After": "1"},
+        )
+    return JSONResponse(status_code=500, content={"detail": "Database error"})
+
+
 
 if __name__ == "__main__":
     port = int(os.getenv("BACKEND_PORT", 8000))
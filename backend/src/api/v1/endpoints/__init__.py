@@ -6,6 +6,10 @@ from src.api.v1.endpoints.books import router as books_router
 from src.api.v1.endpoints.orders import router as orders_router
 from src.api.v1.endpoints.admin import router as admin_router
 from src.api.v1.endpoints.stats import router as stats_router
+from src.api.v1.endpoints.search import router as search_router
+from src.api.v1.endpoints.jobs import router as jobs_router
+from src.api.v1.endpoints.changes import router as changes_router
+from src.api.v1.endpoints.events import router as events_router
 
 __all__ = [
     "health_router",
@@ -16,4 +20,8 @@ __all__ = [
     "orders_router",
     "admin_router",
     "stats_router",
+    "search_router",
+    "jobs_router",
+    "changes_router",
+    "events_router",
 ]
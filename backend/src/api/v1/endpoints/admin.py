@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from src.core.database import get_db
+from src.core.slow_queries import slow_query_log
 from src.models import Admin
 from src.schemas.admin import (
     AdminLoginRequest,
     AdminLoginResponse,
     AdminChangePasswordRequest,
+    SlowQueryResponse,
 )
 import secrets
 
@@ -87,3 +91,18 @@ def logout(token: str):
     if token in admin_sessions:
         del admin_sessions[token]
     return {"message": "Logged out successfully"}
+
+
+@router.get("/slow-queries", response_model=list[SlowQueryResponse])
+def slow_queries(
+    token: str,
+    limit: int = Query(20, ge=1, le=500),
+    order_by: Literal["max_ms", "total_ms", "count"] = "max_ms",
+):
+    """List the slowest query shapes with counts, query plans and full-scan flags"""
+    if token not in admin_sessions:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    return slow_query_log.top(limit, order_by)
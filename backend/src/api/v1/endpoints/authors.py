@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from src.core.database import get_db
+from src.core.events import books_changed
 from src.models import Author
 from src.schemas.author import AuthorCreate, AuthorResponse
 
@@ -42,7 +43,9 @@ async def update_author(author_id: int, author: AuthorCreate, db: Session = Depe
         raise HTTPException(status_code=404, detail="Author not found")
     db_author.name = author.name
     db_author.bio = author.bio
+    book_ids = [book.id for book in db_author.books]
     db.commit()
+    books_changed(db, book_ids)
     db.refresh(db_author)
     return db_author
 
@@ -53,6 +56,8 @@ async def delete_author(author_id: int, db: Session = Depends(get_db)):
     db_author = db.query(Author).filter(Author.id == author_id).first()
     if not db_author:
         raise HTTPException(status_code=404, detail="Author not found")
+    book_ids = [book.id for book in db_author.books]
     db.delete(db_author)
     db.commit()
+    books_changed(db, book_ids)
     return None
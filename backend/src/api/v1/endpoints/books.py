@@ -1,16 +1,104 @@
 """Books endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import base64
+import binascii
+import json
+import math
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from src.api.v1.endpoints.jobs import JobResponse, job_accepted
+from src.core.config import settings
 from src.core.database import get_db
-from src.models import Book, Author, Genre, Publisher
+from src.core.events import books_changed
+from src.models import Book, BookSearch, Author, Genre, Publisher
+from src.services.book_import import (
+    DEFAULT_CHUNK_SIZE,
+    import_books,
+    iter_csv_records,
+    iter_lines,
+    iter_ndjson_records,
+)
+from src.services.also_bought import TOP_K, also_bought_index
+from src.services.bitmap_index import bitmap_index
+from src.services.book_cache import book_cache
+from src.services.book_upsert import upsert_books
+from src.services.catalog_snapshot import catalog_snapshot
+from src.services.fuzzy_search import fuzzy_matches
+from src.services.jobs import JobRun, job_handler, submit_job
+from src.services.price_stats import filtered_price_stats, price_index
 from src.schemas.book import BookCreate, BookResponse
 from src.schemas.author import AuthorResponse
 from src.schemas.genre import GenreResponse
 from src.schemas.publisher import PublisherResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/books", tags=["books"])
 
+# sort -> (column, descending), the same orders as the catalog snapshot's SORT_KEYS.
+# Ties break on book id in the sort direction, so each order is an (in_stock, column)
+# index walked forwards or backwards and a cursor is a (value, book id) position in it
+SORT_COLUMNS = {
+    None: (BookSearch.book_id, False),
+    "price_asc": (BookSearch.price, False),
+    "price_desc": (BookSearch.price, True),
+    "title": (BookSearch.sort_title, False),
+    "newest": (BookSearch.published_year, True),
+    "bestselling": (BookSearch.units_sold, True),
+}
+SortOrder = Literal["price_asc", "price_desc", "title", "newest", "bestselling"]
+
+# Most ids per batch lookup; GET keeps its query string short, POST is for long carts
+MAX_BATCH_IDS = 100
+MAX_BATCH_POST_IDS = 1000
+
+
+def encode_cursor(sort: str | None, value, book_id: int) -> str:
+    """Opaque cursor for the position right after the given book"""
+    payload = json.dumps({"sort": sort, "after": [value, book_id]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+# Ids and integer sort values must fit an SQLite integer
+MAX_CURSOR_INT = 2 ** 63 - 1
+
+
+def _cursor_number(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -MAX_CURSOR_INT <= value <= MAX_CURSOR_INT
+    return isinstance(value, float) and math.isfinite(value)
+
+
+def decode_cursor(cursor: str, sort: str | None) -> tuple:
+    """(sort value, book id) of a cursor issued for the same sort order.
+
+    Cursors come back from clients, so the value must have the type the
+    sort compares it as: the id itself without a sort, a title string, or a number.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, book_id = payload["after"]
+        valid = (
+            payload["sort"] == sort
+            and isinstance(book_id, int) and not isinstance(book_id, bool)
+            and 0 <= book_id <= MAX_CURSOR_INT
+        )
+        if valid:
+            if sort is None:
+                valid = value == book_id
+            elif sort == "title":
+                valid = isinstance(value, str)
+            else:
+                valid = _cursor_number(value)
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, book_id
+
 
 class PaginatedResponse(BaseModel):
     """Paginated response schema"""
@@ -19,6 +107,9 @@ class PaginatedResponse(BaseModel):
     page: int
     limit: int
     pages: int
+    next_cursor: str | None = None
+    # Typo-tolerant matches were appended to too few exact search results
+    fuzzy: bool = False
 
 
 class BulkDeleteRequest(BaseModel):
@@ -26,6 +117,69 @@ class BulkDeleteRequest(BaseModel):
     book_ids: list[int]
 
 
+class BulkImportError(BaseModel):
+    """Per-row bulk import error"""
+    row: int
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    """Bulk import result schema"""
+    inserted: int
+    failed: int
+    errors: list[BulkImportError]
+    # Ids of the inserted books, in the order of their rows
+    ids: list[int]
+
+
+class BulkUpsertResponse(BaseModel):
+    """Bulk upsert result schema"""
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int
+    errors: list[BulkImportError]
+
+
+class PriceBucket(BaseModel):
+    """Price histogram bucket schema"""
+    min: float
+    max: float
+    count: int
+
+
+class PriceStatsResponse(BaseModel):
+    """Price distribution schema"""
+    min: float | None
+    max: float | None
+    count: int
+    buckets: list[PriceBucket]
+
+
+class BestsellerResponse(BaseModel):
+    """Bestseller ranking entry schema"""
+    rank: int
+    units_sold: int
+    book: BookResponse
+
+
+class AlsoBoughtResponse(BaseModel):
+    """Co-purchased book schema"""
+    orders: int
+    book: BookResponse
+
+
+class BookBatchRequest(BaseModel):
+    """Batch lookup schema"""
+    ids: list[int] = Field(min_length=1, max_length=MAX_BATCH_POST_IDS)
+
+
+class BookBatchResponse(BaseModel):
+    """Batch lookup result schema"""
+    items: list[BookResponse]
+    missing: list[int]
+
+
 class BooksMetadataResponse(BaseModel):
     """Books with metadata response schema"""
     books: PaginatedResponse
@@ -68,47 +222,140 @@ async def get_books_metadata(
     }
 
 
-@router.get("/", response_model=PaginatedResponse)
-async def list_books(
-    page: int = Query(1, ge=1),
-    limit: int = Query(12, ge=1, le=100),
-    search: str = Query(None),
-    genre_ids: list[int] = Query(None),
-    author_ids: list[int] = Query(None),
-    publisher_ids: list[int] = Query(None),
-    min_price: float = Query(None),
-    max_price: float = Query(None),
-    db: Session = Depends(get_db)
+def filter_in_stock_books(
+    db: Session, search, genre_ids, author_ids, publisher_ids, genre_match="any", min_price=None, max_price=None
 ):
-    """Get all books with stock > 0, paginated with optional search and filters"""
-    query = db.query(Book).filter(Book.stock > 0)
+    """Query the book_search projection for in-stock books matching the shop's filters.
+
+    Every filter is a predicate on the one projection row, so no joins or
+    DISTINCT are needed; search also matches author names.
+    """
+    query = db.query(BookSearch).filter(BookSearch.in_stock.is_(True))
 
     if search:
         search_lower = search.lower()
         query = query.filter(
-            (Book.title.ilike(f"{search_lower}%")) |
-            (Book.title.ilike(f"% {search_lower}%")) |
-            (Book.description.ilike(f"%{search_lower}%"))
+            (BookSearch.search_text.like(f"% {search_lower}%")) |
+            (BookSearch.description_text.like(f"%{search_lower}%"))
         )
 
     if genre_ids:
-        query = query.join(Book.genres).filter(Genre.id.in_(genre_ids))
+        combine = and_ if genre_match == "all" else or_
+        query = query.filter(combine(*(BookSearch.genre_ids.contains(f",{i},") for i in set(genre_ids))))
 
     if author_ids:
-        query = query.join(Book.authors).filter(Author.id.in_(author_ids))
+        query = query.filter(or_(*(BookSearch.author_ids.contains(f",{i},") for i in set(author_ids))))
 
     if publisher_ids:
-        query = query.filter(Book.publisher_id.in_(publisher_ids))
+        query = query.filter(BookSearch.publisher_id.in_(publisher_ids))
 
     if min_price is not None:
-        query = query.filter(Book.price >= min_price)
+        query = query.filter(BookSearch.price >= min_price)
     if max_price is not None:
-        query = query.filter(Book.price <= max_price)
+        query = query.filter(BookSearch.price <= max_price)
 
-    total = query.distinct().count()
+    return query
 
-    offset = (page - 1) * limit
-    books = query.distinct().offset(offset).limit(limit).all()
+
+def books_by_ids(db: Session, book_ids: list[int]) -> list[Book]:
+    """Load books with their relationships in the order of the given ids"""
+    if not book_ids:
+        return []
+    books = (
+        db.query(Book)
+        .options(joinedload(Book.publisher), selectinload(Book.authors), selectinload(Book.genres))
+        .filter(Book.id.in_(book_ids))
+        .all()
+    )
+    by_id = {book.id: book for book in books}
+    return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+
+@router.get("/", response_model=PaginatedResponse)
+async def list_books(
+    page: int = Query(1, ge=1),
+    limit: int = Query(12, ge=1, le=100),
+    search: str = Query(None),
+    genre_ids: list[int] = Query(None),
+    author_ids: list[int] = Query(None),
+    publisher_ids: list[int] = Query(None),
+    min_price: float = Query(None),
+    max_price: float = Query(None),
+    genre_match: Literal["any", "all"] = Query("any"),
+    sort: SortOrder = Query(None),
+    cursor: str = Query(None),
+    fuzzy: bool = Query(True),
+    db: Session = Depends(get_db)
+):
+    """Get all books with stock > 0, paginated with optional search and filters.
+
+    `genre_match=all` keeps only books in every selected genre. Without
+    `sort` books come in catalog (id) order. Pass the returned `next_cursor`
+    as `cursor` to get the page after the current one without an offset;
+    `page` is then ignored. Unless searching, the page is computed from the
+    in-memory bitmap index and catalog snapshot, falling back to SQL while
+    the snapshot is stale.
+
+    When a search finds fewer than `settings.fuzzy_search_min_results`
+    books, titles and author names resembling it are appended, most similar
+    first, and `fuzzy` is set in the response; `fuzzy=false` turns this off.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+    offset = 0 if after else (page - 1) * limit
+
+    snapshot = catalog_snapshot(db) if not search else None
+    if snapshot is not None and snapshot.sync(db):
+        bitmap = bitmap_index(db).match(genre_ids, author_ids, publisher_ids, min_price, max_price, genre_match)
+        total = bitmap.bit_count()
+        book_ids = snapshot.select(bitmap, sort, offset, limit + 1, after)
+        next_cursor = None
+        if len(book_ids) > limit:
+            last = book_ids[limit - 1]
+            next_cursor = encode_cursor(sort, snapshot.sort_value(sort, last), last)
+        return {
+            "items": books_by_ids(db, book_ids[:limit]),
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "pages": (total + limit - 1) // limit,
+            "next_cursor": next_cursor,
+        }
+
+    filters = (genre_ids, author_ids, publisher_ids, genre_match, min_price, max_price)
+    query = filter_in_stock_books(db, search, *filters)
+
+    total = query.with_entities(func.count()).scalar()
+
+    column, descending = SORT_COLUMNS[sort]
+    if sort is None:
+        order_by = (BookSearch.book_id,)
+        if after:
+            query = query.filter(BookSearch.book_id > after[1])
+    else:
+        position = tuple_(column, BookSearch.book_id)
+        order_by = (column.desc(), BookSearch.book_id.desc()) if descending else (column, BookSearch.book_id)
+        if after:
+            query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+
+    if search and fuzzy and not after and total < settings.fuzzy_search_min_results:
+        exact_ids = [row[0] for row in query.with_entities(BookSearch.book_id).order_by(*order_by)] if total else []
+        fuzzy_ids = [
+            book_id for book_id, _ in fuzzy_matches(filter_in_stock_books(db, None, *filters), search)
+            if book_id not in exact_ids
+        ]
+        book_ids = exact_ids + fuzzy_ids
+        return {
+            "items": books_by_ids(db, book_ids[offset:offset + limit]),
+            "total": len(book_ids),
+            "page": page,
+            "limit": limit,
+            "pages": (len(book_ids) + limit - 1) // limit,
+            "fuzzy": bool(fuzzy_ids),
+        }
+
+    rows = query.with_entities(BookSearch.book_id, column).order_by(*order_by).offset(offset).limit(limit + 1).all()
+    next_cursor = encode_cursor(sort, rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    books = books_by_ids(db, [row[0] for row in rows[:limit]])
 
     pages = (total + limit - 1) // limit
 
@@ -117,10 +364,131 @@ async def list_books(
         "total": total,
         "page": page,
         "limit": limit,
-        "pages": pages
+        "pages": pages,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/price-stats", response_model=PriceStatsResponse)
+async def get_price_stats(
+    buckets: int = Query(10, ge=1, le=100),
+    search: str = Query(None),
+    genre_ids: list[int] = Query(None),
+    author_ids: list[int] = Query(None),
+    publisher_ids: list[int] = Query(None),
+    genre_match: Literal["any", "all"] = Query("any"),
+    db: Session = Depends(get_db)
+):
+    """Get min, max and a price histogram of in-stock books for the current filters.
+
+    Price bounds are not a filter here: the slider shows the whole range the
+    other filters allow. Without filters the precomputed price index is used
+    while the catalog snapshot, which replays other processes' writes into
+    it, is fresh.
+    """
+    if not (search or genre_ids or author_ids or publisher_ids):
+        snapshot = catalog_snapshot(db)
+        if snapshot is not None and snapshot.sync(db):
+            return price_index(db).stats(buckets)
+    query = filter_in_stock_books(db, search, genre_ids, author_ids, publisher_ids, genre_match)
+    return filtered_price_stats(db, query, buckets)
+
+
+# window -> precomputed units sold column, each indexed together with in_stock
+BESTSELLER_COLUMNS = {
+    "all": BookSearch.units_sold,
+    "30d": BookSearch.units_sold_30d,
+    "7d": BookSearch.units_sold_7d,
+}
+
+
+@router.get("/bestsellers", response_model=list[BestsellerResponse])
+async def list_bestsellers(
+    window: Literal["all", "30d", "7d"] = Query("all"),
+    genre_id: int = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Get the best-selling in-stock books, overall or in one genre.
+
+    Ranked by units sold over the whole history or the last 30 / 7 days
+    (including today), read from the precomputed sales counters.
+    """
+    column = BESTSELLER_COLUMNS[window]
+    query = db.query(BookSearch.book_id, column).filter(BookSearch.in_stock.is_(True), column > 0)
+    if genre_id is not None:
+        query = query.filter(BookSearch.genre_ids.contains(f",{genre_id},"))
+    rows = query.order_by(column.desc(), BookSearch.book_id.desc()).limit(limit).all()
+
+    books = {book.id: book for book in books_by_ids(db, [book_id for book_id, _ in rows])}
+    return [
+        {"rank": rank, "units_sold": units_sold, "book": books[book_id]}
+        for rank, (book_id, units_sold) in enumerate(rows, start=1)
+        if book_id in books
+    ]
+
+
+@router.put("/upsert", response_model=BulkUpsertResponse)
+async def bulk_upsert(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Insert or update books keyed by ISBN from a streamed NDJSON or CSV feed.
+
+    Records are partial: only the fields present are changed, and authors and
+    genres are never touched. New ISBNs need at least title, price and
+    publisher_id. Rows whose values would not change are skipped.
+    """
+    content_type = request.headers.get("content-type", "")
+    lines = iter_lines(request.stream())
+    if content_type.startswith("text/csv"):
+        records = iter_csv_records(lines)
+    else:
+        records = iter_ndjson_records(lines)
+    return await upsert_books(db, records, chunk_size=chunk_size)
+
+
+def lookup_books(db: Session, book_ids: list[int]) -> dict:
+    """Books in the requested order, each once, plus the ids of books that do not exist.
+
+    Served from the book cache while the catalog snapshot is fresh; misses are
+    loaded together with their relationships in one eager query.
+    """
+    book_ids = list(dict.fromkeys(book_ids))
+    snapshot = catalog_snapshot(db)
+    cache = book_cache(db) if snapshot is not None and snapshot.sync(db) else None
+    found = cache.get_many(book_ids) if cache is not None else {}
+    misses = [book_id for book_id in book_ids if book_id not in found]
+    if misses:
+        generation = cache.generation if cache is not None else None
+        loaded = {
+            book.id: BookResponse.model_validate(book).model_dump() for book in books_by_ids(db, misses)
+        }
+        if cache is not None:
+            cache.put_many(loaded, generation)
+        found.update(loaded)
+    return {
+        "items": [found[book_id] for book_id in book_ids if book_id in found],
+        "missing": [book_id for book_id in book_ids if book_id not in found],
     }
 
 
+@router.get("/batch", response_model=BookBatchResponse)
+async def get_books_batch(
+    ids: list[int] = Query(..., min_length=1, max_length=MAX_BATCH_IDS),
+    db: Session = Depends(get_db)
+):
+    """Get several books by ID, e.g. to refresh prices and stock of a cart"""
+    return lookup_books(db, ids)
+
+
+@router.post("/batch", response_model=BookBatchResponse)
+async def post_books_batch(data: BookBatchRequest, db: Session = Depends(get_db)):
+    """Get several books by ID; for id lists too long for a query string"""
+    return lookup_books(db, data.ids)
+
+
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book(book_id: int, db: Session = Depends(get_db)):
     """Get book by ID with relationships"""
@@ -130,6 +498,25 @@ async def get_book(book_id: int, db: Session = Depends(get_db)):
     return book
 
 
+@router.get("/{book_id}/also-bought", response_model=list[AlsoBoughtResponse])
+async def get_also_bought(
+    book_id: int,
+    limit: int = Query(5, ge=1, le=TOP_K),
+    db: Session = Depends(get_db)
+):
+    """Get the books most often ordered together with this one"""
+    snapshot = catalog_snapshot(db)
+    if snapshot is not None:
+        # Replays other processes' orders, which drops their books' cached entries
+        snapshot.sync(db)
+    top = also_bought_index(db).top(db, book_id)[:limit]
+    if not top and db.get(Book, book_id) is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    books = {book.id: book for book in books_by_ids(db, [other_id for other_id, _ in top])}
+    return [{"orders": orders, "book": books[other_id]} for other_id, orders in top if other_id in books]
+
+
 @router.put("/{book_id}", response_model=BookResponse)
 async def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_db)):
     """Update a book with relationships"""
@@ -174,6 +561,7 @@ async def update_book(book_id: int, book: BookCreate, db: Session = Depends(get_
 
     db.commit()
     db.refresh(db_book)
+    books_changed(db, [db_book.id])
     return db_book
 
 
@@ -218,19 +606,59 @@ async def create_book(book: BookCreate, db: Session = Depends(get_db)):
     db.add(db_book)
     db.commit()
     db.refresh(db_book)
+    books_changed(db, [db_book.id])
     return db_book
 
 
-@router.delete("/bulk-delete", response_model=dict)
-async def bulk_delete(data: BulkDeleteRequest, db: Session = Depends(get_db)):
-    """Delete multiple books"""
-    if not data.book_ids:
-        raise HTTPException(status_code=400, detail="No book IDs provided")
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_import(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Import books from a streamed NDJSON (default) or CSV (`text/csv`) body.
+
+    CSV rows use the `BookCreate` field names as header, with `;`-separated
+    `author_ids` and `genre_ids`. Each chunk is validated and inserted in one
+    transaction; rows that fail are reported by their 1-based row number.
+    """
+    content_type = request.headers.get("content-type", "")
+    lines = iter_lines(request.stream())
+    if content_type.startswith("text/csv"):
+        records = iter_csv_records(lines)
+    else:
+        records = iter_ndjson_records(lines)
+    return await import_books(db, records, chunk_size=chunk_size)
+
 
+def _delete_books(db: Session, book_ids: list[int]) -> int:
     # Delete books (cascade will delete relationships)
-    deleted_count = db.query(Book).filter(Book.id.in_(data.book_ids)).delete(
+    return db.query(Book).filter(Book.id.in_(book_ids)).delete(
         synchronize_session=False
     )
+
+
+@job_handler("books.bulk_delete")
+def _bulk_delete_job(run: JobRun) -> dict:
+    deleted = 0
+    for chunk in run.chunks(run.params["book_ids"]):
+        deleted += _delete_books(run.db, chunk)
+        run.commit(len(chunk))
+        books_changed(run.db, chunk)
+    return {"deleted": deleted}
+
+
+@router.delete("/bulk-delete", response_model=dict, responses={202: {"model": JobResponse}})
+async def bulk_delete(data: BulkDeleteRequest, db: Session = Depends(get_db)):
+    """Delete multiple books, as a background job for many"""
+    if not data.book_ids:
+        raise HTTPException(status_code=400, detail="No book IDs provided")
+
+    if len(data.book_ids) > settings.job_inline_max_items:
+        return job_accepted(submit_job(db, "books.bulk_delete", {"book_ids": data.book_ids}, len(data.book_ids)))
+
+    deleted_count = _delete_books(db, data.book_ids)
     db.commit()
+    books_changed(db, data.book_ids)
 
     return {"deleted": deleted_count}
@@ -0,0 +1,53 @@
+"""Change feed endpoints"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from src.core.database import get_db
+from src.services.change_log import ENTITIES, ChangesCompacted, last_seq, maybe_compact, read_changes
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+class ChangeResponse(BaseModel):
+    """One entity created, updated or deleted"""
+    seq: int
+    type: str
+    id: int
+    op: str
+
+
+class ChangeFeedResponse(BaseModel):
+    """Changes in seq order and the seq to ask for changes since next"""
+    changes: list[ChangeResponse]
+    last_seq: int
+    has_more: bool
+
+
+@router.get("/", response_model=ChangeFeedResponse)
+async def list_changes(
+    since: int | None = Query(None, ge=0),
+    types: list[str] | None = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Get what changed since a seq; without one, just the current seq to start from"""
+    unknown = set(types or []) - set(ENTITIES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown change types: {', '.join(sorted(unknown))}")
+
+    if since is None:
+        return {"changes": [], "last_seq": last_seq(db), "has_more": False}
+    try:
+        changes, seq, has_more = read_changes(db, since, types, limit)
+    except ChangesCompacted:
+        raise HTTPException(status_code=410, detail="Changes since this seq were compacted, reload")
+    maybe_compact(db, seq)
+
+    return {
+        "changes": [
+            {"seq": change.seq, "type": change.entity, "id": change.entity_id, "op": change.op}
+            for change in changes
+        ],
+        "last_seq": seq,
+        "has_more": has_more,
+    }
@@ -0,0 +1,17 @@
+"""Live event stream endpoints"""
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from src.services.live_events import event_stream
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/stream")
+async def stream_events(request: Request):
+    """Stream order and stats events as Server-Sent Events"""
+    # No database session: a stream holding a pooled connection for its lifetime would starve the pool
+    return StreamingResponse(
+        event_stream(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
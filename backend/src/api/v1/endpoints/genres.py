@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from src.core.database import get_db
+from src.core.events import books_changed
 from src.models import Genre
 from src.schemas.genre import GenreCreate, GenreResponse
 
@@ -53,6 +54,8 @@ async def delete_genre(genre_id: int, db: Session = Depends(get_db)):
     db_genre = db.query(Genre).filter(Genre.id == genre_id).first()
     if not db_genre:
         raise HTTPException(status_code=404, detail="Genre not found")
+    book_ids = [book.id for book in db_genre.books]
     db.delete(db_genre)
     db.commit()
+    books_changed(db, book_ids)
     return None
@@ -1,7 +1,9 @@
 """Health check and info endpoints"""
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 
 from src.core.config import settings
+from src.core.metrics import metrics
 
 router = APIRouter(tags=["health"])
 
@@ -20,3 +22,12 @@ async def api_info() -> dict[str, str]:
         "version": settings.app_version,
         "description": settings.app_description,
     }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    """Request, SQL, pool and cache metrics in Prometheus text format."""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,63 @@
+"""Background job endpoints"""
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.orm import Session
+from src.core.database import get_db
+from src.models import Job
+from src.services.jobs import cancel_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+class JobResponse(BaseModel):
+    """Background job status and, once done, its result"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str
+    status: str
+    total: int
+    done: int
+    result: dict | None = None
+    error: str | None = None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+def job_accepted(job: Job) -> JSONResponse:
+    """202 response for an action handed to a background job"""
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(JobResponse.model_validate(job)),
+        headers={"Location": f"/api/v1/jobs/{job.id}"},
+    )
+
+
+@router.get("/", response_model=list[JobResponse])
+async def list_jobs(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """Get the most recent jobs"""
+    return db.query(Job).order_by(Job.id.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Get a job's status and progress"""
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued job, or stop a running one after its current chunk"""
+    if not db.get(Job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    cancel_job(db, job_id)
+    return db.get(Job, job_id)
@@ -1,9 +1,28 @@
 """Orders endpoints"""
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+from datetime import date
+from weakref import WeakKeyDictionary
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session, selectinload
+from src.core.config import settings
 from src.core.database import get_db
-from src.models import Order, OrderItem, Book
-from src.schemas.order import OrderCreate, OrderResponse, OrderItemCreate, OrderItemResponse, OrderCreateCheckout
+from src.api.v1.endpoints.jobs import JobResponse, job_accepted
+from src.core.events import books_changed
+from src.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, Book
+from src.models.order_archive import attach_archive
+from src.services.also_bought import record_added_item, record_co_purchases
+from src.services.group_commit import GroupCommitWriter
+from src.services.jobs import JobRun, job_handler, submit_job
+from src.services.live_events import publish
+from src.services.order_archive import archivable_order_ids, archive_batch, archive_cutoff
+from src.services.quotes import QuoteError, cart_quantities, cart_total, price_cart, verify_quote
+from src.services.sales import record_sales
+from src.schemas.order import (
+    CartQuoteRequest, CartQuoteResponse, OrderCreate, OrderResponse, OrderItemCreate, OrderItemResponse,
+    OrderCreateCheckout,
+)
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/orders", tags=["orders"])
@@ -21,40 +40,104 @@ class BulkDeleteRequest(BaseModel):
 
 
 @router.get("/", response_model=list[OrderResponse])
-async def list_orders(db: Session = Depends(get_db)):
-    """Get all orders"""
+async def list_orders(include_archived: bool = False, db: Session = Depends(get_db)):
+    """Get all orders, with archived ones if asked"""
     orders = db.query(Order).all()
+    if include_archived and attach_archive(db.connection()):
+        archived = db.query(ArchivedOrder).options(
+            selectinload(ArchivedOrder.items).selectinload(ArchivedOrderItem.book)
+        ).all()
+        orders = sorted(orders + archived, key=lambda order: order.id)
     return orders
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, db: Session = Depends(get_db)):
-    """Get order by ID with items"""
+async def get_order(order_id: int, include_archived: bool = False, db: Session = Depends(get_db)):
+    """Get order by ID with items, looking in the archive too if asked"""
     order = db.query(Order).filter(Order.id == order_id).first()
+    if not order and include_archived and attach_archive(db.connection()):
+        order = db.get(ArchivedOrder, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 
-@router.post("/", response_model=OrderResponse, status_code=201)
-async def create_order_checkout(order: OrderCreateCheckout, db: Session = Depends(get_db)):
-    """Create a new order with items (checkout flow)"""
+_books = Book.__table__
+# Checks and takes stock in one statement, so concurrent checkouts cannot oversell
+_TAKE_STOCK = (
+    update(_books)
+    .where(_books.c.id == bindparam("stock_book_id"), _books.c.stock >= bindparam("stock_quantity"))
+    .values(stock=_books.c.stock - bindparam("stock_quantity"))
+)
 
-    books_data = {}
 
-    for item in order.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if not book:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Book with ID {item.book_id} not found"
-            )
-        if book.stock < item.quantity:
-            raise HTTPException(
+class _StockShortfall(Exception):
+    """A book had less stock than ordered when it was taken"""
+
+
+def _take_stock(db: Session, quantities: dict[int, int]) -> None:
+    params = [
+        {"stock_book_id": book_id, "stock_quantity": quantity} for book_id, quantity in quantities.items()
+    ]
+    if db.execute(_TAKE_STOCK, params).rowcount != len(params):
+        raise _StockShortfall
+
+
+def _stock_error(db: Session, quantities: dict[int, int]) -> HTTPException:
+    """Why stock could not be taken, read once the checkout is rolled back"""
+    books = {row.id: row for row in db.execute(
+        select(Book.id, Book.title, Book.stock).where(Book.id.in_(quantities))
+    )}
+    for book_id, quantity in quantities.items():
+        book = books.get(book_id)
+        if book is None:
+            return HTTPException(status_code=404, detail=f"Book with ID {book_id} not found")
+        if book.stock < quantity:
+            return HTTPException(
                 status_code=400,
-                detail=f"Insufficient stock for '{book.title}'. Available: {book.stock}, Requested: {item.quantity}"
+                detail=f"Insufficient stock for '{book.title}'. Available: {book.stock}, Requested: {quantity}"
             )
-        books_data[item.book_id] = (book, item.quantity)
+    return HTTPException(status_code=409, detail="Stock changed during checkout, please try again")
+
+
+def _quoted_prices(token: str, quantities: dict[int, int]) -> tuple[dict[int, float], float]:
+    try:
+        quote = verify_quote(token)
+    except QuoteError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if {book_id: quantity for book_id, quantity, _ in quote["items"]} != quantities:
+        raise HTTPException(status_code=400, detail="Quote does not match the order items")
+    return {book_id: price for book_id, _, price in quote["items"]}, quote["total"]
+
+
+@router.post("/quote", response_model=CartQuoteResponse)
+async def quote_cart(cart: CartQuoteRequest, db: Session = Depends(get_db)):
+    """Price a cart and check its stock, signing the totals for checkout"""
+    return price_cart(db, cart_quantities(cart.items))
+
+
+def _place_order(db: Session, order: OrderCreateCheckout) -> int:
+    """Check, price and write a checkout without committing it; returns the order id"""
+    quantities = cart_quantities(order.items)
+    if order.quote is not None:
+        prices, total_price = _quoted_prices(order.quote, quantities)
+    else:
+        prices = {}
+        for book_id, quantity in quantities.items():
+            book = db.query(Book).filter(Book.id == book_id).first()
+            if not book:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Book with ID {book_id} not found"
+                )
+            if book.stock < quantity:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Insufficient stock for '{book.title}'. Available: {book.stock}, Requested: {quantity}"
+                )
+            prices[book_id] = book.price
+        total_price = cart_total(sum(prices[book_id] * quantity for book_id, quantity in quantities.items()))
+    _take_stock(db, quantities)
 
     db_order = Order(
         customer_name=order.customer_name,
@@ -63,23 +146,81 @@ async def create_order_checkout(order: OrderCreateCheckout, db: Session = Depend
         address=order.address,
         postal_code=order.postal_code,
         status="pending",
-        total_price=order.total_price
+        total_price=total_price
     )
     db.add(db_order)
     db.flush()
 
-    for book_id, (book, quantity) in books_data.items():
+    for book_id, quantity in quantities.items():
         db_item = OrderItem(
             order_id=db_order.id,
             book_id=book_id,
             quantity=quantity,
-            price_at_purchase=book.price
+            price_at_purchase=prices[book_id]
         )
         db.add(db_item)
-        book.stock -= quantity
+    record_sales(db, quantities, db_order.created_at.date())
+    record_co_purchases(db, [quantities])
+    return db_order.id
 
-    db.commit()
-    db.refresh(db_order)
+
+def _checkouts_changed(db: Session, orders: list[OrderCreateCheckout]) -> None:
+    books_changed(db, {item.book_id for order in orders for item in order.items})
+
+
+def _publish_order_created(order: Order) -> None:
+    publish("order_created", {
+        "id": order.id,
+        "customer_name": order.customer_name,
+        "status": order.status,
+        "total_price": order.total_price,
+        "created_at": order.created_at,
+        "items": len(order.items),
+    })
+    publish("stats_delta", {"total_orders": 1, "total_revenue": order.total_price})
+
+
+_checkout_writers: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _checkout_writer(db: Session) -> GroupCommitWriter | None:
+    """The group commit writer of this session's engine on the running loop, if enabled"""
+    if not settings.checkout_group_commit:
+        return None
+    bind = db.get_bind()
+    writer = _checkout_writers.get(bind)
+    if writer is None or writer.loop is not asyncio.get_running_loop():
+        writer = _checkout_writers[bind] = GroupCommitWriter(
+            bind, _place_order, _checkouts_changed,
+            batch_size=settings.checkout_batch_size,
+            max_wait_s=settings.checkout_batch_wait_ms / 1000,
+        )
+    return writer
+
+
+@router.post("/", response_model=OrderResponse, status_code=201)
+async def create_order_checkout(order: OrderCreateCheckout, db: Session = Depends(get_db)):
+    """Create a new order with items (checkout flow)"""
+    writer = _checkout_writer(db)
+    try:
+        if writer is not None:
+            order_id = await writer.submit(order)
+        else:
+            order_id = _place_order(db, order)
+            db.commit()
+            _checkouts_changed(db, [order])
+    except _StockShortfall:
+        db.rollback()
+        raise _stock_error(db, cart_quantities(order.items))
+
+    # Load the items and their books with the order rather than one query per item
+    db_order = (
+        db.query(Order)
+        .options(selectinload(Order.items).joinedload(OrderItem.book))
+        .filter(Order.id == order_id)
+        .one()
+    )
+    _publish_order_created(db_order)
     return db_order
 
 
@@ -95,6 +236,7 @@ async def add_order_item(item: OrderItemCreate, db: Session = Depends(get_db)):
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
+    basket = [book_id for (book_id,) in db.query(OrderItem.book_id).filter(OrderItem.order_id == order.id)]
     db_item = OrderItem(
         order_id=item.order_id,
         book_id=item.book_id,
@@ -104,46 +246,144 @@ async def add_order_item(item: OrderItemCreate, db: Session = Depends(get_db)):
     db.add(db_item)
 
     order.total_price += book.price * item.quantity
+    record_sales(db, {item.book_id: item.quantity}, order.created_at.date())
+    record_added_item(db, item.book_id, basket)
 
     db.commit()
     db.refresh(db_item)
+    books_changed(db, {item.book_id, *basket})
+    publish("order_updated", {"id": order.id, "total_price": order.total_price})
+    publish("stats_delta", {"total_orders": 0, "total_revenue": book.price * item.quantity})
     return db_item
 
 
-@router.put("/bulk-status", response_model=dict)
+def _update_status(db: Session, order_ids: list[int], status: str) -> int:
+    return db.query(Order).filter(Order.id.in_(order_ids)).update(
+        {"status": status},
+        synchronize_session=False
+    )
+
+
+def _delete_orders(db: Session, order_ids: list[int]) -> tuple[dict[int, float], int, set[int]]:
+    """Delete orders returning their items to stock; (totals of the orders deleted, items returned, book ids)"""
+    order_items = db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).all()
+
+    order_days = {}
+    totals = {}
+    for order_id, created_at, total_price in (
+        db.query(Order.id, Order.created_at, Order.total_price).filter(Order.id.in_(order_ids))
+    ):
+        order_days[order_id] = created_at.date()
+        totals[order_id] = total_price
+    returned: dict[date, dict[int, int]] = {}
+    baskets: dict[int, list[int]] = {}
+    for item in order_items:
+        book = db.query(Book).filter(Book.id == item.book_id).first()
+        if book:
+            book.stock += item.quantity
+        by_book = returned.setdefault(order_days[item.order_id], {})
+        by_book[item.book_id] = by_book.get(item.book_id, 0) - item.quantity
+        baskets.setdefault(item.order_id, []).append(item.book_id)
+    for day, quantities in returned.items():
+        record_sales(db, quantities, day)
+    record_co_purchases(db, baskets.values(), sign=-1)
+
+    db.query(Order).filter(Order.id.in_(order_ids)).delete(
+        synchronize_session=False
+    )
+    return totals, len(order_items), {item.book_id for item in order_items}
+
+
+def _orders_deleted(db: Session, totals: dict[int, float], book_ids: set[int]) -> None:
+    books_changed(db, book_ids)
+    if totals:
+        publish("orders_deleted", {"ids": list(totals)})
+        publish("stats_delta", {"total_orders": -len(totals), "total_revenue": -sum(totals.values())})
+
+
+@job_handler("orders.bulk_status")
+def _bulk_status_job(run: JobRun) -> dict:
+    updated = 0
+    for chunk in run.chunks(run.params["order_ids"]):
+        updated += _update_status(run.db, chunk, run.params["status"])
+        run.commit(len(chunk))
+        publish("order_status", {"ids": chunk, "status": run.params["status"]})
+    return {"updated": updated, "status": run.params["status"]}
+
+
+@job_handler("orders.bulk_delete")
+def _bulk_delete_job(run: JobRun) -> dict:
+    deleted = returned_items = 0
+    for chunk in run.chunks(run.params["order_ids"]):
+        totals, chunk_returned, book_ids = _delete_orders(run.db, chunk)
+        run.commit(len(chunk))
+        _orders_deleted(run.db, totals, book_ids)
+        deleted += len(totals)
+        returned_items += chunk_returned
+    return {"deleted": deleted, "returned_items": returned_items}
+
+
+@job_handler("orders.archive")
+def _archive_job(run: JobRun) -> dict:
+    archived = 0
+    for chunk in run.chunks(run.params["order_ids"]):
+        chunk_archived = archive_batch(run.db, chunk)
+        run.commit(len(chunk))
+        publish("orders_archived", {"count": chunk_archived})
+        archived += chunk_archived
+    return {"archived": archived}
+
+
+@router.post("/archive", response_model=dict, responses={202: {"model": JobResponse}})
+async def archive_old_orders(
+    older_than_days: int | None = Query(None, ge=0), db: Session = Depends(get_db)
+):
+    """Move done orders older than the configured age to the archive, as a background job for many"""
+    order_ids = archivable_order_ids(db, archive_cutoff(older_than_days))
+    if len(order_ids) > settings.job_inline_max_items:
+        return job_accepted(submit_job(db, "orders.archive", {"order_ids": order_ids}, len(order_ids)))
+
+    archived = archive_batch(db, order_ids) if order_ids else 0
+    db.commit()
+    if archived:
+        publish("orders_archived", {"count": archived})
+    return {"archived": archived}
+
+
+@router.put("/bulk-status", response_model=dict, responses={202: {"model": JobResponse}})
 async def bulk_update_status(data: BulkStatusUpdate, db: Session = Depends(get_db)):
-    """Update status for multiple orders"""
+    """Update status for multiple orders, as a background job for many"""
     if not data.order_ids:
         raise HTTPException(status_code=400, detail="No order IDs provided")
 
     if data.status not in ["pending", "done"]:
         raise HTTPException(status_code=400, detail="Invalid status. Must be 'pending' or 'done'")
 
-    updated_count = db.query(Order).filter(Order.id.in_(data.order_ids)).update(
-        {"status": data.status},
-        synchronize_session=False
-    )
+    if len(data.order_ids) > settings.job_inline_max_items:
+        return job_accepted(submit_job(
+            db, "orders.bulk_status", {"order_ids": data.order_ids, "status": data.status}, len(data.order_ids)
+        ))
+
+    updated_count = _update_status(db, data.order_ids, data.status)
     db.commit()
+    publish("order_status", {"ids": data.order_ids, "status": data.status})
 
     return {"updated": updated_count, "status": data.status}
 
 
-@router.delete("/bulk-delete", response_model=dict)
+@router.delete("/bulk-delete", response_model=dict, responses={202: {"model": JobResponse}})
 async def bulk_delete(data: BulkDeleteRequest, db: Session = Depends(get_db)):
-    """Delete multiple orders and return items to stock"""
+    """Delete multiple orders and return items to stock, as a background job for many"""
     if not data.order_ids:
         raise HTTPException(status_code=400, detail="No order IDs provided")
 
-    order_items = db.query(OrderItem).filter(OrderItem.order_id.in_(data.order_ids)).all()
-
-    for item in order_items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if book:
-            book.stock += item.quantity
+    if len(data.order_ids) > settings.job_inline_max_items:
+        return job_accepted(submit_job(
+            db, "orders.bulk_delete", {"order_ids": data.order_ids}, len(data.order_ids)
+        ))
 
-    deleted_count = db.query(Order).filter(Order.id.in_(data.order_ids)).delete(
-        synchronize_session=False
-    )
+    totals, returned_items, book_ids = _delete_orders(db, data.order_ids)
     db.commit()
+    _orders_deleted(db, totals, book_ids)
 
-    return {"deleted": deleted_count, "returned_items": len(order_items)}
+    return {"deleted": len(totals), "returned_items": returned_items}
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from src.core.database import get_db
+from src.core.events import books_changed
 from src.models import Publisher
 from src.schemas.publisher import PublisherCreate, PublisherResponse
 
@@ -47,7 +48,9 @@ async def update_publisher(publisher_id: int, publisher: PublisherCreate, db: Se
     db_publisher.name = publisher.name
     db_publisher.address = publisher.address
     db_publisher.contact = publisher.contact
+    book_ids = [book.id for book in db_publisher.books]
     db.commit()
+    books_changed(db, book_ids)
     db.refresh(db_publisher)
     return db_publisher
 
@@ -58,6 +61,8 @@ async def delete_publisher(publisher_id: int, db: Session = Depends(get_db)):
     db_publisher = db.query(Publisher).filter(Publisher.id == publisher_id).first()
     if not db_publisher:
         raise HTTPException(status_code=404, detail="Publisher not found")
+    book_ids = [book.id for book in db_publisher.books]
     db.delete(db_publisher)
     db.commit()
+    books_changed(db, book_ids)
     return None
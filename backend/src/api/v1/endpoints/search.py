@@ -0,0 +1,33 @@
+"""Search endpoints"""
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from src.core.database import get_db
+from src.services.catalog_snapshot import catalog_snapshot
+from src.services.suggest import suggest_index
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+class SuggestionResponse(BaseModel):
+    """One typeahead suggestion"""
+    type: Literal["book", "author", "publisher"]
+    id: int
+    text: str
+    popularity: int
+
+
+@router.get("/suggest", response_model=list[SuggestionResponse])
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_db),
+):
+    """Get in-stock books, authors and publishers with words starting with each word of q, most sold first"""
+    snapshot = catalog_snapshot(db)
+    if snapshot is not None:
+        # Replays other processes' catalog changes into the index
+        snapshot.sync(db)
+    return suggest_index(db).suggest(q, limit)
@@ -1,8 +1,10 @@
 """Stats endpoints"""
 from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from src.core.database import get_db
-from src.models import Book, Order, Author, Genre, Publisher
+from src.models import ArchivedOrder, Book, Order, Author, Genre, Publisher
+from src.models.order_archive import attach_archive
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/stats", tags=["stats"])
@@ -12,6 +14,7 @@ class StatsResponse(BaseModel):
     """Stats response schema"""
     total_books: int
     total_orders: int
+    archived_orders: int
     total_authors: int
     total_genres: int
     total_publishers: int
@@ -22,18 +25,26 @@ class StatsResponse(BaseModel):
 async def get_stats(db: Session = Depends(get_db)):
     """Get all dashboard stats"""
     total_books = db.query(Book).count()
-    total_orders = db.query(Order).count()
+    total_orders, total_revenue = db.execute(
+        select(func.count(), func.coalesce(func.sum(Order.total_price), 0.0)).select_from(Order)
+    ).one()
     total_authors = db.query(Author).count()
     total_genres = db.query(Genre).count()
     total_publishers = db.query(Publisher).count()
 
-    # Calculate total revenue from all orders
-    orders = db.query(Order).all()
-    total_revenue = sum(order.total_price for order in orders) if orders else 0.0
+    # Archived orders still count towards the totals
+    archived_orders = 0
+    if attach_archive(db.connection()):
+        archived_orders, archived_revenue = db.execute(
+            select(func.count(), func.coalesce(func.sum(ArchivedOrder.total_price), 0.0)).select_from(ArchivedOrder)
+        ).one()
+        total_orders += archived_orders
+        total_revenue += archived_revenue
 
     return {
         "total_books": total_books,
         "total_orders": total_orders,
+        "archived_orders": archived_orders,
         "total_authors": total_authors,
         "total_genres": total_genres,
         "total_publishers": total_publishers,
@@ -9,6 +9,10 @@ from src.api.v1.endpoints import (
     orders_router,
     admin_router,
     stats_router,
+    search_router,
+    jobs_router,
+    changes_router,
+    events_router,
 )
 
 api_v1_router = APIRouter()
@@ -21,5 +25,9 @@ api_v1_router.include_router(books_router)
 api_v1_router.include_router(orders_router)
 api_v1_router.include_router(admin_router)
 api_v1_router.include_router(stats_router)
+api_v1_router.include_router(search_router)
+api_v1_router.include_router(jobs_router)
+api_v1_router.include_router(changes_router)
+api_v1_router.include_router(events_router)
 
 __all__ = ["api_v1_router"]
@@ -1,14 +1,86 @@
 """Application configuration"""
+import secrets
+from typing import Literal
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """Application settings"""
-    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, extra="ignore")
 
     app_name: str = "Bookstore API"
     app_version: str = "0.0.1"
     app_description: str = "Bookstore API for MTAB Project"
 
+    # Application database, db/bookstore.db by default. Benchmarks can share an in-memory one with
+    # sqlite:///file:bench?mode=memory&cache=shared&uri=true
+    database_url: str | None = None
+    # "queue" pools up to db_pool_size + db_max_overflow connections; "static" shares one connection
+    # (needed for plain sqlite:// in-memory), "null" connects per checkout, "singleton" one per thread
+    db_pool_class: Literal["queue", "static", "null", "singleton"] = "queue"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # How long a checkout waits for a queue pool connection before failing
+    db_pool_timeout_s: float = 30.0
+    # Test connections before handing them out, and replace ones older than this (-1 never)
+    db_pool_pre_ping: bool = False
+    db_pool_recycle_s: int = -1
+
+    # Add a Server-Timing header (app and db time) to every response
+    server_timing: bool = False
+
+    # Statements slower than this are logged with their query plan (None disables)
+    slow_query_ms: float | None = 200.0
+    # Capture EXPLAIN QUERY PLAN at most once per query shape in this window
+    slow_query_explain_interval_s: float = 300.0
+
+    # Serve shop listings from the in-memory catalog snapshot when it is fresh
+    catalog_snapshot: bool = True
+    # How often the snapshot polls book_changes for writes made by other processes
+    catalog_snapshot_poll_s: float = 1.0
+
+    # How often rolling bestseller windows are recomputed so old sales age out
+    sales_window_refresh_s: float = 3600.0
+
+    # Searches finding fewer in-stock books get typo-tolerant matches appended (0 disables)
+    fuzzy_search_min_results: int = 3
+
+    # Key signing checkout quotes; random per process unless set, so set it when running several workers
+    quote_secret: str = Field(default_factory=lambda: secrets.token_urlsafe(32))
+    # How long a quote's prices are honoured at checkout
+    quote_ttl_s: int = 900
+    # Added on top of book prices, and flat shipping per order, in PLN
+    vat_rate: float = 0.23
+    shipping_price: float = 4.99
+
+    # Queue checkouts to one writer committing up to checkout_batch_size of them per transaction
+    checkout_group_commit: bool = False
+    checkout_batch_size: int = 32
+    # How long the writer waits for a batch to fill after the first checkout arrives
+    checkout_batch_wait_ms: float = 2.0
+
+    # Bulk admin actions on more items than this return 202 and run as background jobs
+    job_inline_max_items: int = 200
+    # Worker threads for background jobs, and items each job commits at a time
+    job_workers: int = 2
+    job_chunk_size: int = 500
+    # Pause between a job's chunks, so writers waiting for the lock get it
+    job_chunk_pause_ms: float = 10.0
+
+    # Done orders older than this many days can be moved to the archive database
+    order_archive_after_days: int = 365
+
+    # GET /changes compacts the change log after this many new records, keeping at most change_log_retain
+    change_log_compact_every: int = 10_000
+    change_log_retain: int = 100_000
+
+    # Live event streams: events a slow client may fall behind before it is told to resync,
+    # idle heartbeat interval, and the reconnect delay suggested to clients
+    sse_queue_size: int = 100
+    sse_heartbeat_s: float = 15.0
+    sse_retry_ms: int = 3000
+
 
 settings = Settings()
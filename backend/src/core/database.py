@@ -1,17 +1,98 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc, make_url
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import NullPool, Pool, QueuePool, SingletonThreadPool, StaticPool
 from typing import Generator
 from pathlib import Path
+import threading
+import time
+
+from src.core.config import settings
+from src.core.metrics import metrics
 
 BASE_DIR = Path(__file__).parent.parent.parent.parent
 DB_DIR = BASE_DIR / "db"
 
-DATABASE_URL = f"sqlite:///{DB_DIR / 'bookstore.db'}"
+DATABASE_URL = settings.database_url or f"sqlite:///{DB_DIR / 'bookstore.db'}"
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def __init__(self, *args, max_overflow: int = 10, **kw):
+        super().__init__(*args, max_overflow=max_overflow, **kw)
+        # Kept for pool_stats, as QueuePool only has it privately; recreate() passes it on
+        self.max_overflow = max_overflow
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def connect(self):
+        start = time.perf_counter()
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.observe_pool_timeout()
+            raise
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+            metrics.observe_pool_wait(time.perf_counter() - start)
+
+    def waiting(self) -> int:
+        """Checkouts in progress, most of them waiting for a connection when the pool is exhausted"""
+        return self._waiting
+
+
+POOL_CLASSES = {
+    "queue": TimedQueuePool,
+    "static": StaticPool,
+    "null": NullPool,
+    "singleton": SingletonThreadPool,
+}
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    """Engine for `url` with the pool configured in settings"""
+    poolclass = POOL_CLASSES[settings.db_pool_class]
+    options = {}
+    if poolclass is TimedQueuePool:
+        options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout_s,
+        }
+    connect_args = {"check_same_thread": False} if make_url(url).get_backend_name() == "sqlite" else {}
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=poolclass,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_s,
+        **options,
+    )
+
+
+def pool_stats(pool: Pool) -> dict:
+    """Current connections of a pool; only queue pools have a size and overflow"""
+    if not isinstance(pool, TimedQueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negative while fewer than `size` connections were ever opened
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool.max_overflow,
+        "waiting": pool.waiting(),
+    }
+
+
+engine = create_db_engine()
+# Read on every scrape, as engine.dispose() replaces the pool
+metrics.watch_pool(lambda: pool_stats(engine.pool))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -27,14 +108,29 @@ def get_db() -> Generator:
         db.close()
 
 
+def ensure_indexes(bind=None):
+    """Create indexes declared on the models that an existing database lacks.
+
+    `create_all` only creates indexes together with new tables, so indexes
+    added to a model later would otherwise never reach existing databases.
+    """
+    bind = bind or engine
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
 def create_tables():
     """Create all tables in the database"""
-    DB_DIR.mkdir(exist_ok=True)
+    database = engine.url.database
+    if engine.url.get_backend_name() == "sqlite" and database and database != ":memory:" and not database.startswith("file:"):
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
 
     # Import all models BEFORE creating tables to register them with Base
     from src.models.admin import Admin
 
     Base.metadata.create_all(bind=engine)
+    ensure_indexes()
 
     # Create default admin user if not exists
     db = SessionLocal()
@@ -0,0 +1,46 @@
+"""In-process catalog change notifications.
+
+Write paths call `books_changed` after committing, with the ids of the books
+they touched. Anything that caches book data registers a listener with
+`on_books_changed` and drops or refreshes just those entries.
+
+`catalog_reset` is for when the changed ids are unknown, e.g. after the
+book_changes log was compacted past what a process had seen; listeners
+registered with `on_catalog_reset` reload everything.
+"""
+from typing import Callable, Iterable
+
+from sqlalchemy.orm import Session
+
+BooksChangedListener = Callable[[Session, set[int]], None]
+CatalogResetListener = Callable[[Session], None]
+
+_books_changed_listeners: list[BooksChangedListener] = []
+_catalog_reset_listeners: list[CatalogResetListener] = []
+
+
+def on_books_changed(listener: BooksChangedListener) -> BooksChangedListener:
+    """Register a listener; usable as a decorator"""
+    _books_changed_listeners.append(listener)
+    return listener
+
+
+def books_changed(db: Session, book_ids: Iterable[int]) -> None:
+    """Notify listeners that the given books were created, updated or deleted"""
+    ids = set(book_ids)
+    if not ids:
+        return
+    for listener in _books_changed_listeners:
+        listener(db, ids)
+
+
+def on_catalog_reset(listener: CatalogResetListener) -> CatalogResetListener:
+    """Register a listener for full reloads; usable as a decorator"""
+    _catalog_reset_listeners.append(listener)
+    return listener
+
+
+def catalog_reset(db: Session) -> None:
+    """Tell listeners to reload all book data"""
+    for listener in _catalog_reset_listeners:
+        listener(db)
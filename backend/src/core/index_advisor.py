@@ -0,0 +1,237 @@
+"""Index advisor: EXPLAIN every query the API endpoints issue.
+
+Drives the v1 API in-process through a fixed list of probe requests that
+touch every endpoint, records each distinct statement shape per route, runs
+`EXPLAIN QUERY PLAN` for it and flags full table scans and temp B-trees.
+
+    python -m src.core.index_advisor                      # fresh in-memory schema
+    python -m src.core.index_advisor --database-url sqlite:///../db/bookstore.db
+    python -m src.core.index_advisor --strict             # exit 1 on findings
+
+Probes that write run against an in-memory copy when a database URL is
+given; a fresh schema is seeded with one row of each entity first. Scans of
+subquery co-routines are not table scans and are not flagged.
+"""
+import argparse
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.database import Base, ensure_indexes, get_db
+from src.core.metrics import MetricsMiddleware, current_request
+from src.core.slow_queries import EXPLAINABLE, explain, is_full_scan, query_shape, uses_temp_btree
+
+SEED_REQUESTS = [
+    ("POST", "/api/v1/publishers/", {"name": "Advisor Publisher"}),
+    ("POST", "/api/v1/authors/", {"name": "Advisor Author"}),
+    ("POST", "/api/v1/genres/", {"name": "Advisor Genre"}),
+    ("POST", "/api/v1/books/", {
+        "title": "Advisor Book", "price": 10.0, "stock": 100, "isbn": "advisor-isbn",
+        "publisher_id": 1, "author_ids": [1], "genre_ids": [1],
+    }),
+]
+
+PROBE_REQUESTS = [
+    ("GET", "/api/v1/authors/", None),
+    ("GET", "/api/v1/authors/1", None),
+    ("GET", "/api/v1/genres/", None),
+    ("GET", "/api/v1/genres/1", None),
+    ("GET", "/api/v1/publishers/", None),
+    ("GET", "/api/v1/publishers/1", None),
+    ("GET", "/api/v1/books/", None),
+    ("GET", "/api/v1/books/?page=3&limit=24", None),
+    ("GET", "/api/v1/books/?search=adv", None),
+    ("GET", "/api/v1/books/?genre_ids=1&genre_ids=2", None),
+    ("GET", "/api/v1/books/?author_ids=1", None),
+    ("GET", "/api/v1/books/?publisher_ids=1&min_price=5&max_price=50", None),
+    ("GET", "/api/v1/books/?genre_ids=1&author_ids=1&publisher_ids=1&min_price=5", None),
+    ("GET", "/api/v1/books/?search=adv&sort=price_desc", None),
+    ("GET", "/api/v1/books/?search=adv&sort=newest&genre_ids=1", None),
+    ("GET", "/api/v1/books/?search=adv&sort=bestselling&limit=1", None),
+    ("GET", "/api/v1/books/?search=advnture&genre_ids=1&min_price=1", None),
+    ("GET", "/api/v1/books/bestsellers", None),
+    ("GET", "/api/v1/books/bestsellers?window=7d&genre_id=1", None),
+    ("GET", "/api/v1/books/metadata", None),
+    ("GET", "/api/v1/books/1", None),
+    ("GET", "/api/v1/books/batch?ids=1&ids=2", None),
+    ("POST", "/api/v1/books/batch", {"ids": [2, 1]}),
+    ("GET", "/api/v1/books/1/also-bought", None),
+    ("GET", "/api/v1/search/suggest?q=adv", None),
+    ("PUT", "/api/v1/books/1", {
+        "title": "Advisor Book", "price": 11.0, "stock": 100, "isbn": "advisor-isbn",
+        "publisher_id": 1, "author_ids": [1], "genre_ids": [1],
+    }),
+    ("POST", "/api/v1/orders/quote", {"items": [{"book_id": 1, "quantity": 1}, {"book_id": 2, "quantity": 1}]}),
+    ("POST", "/api/v1/orders/", {
+        "customer_name": "Advisor", "email": "advisor@example.com", "address": "1 Street",
+        "postal_code": "00001", "total_price": 11.0, "items": [{"book_id": 1, "quantity": 1}],
+    }),
+    ("GET", "/api/v1/orders/", None),
+    ("GET", "/api/v1/orders/1", None),
+    ("POST", "/api/v1/orders/items", {"order_id": 1, "book_id": 1, "quantity": 1}),
+    ("PUT", "/api/v1/orders/bulk-status", {"order_ids": [1], "status": "done"}),
+    ("POST", "/api/v1/orders/", {
+        "customer_name": "Advisor", "email": "advisor@example.com", "address": "1 Street",
+        "postal_code": "00001", "total_price": 11.0, "items": [{"book_id": 1, "quantity": 1}],
+    }),
+    ("POST", "/api/v1/orders/archive?older_than_days=0", None),
+    ("GET", "/api/v1/orders/?include_archived=true", None),
+    ("GET", "/api/v1/orders/1?include_archived=true", None),
+    ("GET", "/api/v1/stats/", None),
+    ("GET", "/api/v1/jobs/", None),
+    ("GET", "/api/v1/jobs/1", None),
+    ("GET", "/api/v1/changes/", None),
+    ("GET", "/api/v1/changes/?since=0", None),
+    ("GET", "/api/v1/changes/?since=0&types=book&types=order&limit=2", None),
+    ("PUT", "/api/v1/authors/1", {"name": "Advisor Author"}),
+    ("PUT", "/api/v1/publishers/1", {"name": "Advisor Publisher"}),
+    ("DELETE", "/api/v1/orders/bulk-delete", {"order_ids": [2]}),
+    ("DELETE", "/api/v1/books/bulk-delete", {"book_ids": [1]}),
+    ("DELETE", "/api/v1/authors/1", None),
+    ("DELETE", "/api/v1/genres/1", None),
+    ("DELETE", "/api/v1/publishers/1", None),
+]
+
+
+@dataclass
+class Finding:
+    """One statement shape issued by a route, with its plan"""
+    route: str
+    shape: str
+    plan: list[str] = field(default_factory=list)
+    full_scans: list[str] = field(default_factory=list)
+    temp_btrees: list[str] = field(default_factory=list)
+
+    @property
+    def unfiltered(self) -> bool:
+        """Listing queries without WHERE are expected to scan"""
+        return " WHERE " not in self.shape
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.temp_btrees or (self.full_scans and not self.unfiltered))
+
+
+def _table_scans(plan: list[str]) -> list[str]:
+    """Full-scan plan lines, excluding scans of CO-ROUTINE / MATERIALIZE subqueries"""
+    lines = [line.strip() for line in plan]
+    subqueries = {line.split()[-1] for line in lines if line.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    return [line for line in lines if is_full_scan(line) and line.split()[-1] not in subqueries]
+
+
+def _engine_for(database_url: str | None):
+    if database_url is None:
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        return engine, True
+
+    # Work on an in-memory copy so probe writes never touch the real database
+    source = sqlite3.connect(make_url(database_url).database)
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.connect() as conn:
+        source.backup(conn.connection.driver_connection)
+    source.close()
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+    return engine, False
+
+
+def analyze(database_url: str | None = None) -> list[Finding]:
+    """Run all probes and return one finding per (route, statement shape)"""
+    # Imported here so the endpoint modules register their routes on the real router
+    from src.api.v1.routes.router import api_v1_router
+
+    engine, needs_seed = _engine_for(database_url)
+    statements: dict[tuple[str, str], tuple[str, object]] = {}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        request = current_request.get()
+        if request is None or executemany or not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return
+        statements.setdefault((request.route, query_shape(statement)), (statement, parameters))
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(api_v1_router, prefix="/api/v1")
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    with TestClient(app) as client:
+        for method, path, body in (SEED_REQUESTS if needs_seed else []) + PROBE_REQUESTS:
+            client.request(method, path, json=body)
+
+    findings = []
+    with engine.connect() as conn:
+        dbapi_connection = conn.connection.driver_connection
+        for (route, shape), (statement, parameters) in sorted(statements.items()):
+            plan = explain(dbapi_connection, statement, parameters)
+            findings.append(Finding(
+                route=route,
+                shape=shape,
+                plan=plan,
+                full_scans=_table_scans(plan),
+                temp_btrees=[line.strip() for line in plan if uses_temp_btree(line.strip())],
+            ))
+    engine.dispose()
+    return findings
+
+
+def print_report(findings: list[Finding], verbose: bool = False) -> None:
+    current_route = None
+    for finding in findings:
+        if not (finding.flagged or verbose):
+            continue
+        if finding.route != current_route:
+            current_route = finding.route
+            print(f"\n{current_route}")
+        if finding.flagged:
+            label = "TEMP B-TREE" if finding.temp_btrees and not finding.full_scans else "FULL SCAN"
+        else:
+            label = "unfiltered" if finding.full_scans else "ok"
+        print(f"  [{label}] {finding.shape}")
+        for line in finding.plan:
+            print(f"      {line}")
+
+    flagged = sum(1 for finding in findings if finding.flagged)
+    print(f"\n{len(findings)} statement shapes analyzed, {flagged} flagged")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag full table scans and temp B-trees in endpoint queries")
+    parser.add_argument("--database-url", help="analyze plans against a copy of this SQLite database")
+    parser.add_argument("--verbose", action="store_true", help="also list statements with no findings")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 if anything is flagged")
+    args = parser.parse_args()
+
+    findings = analyze(args.database_url)
+    print_report(findings, verbose=args.verbose)
+    if args.strict and any(finding.flagged for finding in findings):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Request and SQL instrumentation, rendered in Prometheus text format.
+
+`MetricsMiddleware` times every HTTP request and attaches a `RequestStats` to
+the current context. SQLAlchemy cursor hooks registered on all engines add
+each statement's count and duration to it, so per-route SQL cost can be
+tracked alongside latency. Caches report lookups through `cache_lookup`.
+"""
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+@dataclass
+class RequestStats:
+    """SQL work done while serving one request"""
+    scope: dict | None = None
+    statements: int = 0
+    sql_seconds: float = 0.0
+
+    @property
+    def route(self) -> str:
+        """Route template once routing has run, raw path before that"""
+        if self.scope is None:
+            return "unknown"
+        route = self.scope.get("route")
+        return route.path if route is not None else self.scope["path"]
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram matching the Prometheus exposition format"""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def render(self, name: str, labels: dict[str, str]) -> list[str]:
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}")
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {self.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(self.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store for all exported metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool_stats: Callable[[], dict] | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests: dict[tuple[str, str, int], int] = {}
+            self.request_latency: dict[tuple[str, str], Histogram] = {}
+            self.request_statements: dict[tuple[str, str], Histogram] = {}
+            self.request_sql_time: dict[tuple[str, str], Histogram] = {}
+            self.statements_total = 0
+            self.sql_seconds_total = 0.0
+            self.pool_wait = Histogram(LATENCY_BUCKETS)
+            self.pool_timeouts = 0
+            self.cache: dict[str, list[int]] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.request_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.request_statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self.request_sql_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(stats.sql_seconds)
+
+    def observe_statement(self, seconds: float) -> None:
+        with self._lock:
+            self.statements_total += 1
+            self.sql_seconds_total += seconds
+
+    def observe_pool_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.pool_wait.observe(seconds)
+
+    def observe_pool_timeout(self) -> None:
+        with self._lock:
+            self.pool_timeouts += 1
+
+    def watch_pool(self, stats: Callable[[], dict]) -> None:
+        """Export the connection counts `stats` returns (see database.pool_stats) as gauges"""
+        self._pool_stats = stats
+
+    def cache_lookup(self, cache: str, hit: bool) -> None:
+        with self._lock:
+            counts = self.cache.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP bookstore_http_requests_total HTTP requests by route and status.",
+                "# TYPE bookstore_http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                labels = {"method": method, "route": route, "status": str(status)}
+                lines.append(f"bookstore_http_requests_total{_labels(labels)} {count}")
+
+            for name, help_text, histograms in (
+                ("bookstore_http_request_duration_seconds", "HTTP request latency.", self.request_latency),
+                ("bookstore_sql_statements_per_request", "SQL statements executed per request.", self.request_statements),
+                ("bookstore_sql_seconds_per_request", "Time spent in SQL per request.", self.request_sql_time),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), histogram in sorted(histograms.items()):
+                    lines.extend(histogram.render(name, {"method": method, "route": route}))
+
+            lines += [
+                "# HELP bookstore_sql_statements_total SQL statements executed.",
+                "# TYPE bookstore_sql_statements_total counter",
+                f"bookstore_sql_statements_total {self.statements_total}",
+                "# HELP bookstore_sql_seconds_total Time spent executing SQL.",
+                "# TYPE bookstore_sql_seconds_total counter",
+                f"bookstore_sql_seconds_total {_number(self.sql_seconds_total)}",
+                "# HELP bookstore_db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+                "# TYPE bookstore_db_pool_checkout_wait_seconds histogram",
+                *self.pool_wait.render("bookstore_db_pool_checkout_wait_seconds", {}),
+                "# HELP bookstore_db_pool_timeouts_total Checkouts that gave up waiting for a pooled connection.",
+                "# TYPE bookstore_db_pool_timeouts_total counter",
+                f"bookstore_db_pool_timeouts_total {self.pool_timeouts}",
+            ]
+            if self._pool_stats is not None:
+                lines += _pool_gauges(self._pool_stats())
+            lines += [
+                "# HELP bookstore_cache_requests_total Cache lookups by result.",
+                "# TYPE bookstore_cache_requests_total counter",
+            ]
+            for cache, (hits, misses) in sorted(self.cache.items()):
+                lines.append(f"bookstore_cache_requests_total{_labels({'cache': cache, 'result': 'hit'})} {hits}")
+                lines.append(f"bookstore_cache_requests_total{_labels({'cache': cache, 'result': 'miss'})} {misses}")
+            lines += [
+                "# HELP bookstore_cache_hit_ratio Share of cache lookups that were hits.",
+                "# TYPE bookstore_cache_hit_ratio gauge",
+            ]
+            for cache, (hits, misses) in sorted(self.cache.items()):
+                ratio = hits / (hits + misses) if hits + misses else 0.0
+                lines.append(f"bookstore_cache_hit_ratio{_labels({'cache': cache})} {_number(ratio)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pool_gauges(stats: dict) -> list[str]:
+    lines = []
+    for key, help_text in (
+        ("size", "Connections the pool keeps open."),
+        ("checked_out", "Pooled connections in use."),
+        ("checked_in", "Idle pooled connections."),
+        ("overflow", "Connections open beyond the pool size."),
+        ("max_overflow", "Connections allowed beyond the pool size."),
+        ("waiting", "Checkouts in progress, waiting for a connection when the pool is exhausted."),
+    ):
+        if key in stats:
+            lines += [
+                f"# HELP bookstore_db_pool_{key} {help_text}",
+                f"# TYPE bookstore_db_pool_{key} gauge",
+                f"bookstore_db_pool_{key} {stats[key]}",
+            ]
+    return lines
+
+
+metrics = MetricsRegistry()
+
+
+# Start times live on the execution context, which is dropped with a failed statement;
+# kept on the connection they would pile up there whenever after_cursor_execute does not run
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "metrics_query_start", None)
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    metrics.observe_statement(seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += seconds
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and SQL cost.
+
+    When `settings.server_timing` is on, a `Server-Timing` header with the
+    application and database time is added to every response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    value = (
+                        f"app;dur={elapsed_ms:.2f}, "
+                        f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.statements} queries"'
+                    )
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.observe_request(
+                scope["method"],
+                stats.route if "route" in scope else "unmatched",
+                status,
+                time.perf_counter() - start,
+                stats,
+            )
+            current_request.reset(token)
@@ -0,0 +1,169 @@
+"""Slow-query log with EXPLAIN QUERY PLAN capture.
+
+Statements slower than `settings.slow_query_ms` are logged with their route,
+bound-parameter shapes and duration, and aggregated by query shape (the SQL
+with literals and IN-lists collapsed). The first slow occurrence of a shape,
+and then at most one per `settings.slow_query_explain_interval_s`, also
+captures `EXPLAIN QUERY PLAN` so full scans and temp B-trees are visible.
+"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+from src.core.metrics import current_request
+
+logger = logging.getLogger(__name__)
+
+MAX_SHAPES = 500
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_whitespace = re.compile(r"\s+")
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number_literal = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_in_list = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_full_scan = re.compile(r"^SCAN (?!CONSTANT ROW)\S+(?: AS \S+)?$")
+
+
+def query_shape(statement: str) -> str:
+    """Normalize a statement so executions differing only in literals share a shape"""
+    shape = _whitespace.sub(" ", statement).strip()
+    shape = _string_literal.sub("?", shape)
+    shape = _number_literal.sub("?", shape)
+    return _in_list.sub("(?...)", shape)
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Describe bound parameters by type only, never by value"""
+    if executemany:
+        batch = list(parameters or ())
+        first = parameter_shape(batch[0], False) if batch else "()"
+        return f"{len(batch)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+def is_full_scan(detail: str) -> bool:
+    """True for plan lines that scan a whole table without an index"""
+    return bool(_full_scan.match(detail))
+
+
+def uses_temp_btree(detail: str) -> bool:
+    """True for plan lines that build a temporary B-tree for ORDER BY, GROUP BY or DISTINCT"""
+    return detail.startswith("USE TEMP B-TREE")
+
+
+def explain(dbapi_connection, statement: str, parameters) -> list[str]:
+    """Run EXPLAIN QUERY PLAN on a DBAPI connection; nested plan steps are indented"""
+    rows = dbapi_connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    depth = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node_id] + detail)
+    return plan
+
+
+@dataclass
+class QueryShapeStats:
+    """Aggregated slow executions of one query shape"""
+    shape: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+    last_route: str = ""
+    parameters: str = ""
+    plan: list[str] = field(default_factory=list)
+    full_scan: bool = False
+    temp_btree: bool = False
+    explained_at: float = 0.0
+
+
+class SlowQueryLog:
+    """Bounded, thread-safe store of slow query shapes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.shapes: dict[str, QueryShapeStats] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.shapes = {}
+
+    def record(self, cursor, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        elapsed_ms = seconds * 1000
+        shape = query_shape(statement)
+        request = current_request.get()
+        route = request.route if request is not None else "background"
+        params = parameter_shape(parameters, executemany)
+
+        with self._lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                if len(self.shapes) >= MAX_SHAPES:
+                    fastest = min(self.shapes.values(), key=lambda s: s.max_ms)
+                    del self.shapes[fastest.shape]
+                stats = self.shapes[shape] = QueryShapeStats(shape=shape)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.last_ms = elapsed_ms
+            stats.last_route = route
+            stats.parameters = params
+            now = time.monotonic()
+            should_explain = (
+                not executemany
+                and shape.upper().startswith(EXPLAINABLE)
+                and (not stats.explained_at or now - stats.explained_at >= settings.slow_query_explain_interval_s)
+            )
+            if should_explain:
+                stats.explained_at = now
+
+        plan = None
+        if should_explain:
+            try:
+                plan = explain(cursor.connection, statement, parameters)
+            except Exception as e:
+                logger.debug("EXPLAIN QUERY PLAN failed for %s: %s", shape, e)
+            if plan is not None:
+                with self._lock:
+                    stats.plan = plan
+                    stats.full_scan = any(is_full_scan(line.strip()) for line in plan)
+                    stats.temp_btree = any(uses_temp_btree(line.strip()) for line in plan)
+
+        logger.warning(
+            "Slow query %.1fms route=%s params=%s sql=%s%s",
+            elapsed_ms, route, params, shape,
+            "".join(f"\n    {line}" for line in plan) if plan else "",
+        )
+
+    def top(self, limit: int, order_by: str = "max_ms") -> list[QueryShapeStats]:
+        with self._lock:
+            return sorted(self.shapes.values(), key=lambda s: getattr(s, order_by), reverse=True)[:limit]
+
+
+slow_query_log = SlowQueryLog()
+
+
+# Timed on the execution context like the metrics hooks, so failed statements leave nothing behind
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.slow_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "slow_query_start", None)
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    if settings.slow_query_ms is not None and seconds * 1000 >= settings.slow_query_ms:
+        slow_query_log.record(cursor, statement, parameters, executemany, seconds)
@@ -2,8 +2,15 @@ from src.models.author import Author
 from src.models.publisher import Publisher
 from src.models.genre import Genre
 from src.models.book import Book
+from src.models.book_search import BookSearch
+from src.models.book_change import BookChange
+from src.models.change_log import ChangeLog, ChangeLogHorizon
+from src.models.book_sales_daily import BookSalesDaily
+from src.models.book_co_purchase import BookCoPurchase
 from src.models.order import Order
 from src.models.order_item import OrderItem
+from src.models.order_archive import ArchivedOrder, ArchivedOrderItem
 from src.models.admin import Admin
+from src.models.job import Job
 
-__all__ = ["Author", "Publisher", "Genre", "Book", "Order", "OrderItem", "Admin"]
+__all__ = ["Author", "Publisher", "Genre", "Book", "BookSearch", "BookChange", "ChangeLog", "ChangeLogHorizon", "BookSalesDaily", "BookCoPurchase", "Order", "OrderItem", "ArchivedOrder", "ArchivedOrderItem", "Admin", "Job"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from src.core.database import Base
 
@@ -7,6 +7,8 @@ book_author = Table(
     Base.metadata,
     Column("book_id", Integer, ForeignKey("books.id"), primary_key=True),
     Column("author_id", Integer, ForeignKey("authors.id"), primary_key=True),
+    # The primary key leads with book_id; this serves author -> books lookups
+    Index("ix_book_author_author_id", "author_id", "book_id"),
 )
 
 book_genre = Table(
@@ -14,6 +16,8 @@ book_genre = Table(
     Base.metadata,
     Column("book_id", Integer, ForeignKey("books.id"), primary_key=True),
     Column("genre_id", Integer, ForeignKey("genres.id"), primary_key=True),
+    # The primary key leads with book_id; this serves genre -> books lookups
+    Index("ix_book_genre_genre_id", "genre_id", "book_id"),
 )
 
 
@@ -23,11 +27,11 @@ class Book(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
-    price = Column(Float, nullable=False)
-    stock = Column(Integer, default=0)
+    price = Column(Float, nullable=False, index=True)
+    stock = Column(Integer, default=0, index=True)
     isbn = Column(String(20), unique=True, nullable=True, index=True)
     published_year = Column(Integer, nullable=True)
-    publisher_id = Column(Integer, ForeignKey("publishers.id"), nullable=False)
+    publisher_id = Column(Integer, ForeignKey("publishers.id"), nullable=False, index=True)
 
     publisher = relationship("Publisher", back_populates="books")
     authors = relationship("Author", secondary=book_author, back_populates="books")
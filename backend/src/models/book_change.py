@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, event
+from src.core.database import Base
+
+
+class BookChange(Base):
+    """Append-only sequence of book ids whose listing data changed.
+
+    Written by SQLite triggers in the same transaction as the change, from any
+    process, so in-memory catalog structures can replay what they missed.
+    AUTOINCREMENT keeps seq gapless for committed rows; a gap after a
+    subscriber's last seq therefore means compaction dropped changes it needs.
+    """
+    __tablename__ = "book_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    book_id = Column(Integer, nullable=False)
+
+
+TRIGGERS = {
+    "book_changes_books_insert": ("AFTER INSERT ON books", "VALUES (NEW.id)"),
+    "book_changes_books_update": ("AFTER UPDATE ON books", "VALUES (NEW.id)"),
+    "book_changes_books_delete": ("AFTER DELETE ON books", "VALUES (OLD.id)"),
+    "book_changes_book_author_insert": ("AFTER INSERT ON book_author", "VALUES (NEW.book_id)"),
+    "book_changes_book_author_delete": ("AFTER DELETE ON book_author", "VALUES (OLD.book_id)"),
+    "book_changes_book_genre_insert": ("AFTER INSERT ON book_genre", "VALUES (NEW.book_id)"),
+    "book_changes_book_genre_delete": ("AFTER DELETE ON book_genre", "VALUES (OLD.book_id)"),
+    "book_changes_authors_update": (
+        "AFTER UPDATE OF name ON authors", "SELECT book_id FROM book_author WHERE author_id = NEW.id",
+    ),
+    "book_changes_genres_update": (
+        "AFTER UPDATE OF name ON genres", "SELECT book_id FROM book_genre WHERE genre_id = NEW.id",
+    ),
+    # Not listing data, but book responses cached by id include the publisher's name
+    "book_changes_publishers_update": (
+        "AFTER UPDATE OF name ON publishers", "SELECT id FROM books WHERE publisher_id = NEW.id",
+    ),
+    # Sales only touch book_search; its listener runs first and may have rebuilt the table
+    "book_changes_units_sold_update": ("AFTER UPDATE OF units_sold ON book_search", "VALUES (NEW.book_id)"),
+}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_book_change_triggers(target, connection, **kw):
+    """Create the triggers that append to book_changes"""
+    if connection.dialect.name != "sqlite":
+        return
+    for name, (timing, source) in TRIGGERS.items():
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {name} {timing} BEGIN INSERT INTO book_changes (book_id) {source}; END"
+        )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer
+from src.core.database import Base
+
+
+class BookCoPurchase(Base):
+    """Number of orders containing both books, stored in both directions.
+
+    Maintained by the order write paths in the order's transaction and
+    rebuilt offline by `python -m src.services.also_bought`.
+    """
+    __tablename__ = "book_co_purchases"
+    __table_args__ = (
+        # Top-K of one book is a short backward range scan
+        Index("ix_book_co_purchases_book_id_count", "book_id", "count", "other_id"),
+    )
+
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    other_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
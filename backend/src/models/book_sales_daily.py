@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, event
+from src.core.database import Base
+from src.models.order_archive import attach_archive
+
+
+class BookSalesDaily(Base):
+    """Units sold per book and UTC day of the order.
+
+    Rolling sales windows are recomputed from these rollups instead of from
+    raw order items. Written next to book_search.units_sold by the order
+    write paths, in the same transaction.
+    """
+    __tablename__ = "book_sales_daily"
+    __table_args__ = (
+        Index("ix_book_sales_daily_day", "day"),
+    )
+
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+
+
+def backfill_sales_daily(connection) -> None:
+    """Roll up the items of existing orders, archived ones included, for orders written around the app"""
+    items = (
+        "SELECT order_items.book_id, orders.created_at, order_items.quantity"
+        " FROM order_items JOIN orders ON orders.id = order_items.order_id"
+    )
+    if attach_archive(connection):
+        items += (
+            " UNION ALL SELECT i.book_id, o.created_at, i.quantity"
+            " FROM archive.order_items i JOIN archive.orders o ON o.id = i.order_id"
+        )
+    connection.exec_driver_sql(
+        "INSERT INTO book_sales_daily (book_id, day, units)"
+        " SELECT book_id, date(created_at), sum(quantity)"
+        f" FROM ({items})"
+        " GROUP BY book_id, date(created_at)"
+        " ON CONFLICT (book_id, day) DO UPDATE SET units = excluded.units"
+    )
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_book_sales_daily_rollups(target, connection, **kw):
+    """Backfill rollups when the table is empty but orders exist"""
+    if connection.dialect.name != "sqlite":
+        return
+    if connection.exec_driver_sql("SELECT 1 FROM book_sales_daily LIMIT 1").first() is None:
+        backfill_sales_daily(connection)
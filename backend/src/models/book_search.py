@@ -0,0 +1,220 @@
+from sqlalchemy import Boolean, Column, Float, Index, Integer, String, Text, event
+from src.core.database import Base
+from src.models.order_archive import attach_archive
+
+# Books without a year sort as oldest
+YEAR_UNKNOWN = -1
+
+
+class BookSearch(Base):
+    """Denormalized, read-only projection of a book for shop listing and search.
+
+    One row per book, maintained by the SQLite triggers below; never written
+    through the ORM. Author and genre ids are packed as ",1,12," so a filter
+    is a LIKE on one column instead of a join through the association table.
+    """
+    __tablename__ = "book_search"
+    # One index per listing sort order; rowid (book_id) is the implicit last column
+    # of each, so (key, book_id) keyset pages are index range scans
+    __table_args__ = (
+        Index("ix_book_search_price", "in_stock", "price"),
+        Index("ix_book_search_sort_title", "in_stock", "sort_title"),
+        Index("ix_book_search_published_year", "in_stock", "published_year"),
+        Index("ix_book_search_units_sold", "in_stock", "units_sold"),
+        Index("ix_book_search_units_sold_7d", "in_stock", "units_sold_7d"),
+        Index("ix_book_search_units_sold_30d", "in_stock", "units_sold_30d"),
+    )
+
+    book_id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    # lower(title) as SQLite computes it, so in-memory and SQL title orders agree
+    sort_title = Column(String(255), nullable=False)
+    price = Column(Float, nullable=False)
+    # YEAR_UNKNOWN when the book has no year, so "newest" needs no NULL handling
+    published_year = Column(Integer, nullable=False)
+    # Index entries are (in_stock, rowid), so in-stock listings page in book_id order
+    in_stock = Column(Boolean, nullable=False, index=True)
+    publisher_id = Column(Integer, nullable=False)
+    author_ids = Column(Text, nullable=False, default=",")
+    genre_ids = Column(Text, nullable=False, default=",")
+    author_names = Column(Text, nullable=False, default="")
+    genre_names = Column(Text, nullable=False, default="")
+    # " " + lower(title) + " " + lower(author names), for word-prefix matching
+    search_text = Column(Text, nullable=False, default="")
+    description_text = Column(Text, nullable=False, default="")
+    # Lifetime and rolling-window units sold; maintained by src.services.sales in
+    # the order's transaction, windows also recomputed from daily rollups
+    units_sold = Column(Integer, nullable=False, default=0)
+    units_sold_7d = Column(Integer, nullable=False, server_default="0")
+    units_sold_30d = Column(Integer, nullable=False, server_default="0")
+
+
+_AUTHOR_NAMES = (
+    "(SELECT group_concat(authors.name, ', ') FROM book_author"
+    " JOIN authors ON authors.id = book_author.author_id WHERE book_author.book_id = b.id)"
+)
+_GENRE_NAMES = (
+    "(SELECT group_concat(genres.name, ', ') FROM book_genre"
+    " JOIN genres ON genres.id = book_genre.genre_id WHERE book_genre.book_id = b.id)"
+)
+
+# An upsert, so that units_sold, which is maintained by the order write paths,
+# survives refreshes; it is only computed when a row is first inserted
+REFRESH_SQL = f"""
+INSERT INTO book_search (
+    book_id, title, sort_title, price, published_year, in_stock, publisher_id, author_ids, genre_ids,
+    author_names, genre_names, search_text, description_text, units_sold
+)
+SELECT
+    b.id, b.title, lower(b.title), b.price, coalesce(b.published_year, {YEAR_UNKNOWN}),
+    coalesce(b.stock, 0) > 0, b.publisher_id,
+    coalesce((SELECT ',' || group_concat(author_id, ',') || ',' FROM book_author WHERE book_id = b.id), ','),
+    coalesce((SELECT ',' || group_concat(genre_id, ',') || ',' FROM book_genre WHERE book_id = b.id), ','),
+    coalesce({_AUTHOR_NAMES}, ''),
+    coalesce({_GENRE_NAMES}, ''),
+    ' ' || lower(b.title) || ' ' || lower(coalesce({_AUTHOR_NAMES}, '')),
+    lower(coalesce(b.description, '')),
+    {{units_sold}}
+FROM books AS b
+WHERE {{condition}}
+ON CONFLICT (book_id) DO UPDATE SET
+    title = excluded.title,
+    sort_title = excluded.sort_title,
+    price = excluded.price,
+    published_year = excluded.published_year,
+    in_stock = excluded.in_stock,
+    publisher_id = excluded.publisher_id,
+    author_ids = excluded.author_ids,
+    genre_ids = excluded.genre_ids,
+    author_names = excluded.author_names,
+    genre_names = excluded.genre_names,
+    search_text = excluded.search_text,
+    description_text = excluded.description_text
+"""
+
+# Bulk order deletes leave their items behind, so only items of existing orders count
+UNITS_SOLD_SQL = (
+    "(SELECT coalesce(sum(order_items.quantity), 0) FROM order_items"
+    " JOIN orders ON orders.id = order_items.order_id WHERE order_items.book_id = {book_id})"
+)
+ARCHIVED_UNITS_SOLD_SQL = (
+    "(SELECT coalesce(sum(i.quantity), 0) FROM archive.order_items i"
+    " JOIN archive.orders o ON o.id = i.order_id WHERE i.book_id = {book_id})"
+)
+
+
+def _units_sold(book_id: str, archived: bool) -> str:
+    """Units sold expression for book_id, counting archived orders when the archive is attached"""
+    units_sold = UNITS_SOLD_SQL.format(book_id=book_id)
+    if archived:
+        units_sold = f"{units_sold} + {ARCHIVED_UNITS_SOLD_SQL.format(book_id=book_id)}"
+    return units_sold
+
+
+def _refresh(condition: str, units_sold: str = "0") -> str:
+    """Upsert the rows of books matching condition; units_sold only applies to new rows"""
+    return REFRESH_SQL.format(condition=condition, units_sold=units_sold)
+
+
+TRIGGERS = {
+    "book_search_books_insert": ("AFTER INSERT ON books", _refresh("b.id = NEW.id")),
+    "book_search_books_update": ("AFTER UPDATE ON books", _refresh("b.id = NEW.id")),
+    "book_search_books_delete": ("AFTER DELETE ON books", "DELETE FROM book_search WHERE book_id = OLD.id"),
+    "book_search_book_author_insert": (
+        "AFTER INSERT ON book_author", _refresh("b.id = NEW.book_id"),
+    ),
+    "book_search_book_author_delete": (
+        "AFTER DELETE ON book_author", _refresh("b.id = OLD.book_id"),
+    ),
+    "book_search_book_genre_insert": (
+        "AFTER INSERT ON book_genre", _refresh("b.id = NEW.book_id"),
+    ),
+    "book_search_book_genre_delete": (
+        "AFTER DELETE ON book_genre", _refresh("b.id = OLD.book_id"),
+    ),
+    "book_search_authors_update": (
+        "AFTER UPDATE OF name ON authors",
+        _refresh("b.id IN (SELECT book_id FROM book_author WHERE author_id = NEW.id)"),
+    ),
+    "book_search_genres_update": (
+        "AFTER UPDATE OF name ON genres",
+        _refresh("b.id IN (SELECT book_id FROM book_genre WHERE genre_id = NEW.id)"),
+    ),
+}
+
+
+# Trigram full-text index over titles and author names for typo-tolerant search
+# (src.services.fuzzy_search); external content, so it stores only the index
+TRIGRAM_TABLE = "book_search_trigrams"
+TRIGRAM_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5("
+    "title, author_names, content='book_search', content_rowid='book_id', tokenize='trigram')"
+)
+# Number of rows containing each trigram, read straight from the index
+TRIGRAM_VOCAB_TABLE = "book_search_trigrams_vocab"
+TRIGRAM_VOCAB_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_VOCAB_TABLE} USING fts5vocab({TRIGRAM_TABLE}, 'row')"
+)
+_TRIGRAM_INSERT = (
+    f"INSERT INTO {TRIGRAM_TABLE} (rowid, title, author_names) VALUES (NEW.book_id, NEW.title, NEW.author_names)"
+)
+_TRIGRAM_DELETE = (
+    f"INSERT INTO {TRIGRAM_TABLE} ({TRIGRAM_TABLE}, rowid, title, author_names)"
+    " VALUES ('delete', OLD.book_id, OLD.title, OLD.author_names)"
+)
+TRIGRAM_TRIGGERS = {
+    "book_search_trigrams_insert": ("AFTER INSERT ON book_search", _TRIGRAM_INSERT),
+    "book_search_trigrams_delete": ("AFTER DELETE ON book_search", _TRIGRAM_DELETE),
+    # Refreshes rewrite every column; only reindex when the indexed text changed
+    "book_search_trigrams_update": (
+        "AFTER UPDATE OF title, author_names ON book_search"
+        " WHEN OLD.title IS NOT NEW.title OR OLD.author_names IS NOT NEW.author_names",
+        f"{_TRIGRAM_DELETE}; {_TRIGRAM_INSERT}",
+    ),
+}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_book_search_triggers(target, connection, **kw):
+    """Create the maintenance triggers and backfill rows for books that predate them.
+
+    book_search is derived data, so a table from an older schema is simply
+    dropped and rebuilt along with its triggers, and its trigram index
+    rebuilt from it.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    # Before anything below writes, while the archive can still be attached
+    archived = attach_archive(connection)
+    table = BookSearch.__table__
+    existing = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(book_search)")}
+    rebuilt = existing != {column.name for column in table.columns}
+    if rebuilt:
+        for name in TRIGGERS:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        table.drop(connection, checkfirst=True)
+        table.create(connection)
+    trigram_exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (TRIGRAM_TABLE,)
+    ).first()
+    connection.exec_driver_sql(TRIGRAM_TABLE_SQL)
+    connection.exec_driver_sql(TRIGRAM_VOCAB_TABLE_SQL)
+    for name, (timing, body) in {**TRIGGERS, **TRIGRAM_TRIGGERS}.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {timing} BEGIN {body}; END")
+    connection.exec_driver_sql("DELETE FROM book_search WHERE book_id NOT IN (SELECT id FROM books)")
+    # The units_sold backfill looks order items up by book; ensure_indexes only runs after create_all
+    for index in target.tables["order_items"].indexes:
+        index.create(connection, checkfirst=True)
+    connection.exec_driver_sql(
+        _refresh("b.id NOT IN (SELECT book_id FROM book_search)", units_sold=_units_sold("b.id", archived))
+    )
+    if rebuilt or not trigram_exists:
+        connection.exec_driver_sql(f"INSERT INTO {TRIGRAM_TABLE} ({TRIGRAM_TABLE}) VALUES ('rebuild')")
+
+
+def recount_units_sold(connection) -> None:
+    """Recompute units_sold from order items, for orders written around the app"""
+    archived = attach_archive(connection)
+    connection.exec_driver_sql(
+        f"UPDATE book_search SET units_sold = {_units_sold('book_search.book_id', archived)}"
+    )
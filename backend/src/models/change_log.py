@@ -0,0 +1,86 @@
+from sqlalchemy import Column, Index, Integer, String, event
+from src.core.database import Base
+
+
+class ChangeLog(Base):
+    """Append-only log of entity changes behind GET /changes.
+
+    Written by SQLite triggers in the same transaction as the change, so every
+    write path and process is covered. A record only says which entity
+    changed and how; clients fetch the entity again unless it was deleted.
+    AUTOINCREMENT keeps seq monotonic across compaction, which drops records
+    superseded by a newer one for the same entity and, beyond
+    `settings.change_log_retain`, the oldest records (see ChangeLogHorizon).
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        # Finds the newer record of the same entity when compacting
+        Index("ix_change_log_entity_seq", "entity", "entity_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True)
+    # book, author, genre, publisher or order
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # insert, update or delete
+    op = Column(String(10), nullable=False)
+
+
+class ChangeLogHorizon(Base):
+    """Highest seq dropped by truncating compaction; clients behind it must reload"""
+    __tablename__ = "change_log_horizon"
+
+    id = Column(Integer, primary_key=True)
+    seq = Column(Integer, nullable=False, default=0)
+
+
+def _log(entity: str, entity_id: str, op: str) -> str:
+    return f"INSERT INTO change_log (entity, entity_id, op) VALUES ('{entity}', {entity_id}, '{op}')"
+
+
+def _log_books(source: str) -> str:
+    return f"INSERT INTO change_log (entity, entity_id, op) SELECT 'book', book_id, 'update' FROM ({source})"
+
+
+TRIGGERS = {
+    **{
+        f"change_log_{table}_{op}": (
+            f"AFTER {op.upper()} ON {table}", _log(entity, "OLD.id" if op == "delete" else "NEW.id", op),
+        )
+        for table, entity in [
+            ("books", "book"), ("authors", "author"), ("genres", "genre"),
+            ("publishers", "publisher"), ("orders", "order"),
+        ]
+        for op in ["insert", "update", "delete"]
+    },
+    "change_log_book_author_insert": ("AFTER INSERT ON book_author", _log("book", "NEW.book_id", "update")),
+    "change_log_book_author_delete": ("AFTER DELETE ON book_author", _log("book", "OLD.book_id", "update")),
+    "change_log_book_genre_insert": ("AFTER INSERT ON book_genre", _log("book", "NEW.book_id", "update")),
+    "change_log_book_genre_delete": ("AFTER DELETE ON book_genre", _log("book", "OLD.book_id", "update")),
+    # Book listings show author, genre and publisher names
+    "change_log_authors_rename": (
+        "AFTER UPDATE OF name ON authors",
+        _log_books("SELECT book_id FROM book_author WHERE author_id = NEW.id"),
+    ),
+    "change_log_genres_rename": (
+        "AFTER UPDATE OF name ON genres",
+        _log_books("SELECT book_id FROM book_genre WHERE genre_id = NEW.id"),
+    ),
+    "change_log_publishers_rename": (
+        "AFTER UPDATE OF name ON publishers",
+        _log_books("SELECT id AS book_id FROM books WHERE publisher_id = NEW.id"),
+    ),
+    "change_log_order_items_insert": ("AFTER INSERT ON order_items", _log("order", "NEW.order_id", "update")),
+    "change_log_order_items_update": ("AFTER UPDATE ON order_items", _log("order", "NEW.order_id", "update")),
+    "change_log_order_items_delete": ("AFTER DELETE ON order_items", _log("order", "OLD.order_id", "update")),
+}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_change_log_triggers(target, connection, **kw):
+    """Create the triggers that append to change_log"""
+    if connection.dialect.name != "sqlite":
+        return
+    for name, (timing, body) in TRIGGERS.items():
+        connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {timing} BEGIN {body}; END")
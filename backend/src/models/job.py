@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String, Text
+from src.core.database import Base
+
+
+class Job(Base):
+    """Background admin operation, run in committed chunks by `src.services.jobs`"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    # queued, running, done, failed or cancelled
+    status = Column(String(20), nullable=False, default="queued")
+    params = Column(JSON, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # host:pid of the process whose worker pool runs the job
+    worker = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
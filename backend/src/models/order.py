@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from src.core.database import Base
@@ -15,6 +15,10 @@ class Order(Base):
     postal_code = Column(String(20), nullable=False)
     status = Column(String(50), default="pending")
     total_price = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
@@ -0,0 +1,98 @@
+"""Archived orders, kept in a separate SQLite file attached as `archive`.
+
+The archive file sits next to the database as `<name>-archive<suffix>`
+(in memory for in-memory databases) and is attached to a connection on
+first use by `attach_archive`. Its tables mirror orders and order_items
+without foreign keys, which SQLite cannot enforce across files, and are
+mapped on their own metadata so `create_all` on the main schema never
+needs the archive attached.
+"""
+from pathlib import Path
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String
+from sqlalchemy.orm import declarative_base, foreign, relationship
+
+from src.models.book import Book
+
+ARCHIVE_SCHEMA = "archive"
+
+ArchiveBase = declarative_base(metadata=MetaData(schema=ARCHIVE_SCHEMA))
+
+
+class ArchivedOrder(ArchiveBase):
+    """An order moved out of the hot tables by `src.services.order_archive`"""
+    __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_archived_orders_created_at", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    customer_name = Column(String(255), nullable=False)
+    email = Column(String(255), nullable=False)
+    phone = Column(String(20), nullable=True)
+    address = Column(String(255), nullable=False)
+    postal_code = Column(String(20), nullable=False)
+    status = Column(String(50))
+    total_price = Column(Float, nullable=False)
+    created_at = Column(DateTime)
+
+    items = relationship(
+        "ArchivedOrderItem",
+        primaryjoin="ArchivedOrder.id == foreign(ArchivedOrderItem.order_id)",
+        viewonly=True,
+    )
+
+
+class ArchivedOrderItem(ArchiveBase):
+    """An item of an archived order"""
+    __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_archived_order_items_order_id", "order_id"),
+        Index("ix_archived_order_items_book_id", "book_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    book_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price_at_purchase = Column(Float, nullable=False)
+
+    book = relationship(Book, primaryjoin=lambda: foreign(ArchivedOrderItem.book_id) == Book.id, viewonly=True)
+
+
+def archive_path(connection) -> str:
+    """Path of the archive file for a connection's main database"""
+    main = next(row[2] for row in connection.exec_driver_sql("PRAGMA database_list") if row[1] == "main")
+    if not main:
+        return ":memory:"
+    path = Path(main)
+    return str(path.with_name(f"{path.stem}-archive{path.suffix}"))
+
+
+def attach_archive(connection, create: bool = False) -> bool:
+    """Attach the archive to a connection if it exists (or create it); whether its tables are there.
+
+    ATTACH is not allowed inside a transaction, so a connection that has
+    not attached the archive yet must not have written in its current one.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    info = connection.connection.info
+    if info.get("archive_ready"):
+        return True
+    if "archive_attached" not in info:
+        path = archive_path(connection)
+        if not create and path != ":memory:" and not Path(path).exists():
+            return False
+        if connection.connection.dbapi_connection.in_transaction:
+            if create:
+                raise RuntimeError("The archive must be attached before the transaction writes")
+            return False
+        connection.exec_driver_sql(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+        info["archive_attached"] = path
+    if create:
+        ArchiveBase.metadata.create_all(connection)
+    info["archive_ready"] = connection.exec_driver_sql(
+        f"PRAGMA {ARCHIVE_SCHEMA}.table_info(orders)"
+    ).first() is not None
+    return info["archive_ready"]
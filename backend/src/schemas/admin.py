@@ -22,3 +22,18 @@ class AdminResponse(BaseModel):
 
     id: int
     username: str
+
+
+class SlowQueryResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    shape: str
+    count: int
+    total_ms: float
+    max_ms: float
+    last_ms: float
+    last_route: str
+    parameters: str
+    plan: list[str]
+    full_scan: bool
+    temp_btree: bool
@@ -39,6 +39,17 @@ class BookCreate(BaseModel):
     genre_ids: list[int] = Field(default_factory=list)
 
 
+class BookUpsert(BaseModel):
+    """ISBN-keyed partial book record for catalog sync; omitted fields are left unchanged"""
+    isbn: str = Field(min_length=1, max_length=20)
+    title: str | None = None
+    description: str | None = None
+    price: float | None = Field(None, gt=0)
+    stock: int | None = Field(None, ge=0)
+    published_year: int | None = None
+    publisher_id: int | None = None
+
+
 class BookResponse(BaseModel):
     """Book response schema"""
     model_config = ConfigDict(from_attributes=True)
@@ -44,8 +44,39 @@ class OrderCreateCheckout(BaseModel):
     phone: str | None = Field(None, max_length=20)
     address: str = Field(min_length=1, max_length=255)
     postal_code: str = Field(min_length=1, max_length=20)
-    total_price: float = Field(gt=0)
+    # Accepted from older clients but never charged: the total is computed from current prices
+    total_price: float | None = Field(None, gt=0)
     items: list[OrderItemCheckout] = Field(min_length=1)
+    # Token from POST /orders/quote; its prices and total are charged instead of current ones
+    quote: str | None = None
+
+
+class CartQuoteRequest(BaseModel):
+    """Cart to price before checkout"""
+    items: list[OrderItemCheckout] = Field(min_length=1)
+
+
+class CartQuoteLine(BaseModel):
+    """Price and availability of one book in a cart"""
+    book_id: int
+    title: str | None
+    quantity: int
+    unit_price: float | None
+    line_total: float | None
+    stock: int
+    status: str
+
+
+class CartQuoteResponse(BaseModel):
+    """Authoritative cart totals, with a quote token when every line is available"""
+    lines: list[CartQuoteLine]
+    subtotal: float
+    tax: float
+    shipping: float
+    total: float
+    available: bool
+    quote: str | None = None
+    expires_in_s: int | None = None
 
 
 class OrderCreate(BaseModel):
@@ -0,0 +1,246 @@
+"""'Customers also bought' recommendations from co-purchase counts.
+
+book_co_purchases holds, for every pair of books ordered together, the
+number of orders containing both. Checkout adds one to each pair of its
+basket and order deletion takes it back, in the order's transaction, so a
+basket of n books costs n * (n - 1) upserts and never a scan of history.
+
+Lookups are served from `AlsoBoughtIndex`, a per-engine LRU of each book's
+top TOP_K co-purchased books filled by one index range scan on a miss and
+capped at MAX_CACHED_BOOKS entries. A book's entry is dropped whenever it
+changes; checkouts and order deletions change the stock of every book in
+them, so this covers new co-purchases, also those replayed from other
+processes. As in `BookCache`, a miss read before an invalidation is not
+stored after it: every invalidation bumps `generation`.
+
+The counts can be rebuilt from all orders in batches, e.g. after importing
+order history or upgrading a database that predates the table:
+
+    python -m src.services.also_bought --database-url sqlite:///../db/bookstore.db
+"""
+import argparse
+import threading
+from collections import Counter, OrderedDict
+from itertools import permutations
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, create_engine, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from src.core.events import on_books_changed, on_catalog_reset
+from src.models import ArchivedOrder, ArchivedOrderItem, BookCoPurchase, Order, OrderItem
+from src.models.order_archive import attach_archive
+
+TOP_K = 10
+MAX_CACHED_BOOKS = 100_000
+REBUILD_BATCH_ORDERS = 5000
+
+_pairs = BookCoPurchase.__table__
+
+_ADD_PAIR = sqlite_insert(_pairs).values(
+    book_id=bindparam("pair_book_id"), other_id=bindparam("pair_other_id"), count=bindparam("pair_count"),
+)
+_ADD_PAIR = _ADD_PAIR.on_conflict_do_update(
+    index_elements=[_pairs.c.book_id, _pairs.c.other_id],
+    set_={"count": _pairs.c.count + _ADD_PAIR.excluded.count},
+)
+
+
+def _add_pairs(db: Session, counts: Counter) -> None:
+    params = [
+        {"pair_book_id": book_id, "pair_other_id": other_id, "pair_count": count}
+        for (book_id, other_id), count in counts.items() if count
+    ]
+    if params:
+        db.execute(_ADD_PAIR, params)
+
+
+def basket_pairs(book_ids) -> Counter:
+    """Both directions of every pair of distinct books in one order"""
+    return Counter(permutations(sorted(set(book_ids)), 2))
+
+
+def record_co_purchases(db: Session, baskets, sign: int = 1) -> None:
+    """Add (sign=1) or take back (sign=-1) the pairs of the given baskets of book ids"""
+    counts = Counter()
+    for basket in baskets:
+        counts.update(basket_pairs(basket))
+    _add_pairs(db, Counter({pair: sign * count for pair, count in counts.items()}))
+
+
+def record_added_item(db: Session, book_id: int, basket) -> None:
+    """Pair a book newly added to an order with the books already in it"""
+    others = set(basket)
+    if book_id in others:
+        return
+    _add_pairs(db, Counter({
+        **{(book_id, other_id): 1 for other_id in others},
+        **{(other_id, book_id): 1 for other_id in others},
+    }))
+
+
+class AlsoBoughtIndex:
+    """LRU of book id -> top co-purchased (book id, count) pairs"""
+
+    def __init__(self, max_books: int = MAX_CACHED_BOOKS):
+        self._lock = threading.Lock()
+        self.max_books = max_books
+        self.generation = 0
+        self._top: OrderedDict[int, tuple] = OrderedDict()
+
+    def top(self, db: Session, book_id: int) -> tuple:
+        with self._lock:
+            top = self._top.get(book_id)
+            if top is not None:
+                self._top.move_to_end(book_id)
+                return top
+            generation = self.generation
+        top = tuple(
+            (other_id, count) for other_id, count in db.execute(
+                select(BookCoPurchase.other_id, BookCoPurchase.count)
+                .where(BookCoPurchase.book_id == book_id, BookCoPurchase.count > 0)
+                .order_by(BookCoPurchase.count.desc(), BookCoPurchase.other_id.desc())
+                .limit(TOP_K)
+            )
+        )
+        with self._lock:
+            if generation != self.generation:
+                return top
+            self._top[book_id] = top
+            if len(self._top) > self.max_books:
+                self._top.popitem(last=False)
+        return top
+
+    def invalidate(self, book_ids) -> None:
+        with self._lock:
+            self.generation += 1
+            for book_id in book_ids:
+                self._top.pop(book_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._top.clear()
+
+
+_indexes: WeakKeyDictionary = WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def also_bought_index(db: Session) -> AlsoBoughtIndex:
+    """The also-bought cache for this session's engine"""
+    bind = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(bind)
+        if index is None:
+            index = _indexes[bind] = AlsoBoughtIndex()
+    return index
+
+
+@on_books_changed
+def _invalidate_also_bought(db: Session, book_ids: set[int]) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None:
+        index.invalidate(book_ids)
+
+
+@on_catalog_reset
+def _clear_also_bought(db: Session) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None:
+        index.clear()
+
+
+_staging = Table(
+    "book_co_purchases_rebuild",
+    MetaData(),
+    Column("book_id", Integer, primary_key=True),
+    Column("other_id", Integer, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+_STAGE_PAIR = sqlite_insert(_staging).values(
+    book_id=bindparam("pair_book_id"), other_id=bindparam("pair_other_id"), count=bindparam("pair_count"),
+)
+_STAGE_PAIR = _STAGE_PAIR.on_conflict_do_update(
+    index_elements=[_staging.c.book_id, _staging.c.other_id],
+    set_={"count": _staging.c.count + _STAGE_PAIR.excluded.count},
+)
+
+
+def _baskets(
+    db: Session, first_order_id: int, last_order_id: int | None = None, archived: bool = False
+) -> dict[int, list[int]]:
+    models = [(Order, OrderItem)]
+    if archived:
+        models.append((ArchivedOrder, ArchivedOrderItem))
+    baskets: dict[int, list[int]] = {}
+    for order_model, item_model in models:
+        query = select(item_model.order_id, item_model.book_id).join(order_model, order_model.id == item_model.order_id)
+        query = query.where(item_model.order_id >= first_order_id)
+        if last_order_id is not None:
+            query = query.where(item_model.order_id <= last_order_id)
+        for order_id, book_id in db.execute(query):
+            baskets.setdefault(order_id, []).append(book_id)
+    return baskets
+
+
+def rebuild_co_purchases(db: Session, batch_orders: int = REBUILD_BATCH_ORDERS) -> int:
+    """Recount all pairs from order items, `batch_orders` orders per transaction.
+
+    Counts are accumulated in a staging table while checkouts go on; the
+    final write transaction then adds the orders placed meanwhile and swaps
+    the counts in. Archived orders are counted too. Returns the number of
+    pairs.
+    """
+    connection = db.connection()
+    _staging.drop(connection, checkfirst=True)
+    _staging.create(connection)
+
+    def stage(first: int, last: int | None, archived: bool = False) -> None:
+        counts = Counter()
+        for basket in _baskets(db, first, last, archived).values():
+            counts.update(basket_pairs(basket))
+        params = [
+            {"pair_book_id": book_id, "pair_other_id": other_id, "pair_count": count}
+            for (book_id, other_id), count in counts.items()
+        ]
+        if params:
+            db.execute(_STAGE_PAIR, params)
+
+    last_order_id = db.scalar(select(func.coalesce(func.max(Order.id), 0)))
+    db.commit()
+    for first in range(1, last_order_id + 1, batch_orders):
+        # Each batch may run on another pooled connection; attach before it writes
+        stage(first, min(first + batch_orders - 1, last_order_id), attach_archive(db.connection()))
+        db.commit()
+
+    # Writing first takes the write lock, so no order can slip in between the last batch and the swap
+    db.execute(delete(BookCoPurchase))
+    # Orders placed since are too new to have been archived
+    stage(last_order_id + 1, None)
+    db.execute(insert(BookCoPurchase).from_select(["book_id", "other_id", "count"], select(_staging)))
+    pairs = db.scalar(select(func.count()).select_from(_staging))
+    _staging.drop(db.connection())
+    db.commit()
+    _clear_also_bought(db)
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild co-purchase counts from all orders")
+    parser.add_argument("--database-url", default=None, help="defaults to the application database")
+    parser.add_argument("--batch-orders", type=int, default=REBUILD_BATCH_ORDERS)
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from src.core.database import engine
+    with Session(bind=engine) as db:
+        pairs = rebuild_co_purchases(db, args.batch_orders)
+    print(f"{pairs} co-purchase pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""In-memory bitmap index over the shop's listing filters.
+
+Every genre, author, publisher and price bucket maps to the set of in-stock
+book ids carrying it, so any filter combination is a handful of AND/OR
+operations on Python ints used as bitmaps (bit `book_id` set per book). Only
+the ids of the requested page are then loaded from SQLite.
+
+Like roaring bitmaps, each posting list picks its container by density: a
+dense int bitmap, or a sorted `array` of ids for values shared by few books
+(most authors), which is materialized into a bitmap only when queried. The
+index is loaded from the book_search projection at startup, kept per engine,
+and patched from `books_changed`.
+"""
+import math
+import threading
+from array import array
+from bisect import bisect_left, insort
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.core.events import on_books_changed, on_catalog_reset
+from src.models import BookSearch
+
+PRICE_BUCKET_WIDTH = 5.0
+# Above this many changed books a rebuild is cheaper than patching one by one
+REBUILD_THRESHOLD = 1000
+# A sorted array costs 4 bytes per id, a bitmap 1/8 byte per possible id
+ARRAY_BYTES_PER_ID = 4
+_WORD_BYTES = 8
+
+Posting = int | array
+
+
+def _unpack_ids(packed: str) -> tuple[int, ...]:
+    """",1,12," -> (1, 12)"""
+    return tuple(int(value) for value in packed.strip(",").split(",") if value)
+
+
+def _price_bucket(price: float) -> float:
+    """Bucket key of a price; infinite bounds stay infinite, beyond every bucket"""
+    return math.floor(price / PRICE_BUCKET_WIDTH) if math.isfinite(price) else price
+
+
+def bitmap_from_ids(ids) -> int:
+    """Build a bitmap in one pass instead of one big-int OR per id"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for book_id in ids:
+        buffer[book_id >> 3] |= 1 << (book_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _iter_word_bits(word: int):
+    while word:
+        low = word & -word
+        yield low.bit_length() - 1
+        word ^= low
+
+
+def iter_ids(bitmap: int, offset: int = 0):
+    """Ids of the set bits in ascending order, skipping the first `offset`.
+
+    Works on 64-bit words so that neither skipping nor iterating rebuilds the
+    whole big int per bit; whole words are skipped by popcount.
+    """
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8 or 1, "little")
+    for start in range(0, len(data), _WORD_BYTES):
+        word = int.from_bytes(data[start:start + _WORD_BYTES], "little")
+        if not word:
+            continue
+        if offset:
+            count = word.bit_count()
+            if offset >= count:
+                offset -= count
+                continue
+        for bit in _iter_word_bits(word):
+            if offset:
+                offset -= 1
+                continue
+            yield start * 8 + bit
+
+
+def page_of(bitmap: int, offset: int, limit: int) -> list[int]:
+    """Ids at positions offset..offset+limit of the bitmap"""
+    ids = []
+    for book_id in iter_ids(bitmap, offset):
+        ids.append(book_id)
+        if len(ids) == limit:
+            break
+    return ids
+
+
+def _as_bitmap(posting: Posting) -> int:
+    return posting if isinstance(posting, int) else bitmap_from_ids(posting)
+
+
+def _union(postings: dict[int, Posting], keys) -> int:
+    result = 0
+    for key in keys:
+        posting = postings.get(key)
+        if posting is not None:
+            result |= _as_bitmap(posting)
+    return result
+
+
+class BitmapIndex:
+    """Inverted index from filter values to in-stock book ids"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.in_stock = 0
+        self.width = 0
+        self.genres: dict[int, Posting] = {}
+        self.authors: dict[int, Posting] = {}
+        self.publishers: dict[int, Posting] = {}
+        self.price_buckets: dict[int, Posting] = {}
+        self.books: dict[int, tuple] = {}
+
+    def _postings_of(self, entry: tuple):
+        """(posting dict, key) pairs a book with this entry belongs to"""
+        price, publisher_id, genre_ids, author_ids = entry
+        yield from ((self.genres, genre_id) for genre_id in genre_ids)
+        yield from ((self.authors, author_id) for author_id in author_ids)
+        yield self.publishers, publisher_id
+        yield self.price_buckets, _price_bucket(price)
+
+    def _container(self, ids: list[int]) -> Posting:
+        if len(ids) * ARRAY_BYTES_PER_ID * 8 > self.width:
+            return bitmap_from_ids(ids)
+        return array("I", sorted(ids))
+
+    @staticmethod
+    def _rows(db: Session, book_ids=None):
+        query = select(
+            BookSearch.book_id, BookSearch.price, BookSearch.publisher_id,
+            BookSearch.genre_ids, BookSearch.author_ids,
+        ).where(BookSearch.in_stock.is_(True))
+        if book_ids is not None:
+            query = query.where(BookSearch.book_id.in_(book_ids))
+        return db.execute(query).all()
+
+    def load(self, db: Session) -> None:
+        rows = self._rows(db)
+        with self._lock:
+            self._reset()
+            self.width = max((row.book_id for row in rows), default=0) + 1
+            # Collect id lists first, then build each container once
+            for book_id, price, publisher_id, genre_ids, author_ids in rows:
+                entry = (price, publisher_id, _unpack_ids(genre_ids), _unpack_ids(author_ids))
+                self.books[book_id] = entry
+                for postings, key in self._postings_of(entry):
+                    postings.setdefault(key, []).append(book_id)
+            for postings in (self.genres, self.authors, self.publishers, self.price_buckets):
+                for key, ids in postings.items():
+                    postings[key] = self._container(ids)
+            self.in_stock = bitmap_from_ids(self.books)
+            self.loaded = True
+
+    def _add(self, book_id: int, entry: tuple) -> None:
+        self.books[book_id] = entry
+        self.width = max(self.width, book_id + 1)
+        bit = 1 << book_id
+        self.in_stock |= bit
+        for postings, key in self._postings_of(entry):
+            posting = postings.get(key)
+            if posting is None:
+                postings[key] = array("I", [book_id])
+            elif isinstance(posting, int):
+                postings[key] = posting | bit
+            else:
+                insort(posting, book_id)
+                if len(posting) * ARRAY_BYTES_PER_ID * 8 > self.width:
+                    postings[key] = bitmap_from_ids(posting)
+
+    def _remove(self, book_id: int) -> None:
+        entry = self.books.pop(book_id, None)
+        if entry is None:
+            return
+        mask = ~(1 << book_id)
+        self.in_stock &= mask
+        for postings, key in self._postings_of(entry):
+            posting = postings[key]
+            if isinstance(posting, int):
+                posting &= mask
+                postings[key] = posting
+            else:
+                del posting[bisect_left(posting, book_id)]
+            if not posting:
+                del postings[key]
+
+    def apply(self, db: Session, book_ids: set[int]) -> None:
+        """Re-read the given books and replace their bits"""
+        if not self.loaded:
+            return
+        if len(book_ids) > REBUILD_THRESHOLD:
+            self.load(db)
+            return
+        rows = self._rows(db, book_ids)
+        with self._lock:
+            for book_id in book_ids:
+                self._remove(book_id)
+            for book_id, price, publisher_id, genre_ids, author_ids in rows:
+                self._add(book_id, (price, publisher_id, _unpack_ids(genre_ids), _unpack_ids(author_ids)))
+
+    def match(
+        self,
+        genre_ids=None,
+        author_ids=None,
+        publisher_ids=None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        genre_match: str = "any",
+    ) -> int:
+        """Bitmap of in-stock books matching every given filter"""
+        with self._lock:
+            result = self.in_stock
+            if genre_ids:
+                if genre_match == "all":
+                    for genre_id in set(genre_ids):
+                        result &= _union(self.genres, [genre_id])
+                else:
+                    result &= _union(self.genres, set(genre_ids))
+            if author_ids:
+                result &= _union(self.authors, set(author_ids))
+            if publisher_ids:
+                result &= _union(self.publishers, set(publisher_ids))
+            if min_price is not None or max_price is not None:
+                result = self._match_price(result, min_price, max_price)
+            return result
+
+    def _match_price(self, result: int, min_price: float | None, max_price: float | None) -> int:
+        if any(bound is not None and math.isnan(bound) for bound in (min_price, max_price)):
+            # SQLite binds NaN as NULL, so the SQL filters match nothing either
+            return 0
+        low = _price_bucket(min_price) if min_price is not None else -math.inf
+        high = _price_bucket(max_price) if max_price is not None else math.inf
+        result &= _union(self.price_buckets, [key for key in self.price_buckets if low <= key <= high])
+        # Whole buckets inside the range match; books in the edge buckets need their exact price
+        edge_keys = [key for key in (low, high) if key in self.price_buckets]
+        edges = result & _union(self.price_buckets, edge_keys)
+        outside = [
+            book_id for book_id in iter_ids(edges)
+            if (min_price is not None and self.books[book_id][0] < min_price)
+            or (max_price is not None and self.books[book_id][0] > max_price)
+        ]
+        return result & ~bitmap_from_ids(outside) if outside else result
+
+
+_indexes: WeakKeyDictionary = WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def bitmap_index(db: Session) -> BitmapIndex:
+    """The loaded bitmap index for this session's engine"""
+    bind = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(bind)
+        if index is None:
+            index = _indexes[bind] = BitmapIndex()
+    if not index.loaded:
+        index.load(db)
+    return index
+
+
+@on_books_changed
+def _update_bitmap_index(db: Session, book_ids: set[int]) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None:
+        index.apply(db, book_ids)
+
+
+@on_catalog_reset
+def _reload_bitmap_index(db: Session) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None and index.loaded:
+        index.load(db)
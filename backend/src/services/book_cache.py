@@ -0,0 +1,90 @@
+"""Per-engine LRU of serialized book responses, for batch lookups.
+
+Entries are dropped from `books_changed`, which also covers renamed
+authors, genres and publishers since their write paths report the books
+they appear on. Other processes' writes only arrive through the catalog
+snapshot's replay of book_changes, so callers use the cache only while a
+fresh snapshot is present.
+
+A lookup that misses reads the database and then stores what it read; if
+a book changed in between, that store would outlive the invalidation. Every
+invalidation therefore bumps `generation`, and stores made with an older
+generation are skipped.
+"""
+import threading
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.orm import Session
+
+from src.core.events import on_books_changed, on_catalog_reset
+
+MAX_CACHED_BOOKS = 50_000
+
+
+class BookCache:
+    """LRU of book id -> response dict"""
+
+    def __init__(self, max_books: int = MAX_CACHED_BOOKS):
+        self._lock = threading.Lock()
+        self.max_books = max_books
+        self.generation = 0
+        self._books: OrderedDict[int, dict] = OrderedDict()
+
+    def get_many(self, book_ids) -> dict[int, dict]:
+        with self._lock:
+            found = {}
+            for book_id in book_ids:
+                book = self._books.get(book_id)
+                if book is not None:
+                    self._books.move_to_end(book_id)
+                    found[book_id] = book
+            return found
+
+    def put_many(self, books: dict[int, dict], generation: int) -> None:
+        """Store books read from the database while `generation` was current"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._books.update(books)
+            while len(self._books) > self.max_books:
+                self._books.popitem(last=False)
+
+    def invalidate(self, book_ids) -> None:
+        with self._lock:
+            self.generation += 1
+            for book_id in book_ids:
+                self._books.pop(book_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._books.clear()
+
+
+_caches: WeakKeyDictionary = WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def book_cache(db: Session) -> BookCache:
+    """The book cache for this session's engine"""
+    bind = db.get_bind()
+    with _caches_lock:
+        cache = _caches.get(bind)
+        if cache is None:
+            cache = _caches[bind] = BookCache()
+    return cache
+
+
+@on_books_changed
+def _invalidate_books(db: Session, book_ids: set[int]) -> None:
+    cache = _caches.get(db.get_bind())
+    if cache is not None:
+        cache.invalidate(book_ids)
+
+
+@on_catalog_reset
+def _clear_books(db: Session) -> None:
+    cache = _caches.get(db.get_bind())
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,238 @@
+"""Bulk book import from streamed NDJSON or CSV feeds"""
+import csv
+import json
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.core.events import books_changed
+from src.models import Author, Book, Genre, Publisher
+from src.models.book import book_author, book_genre
+from src.schemas.book import BookCreate
+
+DEFAULT_CHUNK_SIZE = 500
+CSV_LIST_SEPARATOR = ";"
+
+
+class UndecodableLine(str):
+    """A line that was not valid UTF-8, decoded with replacement characters"""
+
+
+def _decode(line: bytes) -> str:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return UndecodableLine(line.decode("utf-8", errors="replace").rstrip("\r"))
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded text lines without buffering the whole body.
+
+    Invalid UTF-8 is yielded as an `UndecodableLine` for the record parsers to report.
+    """
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """Yield (row number, parsed object or error message) for each non-empty NDJSON line"""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        if isinstance(line, UndecodableLine):
+            yield row, "Invalid UTF-8"
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row, "Each line must be a JSON object"
+            continue
+        yield row, record
+
+
+def _csv_ids(value: str | None) -> list[str]:
+    """Split a `;`-separated id column, ignoring blanks"""
+    if not value:
+        return []
+    return [part.strip() for part in value.split(CSV_LIST_SEPARATOR) if part.strip()]
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """Yield (row number, record) for each CSV row; the first row is the header.
+
+    Quoted fields may span lines: physical lines are joined until the quote count is even.
+    """
+    header = None
+    row = 0
+    pending = ""
+    async for line in lines:
+        if isinstance(line, UndecodableLine):
+            # Drops the whole record, including lines of a quoted field it continues
+            pending = ""
+            if header is not None:
+                row += 1
+                yield row, "Invalid UTF-8"
+                continue
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        record = {
+            name: (value if value != "" else None)
+            for name, value in zip(header, values)
+        }
+        for name in ("author_ids", "genre_ids"):
+            if name in record:
+                record[name] = _csv_ids(record[name])
+        yield row, record
+    if pending:
+        row += 1
+        yield row, "Unterminated quoted field"
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic error into a single `field: message` line"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+async def iter_chunks(records: AsyncIterator, size: int) -> AsyncIterator[list]:
+    """Group an async stream into lists of at most `size` items"""
+    chunk = []
+    async for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing_ids(db: Session, column, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(ids))))
+
+
+def import_chunk(db: Session, chunk: list[tuple[int, dict | str]]) -> tuple[list[int], list[dict]]:
+    """Validate and insert one chunk of records in a single transaction.
+
+    Publisher, author, genre and ISBN lookups are done once per chunk, books are
+    inserted with one executemany and association rows with one more each.
+    Returns the new book ids and the per-row errors.
+    """
+    errors = []
+    books: list[tuple[int, BookCreate]] = []
+
+    for row, record in chunk:
+        if isinstance(record, str):
+            errors.append({"row": row, "error": record})
+            continue
+        try:
+            book = BookCreate.model_validate(record)
+        except ValidationError as e:
+            errors.append({"row": row, "error": format_validation_error(e)})
+            continue
+        book.author_ids = list(dict.fromkeys(book.author_ids))
+        book.genre_ids = list(dict.fromkeys(book.genre_ids))
+        books.append((row, book))
+
+    publisher_ids = _existing_ids(db, Publisher.id, {book.publisher_id for _, book in books})
+    author_ids = _existing_ids(db, Author.id, {i for _, book in books for i in book.author_ids})
+    genre_ids = _existing_ids(db, Genre.id, {i for _, book in books for i in book.genre_ids})
+    isbns = {book.isbn for _, book in books if book.isbn}
+    taken_isbns = set(db.scalars(select(Book.isbn).where(Book.isbn.in_(isbns)))) if isbns else set()
+
+    valid: list[tuple[int, BookCreate]] = []
+    for row, book in books:
+        if book.publisher_id not in publisher_ids:
+            errors.append({"row": row, "error": "Publisher not found"})
+        elif not author_ids.issuperset(book.author_ids):
+            errors.append({"row": row, "error": "One or more authors not found"})
+        elif not genre_ids.issuperset(book.genre_ids):
+            errors.append({"row": row, "error": "One or more genres not found"})
+        elif book.isbn and book.isbn in taken_isbns:
+            errors.append({"row": row, "error": f"ISBN {book.isbn} already exists"})
+        else:
+            if book.isbn:
+                taken_isbns.add(book.isbn)
+            valid.append((row, book))
+
+    if not valid:
+        return [], errors
+
+    try:
+        new_ids = list(db.scalars(
+            insert(Book).returning(Book.id, sort_by_parameter_order=True),
+            [
+                book.model_dump(exclude={"author_ids", "genre_ids"})
+                for _, book in valid
+            ],
+        ))
+        author_rows = [
+            {"book_id": book_id, "author_id": author_id}
+            for book_id, (_, book) in zip(new_ids, valid)
+            for author_id in book.author_ids
+        ]
+        genre_rows = [
+            {"book_id": book_id, "genre_id": genre_id}
+            for book_id, (_, book) in zip(new_ids, valid)
+            for genre_id in book.genre_ids
+        ]
+        if author_rows:
+            db.execute(insert(book_author), author_rows)
+        if genre_rows:
+            db.execute(insert(book_genre), genre_rows)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        message = f"Chunk rolled back: {e.__class__.__name__}"
+        errors.extend({"row": row, "error": message} for row, _ in valid)
+        return [], errors
+
+    books_changed(db, new_ids)
+    return new_ids, errors
+
+
+async def import_books(
+    db: Session,
+    records: AsyncIterator[tuple[int, dict | str]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """Import a stream of records chunk by chunk, committing after each chunk"""
+    ids: list[int] = []
+    errors: list[dict] = []
+
+    async for chunk in iter_chunks(records, chunk_size):
+        new_ids, chunk_errors = import_chunk(db, chunk)
+        ids.extend(new_ids)
+        errors.extend(chunk_errors)
+
+    errors.sort(key=lambda err: err["row"])
+    return {"inserted": len(ids), "failed": len(errors), "errors": errors, "ids": ids}
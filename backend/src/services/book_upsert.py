@@ -0,0 +1,134 @@
+"""ISBN-keyed bulk upsert for price/stock catalog feeds"""
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.core.events import books_changed
+from src.models import Book, Publisher
+from src.schemas.book import BookUpsert
+from src.services.book_import import format_validation_error, iter_chunks
+
+UPSERT_COLUMNS = ("title", "description", "price", "stock", "published_year", "publisher_id")
+REQUIRED_FOR_INSERT = ("title", "price", "publisher_id")
+NOT_NULL_COLUMNS = ("title", "price", "stock", "publisher_id")
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT(isbn) DO UPDATE that skips rows whose values are unchanged"""
+    stmt = sqlite_insert(Book)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[Book.isbn],
+        set_={name: excluded[name] for name in UPSERT_COLUMNS},
+        where=or_(*(
+            getattr(Book, name).is_distinct_from(excluded[name])
+            for name in UPSERT_COLUMNS
+        )),
+    ).returning(Book.id)
+
+
+def upsert_chunk(db: Session, chunk: list[tuple[int, dict | str]]) -> tuple[dict, list[dict]]:
+    """Apply one chunk of ISBN-keyed partial records in a single transaction.
+
+    Existing rows are read once per chunk so that partial records can be merged
+    with their current values and rows with no effective change skipped.
+    Returns the inserted/updated/unchanged counts and the per-row errors.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    errors = []
+    records: dict[str, tuple[int, dict]] = {}
+
+    for row, record in chunk:
+        if isinstance(record, str):
+            errors.append({"row": row, "error": record})
+            continue
+        try:
+            fields = BookUpsert.model_validate(record).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            errors.append({"row": row, "error": format_validation_error(e)})
+            continue
+        isbn = fields.pop("isbn")
+        nulls = [name for name in NOT_NULL_COLUMNS if name in fields and fields[name] is None]
+        if nulls:
+            errors.append({"row": row, "error": f"{', '.join(nulls)} cannot be null"})
+            continue
+        # A later record for the same ISBN overrides the earlier one field by field
+        if isbn in records:
+            fields = {**records[isbn][1], **fields}
+        records[isbn] = (row, fields)
+
+    if not records:
+        return counts, errors
+
+    existing = {
+        row.isbn: row._asdict()
+        for row in db.execute(
+            select(Book.isbn, *(getattr(Book, name) for name in UPSERT_COLUMNS))
+            .where(Book.isbn.in_(records))
+        )
+    }
+    publisher_ids = {
+        fields["publisher_id"] for _, fields in records.values() if "publisher_id" in fields
+    }
+    known_publishers = set(
+        db.scalars(select(Publisher.id).where(Publisher.id.in_(publisher_ids)))
+    ) if publisher_ids else set()
+
+    rows = []
+    for isbn, (row, fields) in records.items():
+        if "publisher_id" in fields and fields["publisher_id"] not in known_publishers:
+            errors.append({"row": row, "error": "Publisher not found"})
+            continue
+        current = existing.get(isbn)
+        if current is None:
+            missing = [name for name in REQUIRED_FOR_INSERT if name not in fields]
+            if missing:
+                errors.append({"row": row, "error": f"New ISBN requires {', '.join(missing)}"})
+                continue
+            values = {name: None for name in UPSERT_COLUMNS} | {"stock": 0} | fields
+            counts["inserted"] += 1
+        else:
+            values = {name: current[name] for name in UPSERT_COLUMNS} | fields
+            if all(values[name] == current[name] for name in UPSERT_COLUMNS):
+                counts["unchanged"] += 1
+                continue
+            counts["updated"] += 1
+        rows.append({"isbn": isbn, **values})
+
+    if not rows:
+        return counts, errors
+
+    try:
+        changed_ids = list(db.scalars(_upsert_statement(), rows))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        message = f"Chunk rolled back: {e.__class__.__name__}"
+        errors.extend({"row": records[r["isbn"]][0], "error": message} for r in rows)
+        return {"inserted": 0, "updated": 0, "unchanged": counts["unchanged"]}, errors
+
+    books_changed(db, changed_ids)
+    return counts, errors
+
+
+async def upsert_books(
+    db: Session,
+    records: AsyncIterator[tuple[int, dict | str]],
+    chunk_size: int,
+) -> dict:
+    """Upsert a stream of ISBN-keyed records chunk by chunk, committing after each chunk"""
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+    errors: list[dict] = []
+
+    async for chunk in iter_chunks(records, chunk_size):
+        counts, chunk_errors = upsert_chunk(db, chunk)
+        for key, value in counts.items():
+            totals[key] += value
+        errors.extend(chunk_errors)
+
+    errors.sort(key=lambda err: err["row"])
+    return {**totals, "failed": len(errors), "errors": errors}
@@ -0,0 +1,177 @@
+"""Deterministic synthetic catalog generator, used by scripts/seed.py --direct and the benchmarks.
+
+Writes authors, genres, publishers, books (with author/genre fan-out) and
+orders with items straight through SQLAlchemy Core executemany, so catalogs of
+a million books and orders can be built in minutes. Popularity is skewed:
+a small head of books receives most order lines and a small head of authors
+writes most books, leaving a long tail of both.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine, insert, text
+
+from src.models import Author, Book, Genre, Order, OrderItem, Publisher
+from src.models.book import book_author, book_genre
+from src.models.book_sales_daily import backfill_sales_daily
+from src.models.book_search import recount_units_sold
+
+ADJECTIVES = (
+    "Silent", "Crimson", "Hidden", "Last", "Broken", "Golden", "Distant", "Burning",
+    "Forgotten", "Frozen", "Hollow", "Endless", "Wandering", "Secret", "Shattered", "Quiet",
+)
+NOUNS = (
+    "Kingdom", "River", "Empire", "Garden", "Shadow", "Star", "Tower", "Voyage",
+    "Machine", "Forest", "City", "Crown", "Ocean", "Mirror", "Winter", "Key",
+)
+FIRST_NAMES = (
+    "Anna", "Piotr", "Maria", "John", "Agnieszka", "Tomasz", "Laura", "Ursula",
+    "Isaac", "Terry", "Neil", "Brandon", "Agatha", "Stephen", "Philip", "Ewa",
+)
+LAST_NAMES = (
+    "Nowak", "Kowalski", "Smith", "Le Guin", "Asimov", "Pratchett", "Gaiman", "King",
+    "Christie", "Dick", "Lem", "Tokarczuk", "Sapkowski", "Clarke", "Martin", "Zajdel",
+)
+GENRE_NAMES = (
+    "Fantasy", "Science Fiction", "Mystery", "Romance", "Horror", "Adventure",
+    "Dystopian", "Comedy", "History", "Biography", "Poetry", "Thriller",
+)
+
+
+@dataclass(frozen=True)
+class CatalogSize:
+    """Row counts for one generated catalog"""
+    books: int
+    orders: int
+    authors: int
+    genres: int
+    publishers: int
+
+
+def skewed_index(rng: random.Random, n: int, skew: float) -> int:
+    """Pick an index in [0, n) where low indexes are much more likely for skew > 1"""
+    return min(int(n * rng.random() ** skew), n - 1)
+
+
+def _insert_batched(conn, table, rows, batch_size: int) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+
+
+def generate_catalog(
+    engine: Engine,
+    size: CatalogSize,
+    seed: int = 42,
+    batch_size: int = 20_000,
+    book_skew: float = 3.0,
+    author_skew: float = 2.0,
+    now: datetime | None = None,
+) -> None:
+    """Fill an empty database with a reproducible catalog and order history.
+
+    The same `size` and `seed` always produce identical rows; ids are assigned
+    explicitly starting at 1.
+    """
+    rng = random.Random(seed)
+    now = now or datetime(2026, 1, 1, tzinfo=timezone.utc)
+    prices: list[float] = []
+
+    def authors():
+        for i in range(1, size.authors + 1):
+            name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]} {i}"
+            yield {"id": i, "name": name, "bio": None}
+
+    def genres():
+        for i in range(1, size.genres + 1):
+            base = GENRE_NAMES[(i - 1) % len(GENRE_NAMES)]
+            name = base if i <= len(GENRE_NAMES) else f"{base} {i}"
+            yield {"id": i, "name": name, "description": f"{name} books"}
+
+    def publishers():
+        for i in range(1, size.publishers + 1):
+            yield {"id": i, "name": f"Publisher {i}", "address": None, "contact": f"info@publisher{i}.example"}
+
+    def books():
+        for i in range(1, size.books + 1):
+            title = f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+            price = round(rng.uniform(4.99, 79.99), 2)
+            prices.append(price)
+            yield {
+                "id": i,
+                "title": title,
+                "description": f"A story about the {title.lower()}.",
+                "price": price,
+                "stock": 0 if rng.random() < 0.1 else rng.randint(1, 200),
+                "isbn": f"978{i:010d}",
+                "published_year": rng.randint(1900, 2025),
+                "publisher_id": skewed_index(rng, size.publishers, 1.5) + 1,
+            }
+
+    def book_authors():
+        for book_id in range(1, size.books + 1):
+            count = 1 + (rng.random() < 0.2) + (rng.random() < 0.05)
+            for author_id in {skewed_index(rng, size.authors, author_skew) + 1 for _ in range(count)}:
+                yield {"book_id": book_id, "author_id": author_id}
+
+    def book_genres():
+        for book_id in range(1, size.books + 1):
+            count = 1 + (rng.random() < 0.4) + (rng.random() < 0.1)
+            for genre_id in {skewed_index(rng, size.genres, 1.5) + 1 for _ in range(count)}:
+                yield {"book_id": book_id, "genre_id": genre_id}
+
+    def orders_with_items(conn):
+        """Insert orders and their items together so item rows never pile up in memory"""
+        order_rows, item_rows = [], []
+        item_id = 0
+        for order_id in range(1, size.orders + 1):
+            total = 0.0
+            lines = {}
+            for _ in range(rng.choice((1, 1, 1, 2, 2, 3, 4))):
+                book_id = skewed_index(rng, size.books, book_skew) + 1
+                lines[book_id] = lines.get(book_id, 0) + rng.randint(1, 2)
+            for book_id, quantity in lines.items():
+                item_id += 1
+                price = prices[book_id - 1]
+                total += price * quantity
+                item_rows.append({
+                    "id": item_id,
+                    "order_id": order_id,
+                    "book_id": book_id,
+                    "quantity": quantity,
+                    "price_at_purchase": price,
+                })
+            order_rows.append({
+                "id": order_id,
+                "customer_name": f"Customer {order_id}",
+                "email": f"customer{order_id}@example.com",
+                "phone": None,
+                "address": f"{order_id} Main Street",
+                "postal_code": f"{order_id % 100000:05d}",
+                "status": "pending" if rng.random() < 0.2 else "done",
+                "total_price": round(total, 2),
+                "created_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+            })
+            if len(order_rows) >= batch_size or order_id == size.orders:
+                conn.execute(insert(Order.__table__), order_rows)
+                conn.execute(insert(OrderItem.__table__), item_rows)
+                order_rows, item_rows = [], []
+
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA synchronous = OFF"))
+        _insert_batched(conn, Author.__table__, authors(), batch_size)
+        _insert_batched(conn, Genre.__table__, genres(), batch_size)
+        _insert_batched(conn, Publisher.__table__, publishers(), batch_size)
+        _insert_batched(conn, Book.__table__, books(), batch_size)
+        _insert_batched(conn, book_author, book_authors(), batch_size)
+        _insert_batched(conn, book_genre, book_genres(), batch_size)
+        if size.orders:
+            orders_with_items(conn)
+            recount_units_sold(conn)
+            backfill_sales_daily(conn)
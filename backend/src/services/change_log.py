@@ -0,0 +1,119 @@
+"""Reading and compacting the change_log behind GET /changes.
+
+Clients keep the `last_seq` of their previous read and ask for what changed
+since. Compaction keeps the log bounded without losing anything a client
+needs: a record superseded by a newer one for the same entity is redundant,
+as the client fetches the entity's current state either way. Past
+`settings.change_log_retain` records the oldest are dropped too, moving the
+horizon; a client that last read before it gets 410 and reloads.
+
+The API compacts once `settings.change_log_compact_every` records were
+added since its last compaction; the CLI compacts on demand:
+
+    python -m src.services.change_log --database-url sqlite:///../db/bookstore.db
+"""
+import argparse
+import logging
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import and_, create_engine, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models import ChangeLog, ChangeLogHorizon
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = ("book", "author", "genre", "publisher", "order")
+
+_log = ChangeLog.__table__
+_compacted_seq: WeakKeyDictionary = WeakKeyDictionary()
+
+
+class ChangesCompacted(Exception):
+    """The changes since a client's seq were partly dropped by compaction"""
+
+
+def horizon(db: Session) -> int:
+    """Highest seq dropped by truncation, 0 if none"""
+    return db.scalar(select(ChangeLogHorizon.seq).where(ChangeLogHorizon.id == 1)) or 0
+
+
+def last_seq(db: Session) -> int:
+    """Seq of the newest change"""
+    return db.scalar(select(func.max(ChangeLog.seq))) or horizon(db)
+
+
+def read_changes(db: Session, since: int, entities, limit: int) -> tuple[list[ChangeLog], int, bool]:
+    """Changes after `since` of the given entities, oldest first; (changes, seq to resume from, more pending)"""
+    if since < horizon(db):
+        raise ChangesCompacted
+    # Bounded by the newest seq read up front, so the cursor skips other entities' changes but nothing newer
+    newest = last_seq(db)
+    query = select(ChangeLog).where(ChangeLog.seq > since, ChangeLog.seq <= newest)
+    if entities:
+        # Filtered on the walk in seq order: `|| ''` keeps SQLite off the entity index, which would need a sort
+        query = query.where((ChangeLog.entity + "").in_(entities))
+    changes = list(db.scalars(query.order_by(ChangeLog.seq).limit(limit + 1)))
+    # Reads are not one snapshot; a compaction committed meanwhile may have truncated past since
+    if since < horizon(db):
+        raise ChangesCompacted
+    if len(changes) > limit:
+        return changes[:limit], changes[limit - 1].seq, True
+    return changes, max(newest, since), False
+
+
+def compact_change_log(db: Session, retain: int | None = None, after: int = 0) -> int:
+    """Drop superseded records, then all but the newest `retain`; returns the number dropped.
+
+    Only records newer than `after` are looked at for superseding older ones,
+    so a log compacted up to there before is not scanned again.
+    """
+    retain = settings.change_log_retain if retain is None else retain
+    newer, older = _log.alias("newer"), _log.alias("older")
+    superseded = select(older.c.seq).join(newer, and_(
+        older.c.entity == newer.c.entity, older.c.entity_id == newer.c.entity_id, older.c.seq < newer.c.seq,
+    )).where(newer.c.seq > after)
+    dropped = db.execute(delete(_log).where(_log.c.seq.in_(superseded))).rowcount
+    cut = db.scalar(select(_log.c.seq).order_by(_log.c.seq.desc()).offset(retain).limit(1))
+    if cut is not None:
+        dropped += db.execute(delete(_log).where(_log.c.seq <= cut)).rowcount
+        upsert = sqlite_insert(ChangeLogHorizon).values(id=1, seq=cut)
+        db.execute(upsert.on_conflict_do_update(index_elements=[ChangeLogHorizon.id], set_={"seq": cut}))
+    db.commit()
+    return dropped
+
+
+def maybe_compact(db: Session, seq: int) -> None:
+    """Compact in a session of its own once enough changes were added since this process last did"""
+    bind = db.get_bind()
+    after = _compacted_seq.get(bind, 0)
+    if seq - after < settings.change_log_compact_every:
+        return
+    _compacted_seq[bind] = seq
+    try:
+        with Session(bind=bind) as compaction:
+            compact_change_log(compaction, after=after)
+    except OperationalError as e:
+        logger.info("Skipped change_log compaction: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the change log behind GET /changes")
+    parser.add_argument("--database-url", default=None, help="defaults to the application database")
+    parser.add_argument("--retain", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from src.core.database import engine
+    with Session(bind=engine) as db:
+        dropped = compact_change_log(db, args.retain)
+    print(f"{dropped} change records dropped")
+
+
+if __name__ == "__main__":
+    main()
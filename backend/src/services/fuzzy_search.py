@@ -0,0 +1,90 @@
+"""Typo-tolerant book search over the book_search trigram index.
+
+Exact search matches substrings, so "Tolkein" or "Pratchet" find nothing.
+Fuzzy search asks the FTS5 trigram index on titles and author names for
+the FUZZY_CANDIDATES books sharing most query trigrams (bm25, so rare
+trigrams weigh more), then rescores them: each query word is compared
+with the most similar word of the title and author names by trigram
+similarity, i.e. shared over distinct padded trigrams as in pg_trgm, and
+books averaging at least MIN_SIMILARITY are kept. Descriptions are never
+searched, so no query scans the catalog.
+
+Ranking costs one bm25 score per row matching any trigram, so only the
+rarer half of the query's trigrams found in the index (at least
+MIN_QUERY_TRIGRAMS) is looked up; a word's common trigrams ("ing", "the")
+add little to its rare ones anyway.
+"""
+from sqlalchemy import bindparam, column, literal_column, select, table
+from sqlalchemy.orm import Query, Session
+
+from src.models import BookSearch
+from src.models.book_search import TRIGRAM_TABLE, TRIGRAM_VOCAB_TABLE
+from src.services.suggest import normalize
+
+FUZZY_CANDIDATES = 200
+MIN_SIMILARITY = 0.3
+MIN_QUERY_TRIGRAMS = 3
+
+_trigram_index = table(TRIGRAM_TABLE, column("rowid"), column("rank"))
+_trigram_vocab = table(TRIGRAM_VOCAB_TABLE, column("term"), column("doc"))
+_DOC_COUNTS = select(_trigram_vocab.c.term, _trigram_vocab.c.doc).where(
+    _trigram_vocab.c.term.in_(bindparam("terms", expanding=True))
+)
+
+
+def trigrams(word: str) -> set[str]:
+    """Trigrams of a word padded like pg_trgm, so short words and word edges count"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(grams_a: set[str], grams_b: set[str]) -> float:
+    """Share of distinct trigrams two words have in common, 0 to 1"""
+    shared = len(grams_a & grams_b)
+    return shared / (len(grams_a) + len(grams_b) - shared)
+
+
+def _match_expression(db: Session, words: list[str]) -> str | None:
+    """FTS5 query for rows containing any of the rarer unpadded trigrams of the words"""
+    grams = {word[i:i + 3] for word in words for i in range(len(word) - 2)}
+    if not grams:
+        return None
+    doc_counts = dict(db.execute(_DOC_COUNTS, {"terms": sorted(grams)}).all())
+    rarest = sorted(doc_counts, key=lambda gram: (doc_counts[gram], gram))
+    selected = rarest[:max(MIN_QUERY_TRIGRAMS, (len(rarest) + 1) // 2)]
+    return " OR ".join(f'"{gram}"' for gram in sorted(selected)) or None
+
+
+def fuzzy_matches(query: Query, search: str, candidates: int = FUZZY_CANDIDATES) -> list[tuple[int, float]]:
+    """(book id, similarity) of the books of a book_search query that resemble `search`, best first"""
+    words = normalize(search)
+    expression = _match_expression(query.session, words)
+    if expression is None:
+        return []
+    rows = (
+        query.join(_trigram_index, _trigram_index.c.rowid == BookSearch.book_id)
+        .filter(literal_column(TRIGRAM_TABLE).op("MATCH")(expression))
+        .order_by(_trigram_index.c.rank)
+        .with_entities(BookSearch.book_id, BookSearch.title, BookSearch.author_names)
+        .limit(candidates)
+        .all()
+    )
+
+    query_grams = [trigrams(word) for word in words]
+    # Titles of a series and books of one author repeat words
+    word_grams: dict[str, set[str]] = {}
+    matches = []
+    for book_id, title, author_names in rows:
+        text_grams = []
+        for text_word in set(normalize(f"{title} {author_names}")):
+            grams = word_grams.get(text_word)
+            if grams is None:
+                grams = word_grams[text_word] = trigrams(text_word)
+            text_grams.append(grams)
+        score = sum(
+            max((similarity(grams, other) for other in text_grams), default=0.0) for grams in query_grams
+        ) / len(words)
+        if score >= MIN_SIMILARITY:
+            matches.append((book_id, score))
+    matches.sort(key=lambda match: (-match[1], match[0]))
+    return matches
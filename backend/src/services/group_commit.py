@@ -0,0 +1,108 @@
+"""Group commit: one writer applying queued writes in shared transactions.
+
+SQLite has one writer at a time and every commit waits for the journal to
+reach the disk, so writes committed one by one are capped at about the
+disk's fsync rate. A `GroupCommitWriter` takes requests from an asyncio
+queue, waits up to `max_wait_s` for up to `batch_size` of them and applies
+the batch on a worker thread in one transaction, begun IMMEDIATE so it
+holds the write lock from the start. Each request runs under its own
+savepoint, so one failing request leaves the others of its batch alone.
+
+The caller's future gets the request's result or exception; if the commit
+itself fails, every request of the batch gets that error. A caller that
+gives up waiting does not withdraw its request.
+"""
+import asyncio
+import logging
+import weakref
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Single writer task committing queued requests in batches.
+
+    `apply(db, request)` performs one request and returns its result;
+    `after_commit(db, requests)` runs after a batch committed with the
+    requests that succeeded.
+    """
+
+    def __init__(self, bind, apply, after_commit=None, batch_size: int = 32, max_wait_s: float = 0.002):
+        # Weak, so a writer kept per engine does not keep its engine alive
+        self._bind = weakref.ref(bind)
+        self.apply = apply
+        self.after_commit = after_commit
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.batches = 0
+        self.requests = 0
+        self.loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = self.loop.create_task(self._run())
+
+    async def submit(self, request):
+        """Queue a request and wait for its batch to commit"""
+        future = self.loop.create_future()
+        self._queue.put_nowait((request, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if self.max_wait_s > 0 and self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.max_wait_s)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            outcomes = await asyncio.to_thread(self._apply_batch, [request for request, _ in batch])
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+    def _apply_batch(self, requests: list) -> list:
+        with Session(bind=self._bind(), autoflush=False) as db:
+            try:
+                # pysqlite only begins before DML, which would make each savepoint its own transaction
+                db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+                outcomes = []
+                for request in requests:
+                    try:
+                        with db.begin_nested():
+                            outcomes.append(self.apply(db, request))
+                    except Exception as exc:
+                        outcomes.append(exc)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                return [exc] * len(requests)
+            if self.after_commit is not None:
+                applied = [
+                    request for request, outcome in zip(requests, outcomes) if not isinstance(outcome, Exception)
+                ]
+                if applied:
+                    try:
+                        self.after_commit(db, applied)
+                    except Exception:
+                        # The batch is committed; its callers succeeded either way
+                        logger.exception("Group commit after_commit failed")
+            return outcomes
+
+    async def close(self) -> None:
+        """Stop taking batches; requests still queued are failed"""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Writer closed"))
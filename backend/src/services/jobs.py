@@ -0,0 +1,178 @@
+"""In-process background jobs for long admin operations.
+
+A job is a `jobs` row run by one of `settings.job_workers` threads. Its
+handler, registered per kind with `@job_handler`, works through its items
+in chunks of `settings.job_chunk_size` and calls `JobRun.commit` after each
+one, so the chunk and the job's progress commit together and the write
+lock is released between chunks. Before the next chunk the job pauses for
+`settings.job_chunk_pause_ms`, letting waiting writers in, and stops there
+if it was asked to cancel. Chunks already committed stay committed; a
+cancelled or failed job reports how far it got.
+
+Jobs run in the process that queued them and do not survive it: jobs of a
+process that is gone are marked failed by `fail_interrupted_jobs` at
+startup.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models import Job
+
+logger = logging.getLogger(__name__)
+
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+_handlers: dict = {}
+_executor: ThreadPoolExecutor | None = None
+_futures: dict[int, Future] = {}
+_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised between chunks of a job asked to cancel"""
+
+
+def job_handler(kind: str):
+    """Register `handler(run: JobRun) -> dict` as the handler of a job kind"""
+
+    def register(handler):
+        _handlers[kind] = handler
+        return handler
+
+    return register
+
+
+class JobRun:
+    """A running job as its handler sees it"""
+
+    def __init__(self, db: Session, job: Job):
+        self.db = db
+        self.job = job
+        self.params = job.params
+
+    def chunks(self, items: list):
+        """Items in chunks of `settings.job_chunk_size`, pausing and checking for cancellation in between"""
+        size = settings.job_chunk_size
+        for start in range(0, len(items), size):
+            if start:
+                if settings.job_chunk_pause_ms:
+                    time.sleep(settings.job_chunk_pause_ms / 1000)
+                if self.db.scalar(select(Job.cancel_requested).where(Job.id == self.job.id)):
+                    raise JobCancelled
+            yield items[start:start + size]
+
+    def commit(self, done: int) -> None:
+        """Commit the work on a chunk together with `done` more items of progress"""
+        self.db.execute(update(Job).where(Job.id == self.job.id).values(done=Job.done + done))
+        self.db.commit()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.job_workers, thread_name_prefix="job")
+        return _executor
+
+
+def submit_job(db: Session, kind: str, params: dict, total: int) -> Job:
+    """Queue a job and start it once a worker is free"""
+    job = Job(kind=kind, params=params, total=total, status="queued", worker=WORKER)
+    db.add(job)
+    db.commit()
+    # Loaded before a worker can touch the row, so the caller never reads it mid-run
+    db.refresh(job)
+    job_id = job.id
+    future = _get_executor().submit(_run_job, db.get_bind(), job_id)
+    with _lock:
+        _futures[job_id] = future
+    future.add_done_callback(lambda _: _futures.pop(job_id, None))
+    return job
+
+
+def wait_for_job(job_id: int, timeout: float | None = None) -> None:
+    """Block until a job queued by this process has finished"""
+    with _lock:
+        future = _futures.get(job_id)
+    if future is not None:
+        future.result(timeout)
+
+
+def _finish(db: Session, job_id: int, **values) -> None:
+    db.execute(update(Job).where(Job.id == job_id).values(finished_at=_now(), **values))
+    db.commit()
+
+
+def _run_job(bind, job_id: int) -> None:
+    with Session(bind=bind, autoflush=False) as db:
+        # A job cancelled while queued is already finished
+        started = db.execute(
+            update(Job).where(Job.id == job_id, Job.status == "queued").values(status="running", started_at=_now())
+        ).rowcount
+        db.commit()
+        if not started:
+            return
+        job = db.get(Job, job_id)
+        try:
+            result = _handlers[job.kind](JobRun(db, job))
+        except JobCancelled:
+            db.rollback()
+            _finish(db, job_id, status="cancelled")
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Job %s (%s) failed", job_id, job.kind)
+            _finish(db, job_id, status="failed", error=str(exc))
+        else:
+            _finish(db, job_id, status="done", result=result)
+
+
+def cancel_job(db: Session, job_id: int) -> None:
+    """Cancel a queued job now, or ask a running one to stop after its current chunk"""
+    cancelled = db.execute(
+        update(Job).where(Job.id == job_id, Job.status == "queued")
+        .values(status="cancelled", cancel_requested=True, finished_at=_now())
+    ).rowcount
+    if not cancelled:
+        db.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(cancel_requested=True))
+    db.commit()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fail_interrupted_jobs(db: Session) -> int:
+    """Mark unfinished jobs of processes no longer running on this host as failed"""
+    host = socket.gethostname()
+    interrupted = []
+    for job_id, worker in db.execute(select(Job.id, Job.worker).where(Job.status.in_(["queued", "running"]))):
+        worker_host, _, pid = worker.rpartition(":")
+        # A container restarted under the same pid is a new process too
+        if worker_host == host and (int(pid) == os.getpid() or not _process_alive(int(pid))):
+            interrupted.append(job_id)
+    if interrupted:
+        db.execute(
+            update(Job).where(Job.id.in_(interrupted))
+            .values(status="failed", error="Interrupted by a restart", finished_at=_now())
+        )
+        db.commit()
+    return len(interrupted)
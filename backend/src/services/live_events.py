@@ -0,0 +1,111 @@
+"""In-process pub/sub of order events for live admin dashboards.
+
+Order write paths call `publish` after committing; every subscriber, one per
+open `GET /events/stream`, gets the event on its own bounded queue on its
+event loop, so publishing from a job or writer thread never blocks on a
+client. A subscriber that falls `settings.sse_queue_size` events behind has
+its pending events dropped and gets a single `resync` event instead, after
+which it should reload what it shows and carry on from the live events.
+
+Events are only seen by clients of the process that made the change; with
+several workers, dashboards still resync on reconnect.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from datetime import datetime
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A client's queue of (id, type, data) events"""
+
+    def __init__(self, size: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.dropped = 0
+
+    def offer(self, event: tuple) -> None:
+        """Queue an event, trading the backlog for a resync if the client fell too far behind"""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait((event[0], "resync", {"dropped": self.dropped}))
+            return
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """Fans events out to the subscriptions of every event loop in the process"""
+
+    def __init__(self):
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(settings.sse_queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, data: dict) -> None:
+        """Queue an event for every subscriber; callable from any thread"""
+        with self._lock:
+            event = (next(self._ids), event_type, data)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Its loop is closed; the stream is gone without having unsubscribed
+                self.unsubscribe(subscription)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+
+broker = EventBroker()
+
+
+def publish(event_type: str, data: dict) -> None:
+    """Publish an event to the live streams of this process"""
+    broker.publish(event_type, data)
+
+
+def format_event(event: tuple) -> str:
+    """An event in the text/event-stream format"""
+    event_id, event_type, data = event
+    payload = json.dumps(data, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+async def event_stream(is_disconnected):
+    """A new subscriber's stream, with heartbeats while idle; unsubscribes when closed"""
+    # Subscribed once iterated, so a stream never started leaves nothing behind
+    subscription = broker.subscribe()
+    try:
+        # Clients reconnect after `retry` ms and should load their state once connected
+        yield f"retry: {settings.sse_retry_ms}\n" + format_event((0, "ready", {}))
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), settings.sse_heartbeat_s)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,97 @@
+"""Moving old finished orders out of the hot order tables.
+
+Orders with status `done` older than `settings.order_archive_after_days`
+are copied with their items into the archive file (see
+`src.models.order_archive`) and deleted from orders and order_items, one
+transaction per batch, so the tables every checkout and listing touches
+stay small. Sales rollups, units sold and co-purchase counts are left as
+they are: archived orders still count, and the rebuilds read both.
+
+The newest order and the order owning the newest item are never moved, so
+SQLite cannot hand an archived id out again.
+
+    python -m src.services.order_archive --database-url sqlite:///../db/bookstore.db
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from src.models.order_archive import attach_archive
+
+ARCHIVE_BATCH_ORDERS = 1000
+
+_orders = Order.__table__
+_items = OrderItem.__table__
+
+
+def archive_cutoff(older_than_days: int | None = None) -> datetime:
+    """Orders created before this are old enough to archive"""
+    days = settings.order_archive_after_days if older_than_days is None else older_than_days
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+
+
+def archivable_order_ids(db: Session, cutoff: datetime) -> list[int]:
+    """Ids of done orders created before cutoff, oldest first"""
+    keep = [
+        db.scalar(select(func.max(Order.id))),
+        db.scalar(select(OrderItem.order_id).order_by(OrderItem.id.desc()).limit(1)),
+    ]
+    query = select(Order.id).where(Order.status == "done", Order.created_at < cutoff)
+    query = query.where(Order.id.not_in([order_id for order_id in keep if order_id is not None]))
+    # Read off the status and date index; sorting here spares a temp B-tree
+    return sorted(db.scalars(query))
+
+
+def archive_batch(db: Session, order_ids: list[int]) -> int:
+    """Move the orders that are still done with their items to the archive, without committing.
+
+    Must run before anything else writes in the session's transaction, so
+    the archive can be attached. Returns the number of orders moved.
+    """
+    attach_archive(db.connection(), create=True)
+    moved = select(_orders.c.id).where(_orders.c.id.in_(order_ids), _orders.c.status == "done")
+    columns = [column.name for column in _orders.columns]
+    db.execute(insert(ArchivedOrder.__table__).from_select(
+        columns, select(*(_orders.c[name] for name in columns)).where(_orders.c.id.in_(moved))
+    ))
+    item_columns = [column.name for column in _items.columns]
+    db.execute(insert(ArchivedOrderItem.__table__).from_select(
+        item_columns, select(*(_items.c[name] for name in item_columns)).where(_items.c.order_id.in_(moved))
+    ))
+    db.execute(delete(_items).where(_items.c.order_id.in_(moved)))
+    return db.execute(delete(_orders).where(_orders.c.id.in_(moved))).rowcount
+
+
+def archive_orders(db: Session, older_than_days: int | None = None, batch_orders: int = ARCHIVE_BATCH_ORDERS) -> int:
+    """Archive all orders old enough, `batch_orders` per transaction; returns the number moved"""
+    order_ids = archivable_order_ids(db, archive_cutoff(older_than_days))
+    db.commit()
+    archived = 0
+    for start in range(0, len(order_ids), batch_orders):
+        archived += archive_batch(db, order_ids[start:start + batch_orders])
+        db.commit()
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old done orders to the archive database")
+    parser.add_argument("--database-url", default=None, help="defaults to the application database")
+    parser.add_argument("--older-than-days", type=int, default=None)
+    parser.add_argument("--batch-orders", type=int, default=ARCHIVE_BATCH_ORDERS)
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from src.core.database import engine
+    with Session(bind=engine) as db:
+        archived = archive_orders(db, args.older_than_days, args.batch_orders)
+    print(f"{archived} orders archived")
+
+
+if __name__ == "__main__":
+    main()
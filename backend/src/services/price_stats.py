@@ -0,0 +1,141 @@
+"""Price distribution of in-stock books for the shop's price slider.
+
+The unfiltered distribution is served from `PriceIndex`, a sorted array of
+in-stock prices kept per engine and patched from `books_changed`, so the
+landing page never scans the catalog. Histograms over it cost one bisect per
+bucket edge. Filtered distributions are aggregated in SQL.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Query, Session
+
+from src.core.events import on_books_changed, on_catalog_reset
+from src.models import Book, BookSearch
+
+# Above this many changed books a rebuild is cheaper than patching one by one
+REBUILD_THRESHOLD = 1000
+
+
+def bucket_edges(low: float, high: float, buckets: int) -> list[float]:
+    """`buckets + 1` equal-width edges from low to high"""
+    width = (high - low) / buckets
+    return [low + width * i for i in range(buckets)] + [high]
+
+
+def build_response(low: float | None, high: float | None, counts: list[int]) -> dict:
+    """Shape min/max and per-bucket counts as a PriceStatsResponse"""
+    if low is None:
+        return {"min": None, "max": None, "count": 0, "buckets": []}
+    edges = bucket_edges(low, high, len(counts))
+    return {
+        "min": low,
+        "max": high,
+        "count": sum(counts),
+        "buckets": [
+            {"min": round(edges[i], 2), "max": round(edges[i + 1], 2), "count": count}
+            for i, count in enumerate(counts)
+        ],
+    }
+
+
+class PriceIndex:
+    """Sorted prices of in-stock books, updated incrementally"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.prices: list[float] = []
+        self.book_prices: dict[int, float] = {}
+
+    def load(self, db: Session) -> None:
+        rows = db.execute(select(Book.id, Book.price).where(Book.stock > 0)).all()
+        with self._lock:
+            self.book_prices = {book_id: price for book_id, price in rows}
+            self.prices = sorted(self.book_prices.values())
+            self.loaded = True
+
+    def apply(self, db: Session, book_ids: set[int]) -> None:
+        """Re-read the given books and patch the sorted prices"""
+        if not self.loaded:
+            return
+        if len(book_ids) > REBUILD_THRESHOLD:
+            self.load(db)
+            return
+        rows = db.execute(
+            select(Book.id, Book.price).where(Book.id.in_(book_ids), Book.stock > 0)
+        ).all()
+        current = {book_id: price for book_id, price in rows}
+        with self._lock:
+            for book_id in book_ids:
+                old = self.book_prices.pop(book_id, None)
+                if old is not None:
+                    del self.prices[bisect_left(self.prices, old)]
+                new = current.get(book_id)
+                if new is not None:
+                    self.book_prices[book_id] = new
+                    insort(self.prices, new)
+
+    def stats(self, buckets: int) -> dict:
+        with self._lock:
+            if not self.prices:
+                return build_response(None, None, [])
+            low, high = self.prices[0], self.prices[-1]
+            if low == high:
+                return build_response(low, high, [len(self.prices)] + [0] * (buckets - 1))
+            edges = bucket_edges(low, high, buckets)
+            positions = [bisect_left(self.prices, edge) for edge in edges[:-1]]
+            positions.append(bisect_right(self.prices, high))
+        counts = [positions[i + 1] - positions[i] for i in range(buckets)]
+        return build_response(low, high, counts)
+
+
+_indexes: WeakKeyDictionary = WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def price_index(db: Session) -> PriceIndex:
+    """The loaded price index for this session's engine"""
+    bind = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(bind)
+        if index is None:
+            index = _indexes[bind] = PriceIndex()
+    if not index.loaded:
+        index.load(db)
+    return index
+
+
+@on_books_changed
+def _update_price_index(db: Session, book_ids: set[int]) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None:
+        index.apply(db, book_ids)
+
+
+@on_catalog_reset
+def _reload_price_index(db: Session) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None and index.loaded:
+        index.load(db)
+
+
+def filtered_price_stats(db: Session, query: Query, buckets: int) -> dict:
+    """Aggregate the price distribution of a filtered book_search query in SQL"""
+    books = query.with_entities(BookSearch.price).subquery()
+    low, high = db.execute(select(func.min(books.c.price), func.max(books.c.price))).one()
+    if low is None:
+        return build_response(None, None, [])
+    if low == high:
+        total = db.scalar(select(func.count()).select_from(books))
+        return build_response(low, high, [total] + [0] * (buckets - 1))
+
+    # Same edges as bucket_edges; the top edge belongs to the last bucket
+    bucket = func.min(cast((books.c.price - low) * buckets / (high - low), Integer), buckets - 1)
+    rows = db.execute(select(bucket, func.count()).group_by(bucket)).all()
+    counts = [0] * buckets
+    for index, count in rows:
+        counts[index] = count
+    return build_response(low, high, counts)
@@ -0,0 +1,128 @@
+"""Server-side cart pricing and signed quotes for checkout.
+
+`price_cart` reads every book of a cart in one query and returns the line
+prices, availability and totals (VAT and shipping as configured). A cart
+whose lines are all available also gets a quote: its items, unit prices and
+total, signed with HMAC-SHA256 under `settings.quote_secret` and valid for
+`settings.quote_ttl_s`. Checkout given a quote trusts those prices instead
+of reading the books again, and only has to take the stock.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import math
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models import Book
+
+QUOTE_VERSION = 1
+
+
+class QuoteError(ValueError):
+    """A quote that is malformed, tampered with or expired"""
+
+
+def cart_quantities(items) -> dict[int, int]:
+    """Quantity per book of checkout items, adding up repeated books"""
+    quantities: dict[int, int] = {}
+    for item in items:
+        quantities[item.book_id] = quantities.get(item.book_id, 0) + item.quantity
+    return quantities
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload: bytes) -> bytes:
+    return hmac.new(settings.quote_secret.encode(), payload, hashlib.sha256).digest()
+
+
+def sign_quote(items: list[tuple[int, int, float]], total: float, now: float | None = None) -> str:
+    """Token for (book id, quantity, unit price) items at `total`"""
+    expires_at = int(now if now is not None else time.time()) + settings.quote_ttl_s
+    payload = json.dumps(
+        {"v": QUOTE_VERSION, "items": items, "total": total, "exp": expires_at}, separators=(",", ":")
+    ).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+
+def verify_quote(token: str, now: float | None = None) -> dict:
+    """Payload of a quote signed here and not yet expired"""
+    try:
+        encoded_payload, encoded_signature = token.split(".")
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except ValueError as exc:
+        raise QuoteError("Invalid quote") from exc
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise QuoteError("Invalid quote")
+    quote = json.loads(payload)
+    if quote.get("v") != QUOTE_VERSION:
+        raise QuoteError("Invalid quote")
+    if quote["exp"] < (now if now is not None else time.time()):
+        raise QuoteError("Quote expired, please review your cart again")
+    return quote
+
+
+def cart_total(subtotal: float) -> float:
+    """What a cart costs with VAT and shipping on top of its subtotal"""
+    tax = subtotal * settings.vat_rate
+    # Rounded down to the grosz, as the shop has always charged
+    return math.floor((subtotal + tax + settings.shipping_price) * 100) / 100
+
+
+def price_cart(db: Session, quantities: dict[int, int]) -> dict:
+    """Lines, totals and, when every line is available, a signed quote"""
+    books = {
+        row.id: row
+        for row in db.execute(
+            select(Book.id, Book.title, Book.price, Book.stock).where(Book.id.in_(quantities))
+        )
+    }
+    lines = []
+    subtotal = 0.0
+    for book_id, quantity in quantities.items():
+        book = books.get(book_id)
+        if book is None:
+            lines.append({
+                "book_id": book_id, "title": None, "quantity": quantity, "unit_price": None,
+                "line_total": None, "stock": 0, "status": "not_found",
+            })
+            continue
+        subtotal += book.price * quantity
+        lines.append({
+            "book_id": book_id,
+            "title": book.title,
+            "quantity": quantity,
+            "unit_price": book.price,
+            "line_total": round(book.price * quantity, 2),
+            "stock": book.stock,
+            "status": "ok" if book.stock >= quantity else "insufficient_stock",
+        })
+
+    tax = subtotal * settings.vat_rate
+    total = cart_total(subtotal)
+    available = all(line["status"] == "ok" for line in lines)
+    quote = None
+    if available:
+        quote = sign_quote([(line["book_id"], line["quantity"], line["unit_price"]) for line in lines], total)
+    return {
+        "lines": lines,
+        "subtotal": round(subtotal, 2),
+        "tax": round(tax, 2),
+        "shipping": settings.shipping_price,
+        "total": total,
+        "available": available,
+        "quote": quote,
+        "expires_in_s": settings.quote_ttl_s if quote else None,
+    }
@@ -0,0 +1,123 @@
+"""Per-book sales counters behind the bestseller rankings.
+
+Lifetime units sold and rolling 7/30-day windows live on the book_search
+projection next to the other sort keys and are indexed with them. The order
+write paths adjust them inside their own transaction, together with the
+per-day rollups in book_sales_daily, so they never disagree with the
+committed order items. Windows also need sales to age out of them, which
+`refresh_sales_windows` does from the rollups; the app runs it periodically.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models import BookSalesDaily, BookSearch
+
+logger = logging.getLogger(__name__)
+
+# window name -> (book_search column, days including today)
+WINDOWS = {
+    "7d": ("units_sold_7d", 7),
+    "30d": ("units_sold_30d", 30),
+}
+_WIDEST = max(WINDOWS, key=lambda name: WINDOWS[name][1])
+
+_book_search = BookSearch.__table__
+_rollups = BookSalesDaily.__table__
+
+_ADD_UNITS_SOLD = (
+    update(_book_search)
+    .where(_book_search.c.book_id == bindparam("sold_book_id"))
+    .values(
+        units_sold=_book_search.c.units_sold + bindparam("sold_quantity"),
+        **{
+            column: _book_search.c[column] + bindparam(f"sold_{column}")
+            for column, _ in WINDOWS.values()
+        },
+    )
+)
+
+_ADD_ROLLUP = sqlite_insert(_rollups).values(
+    book_id=bindparam("sold_book_id"), day=bindparam("sold_day"), units=bindparam("sold_quantity"),
+)
+_ADD_ROLLUP = _ADD_ROLLUP.on_conflict_do_update(
+    index_elements=[_rollups.c.book_id, _rollups.c.day],
+    set_={"units": _rollups.c.units + _ADD_ROLLUP.excluded.units},
+)
+
+_REFRESH_WINDOWS = text(
+    "UPDATE book_search SET "
+    + ", ".join(
+        f"{column} = coalesce((SELECT sum(units) FROM book_sales_daily AS d"
+        f" WHERE d.book_id = book_search.book_id AND d.day >= :since_{name}), 0)"
+        for name, (column, _) in WINDOWS.items()
+    )
+    + " WHERE "
+    + " OR ".join(f"{column} != 0" for column, _ in WINDOWS.values())
+    + f" OR book_id IN (SELECT book_id FROM book_sales_daily WHERE day >= :since_{_WIDEST})"
+)
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _window_start(days: int, current: date) -> date:
+    return current - timedelta(days=days - 1)
+
+
+def record_sales(db: Session, quantities: dict[int, int], day: date | None = None) -> None:
+    """Add units sold per book id on `day` (default today).
+
+    Negative quantities take back cancelled sales of that day; they only
+    leave the windows the day still falls in.
+    """
+    day = day or today()
+    current = today()
+    params = [
+        {
+            "sold_book_id": book_id,
+            "sold_day": day,
+            "sold_quantity": quantity,
+            **{
+                f"sold_{column}": quantity if day >= _window_start(days, current) else 0
+                for column, days in WINDOWS.values()
+            },
+        }
+        for book_id, quantity in quantities.items() if quantity
+    ]
+    if params:
+        db.execute(_ADD_UNITS_SOLD, params)
+        db.execute(_ADD_ROLLUP, params)
+
+
+def refresh_sales_windows(db: Session) -> None:
+    """Recompute the rolling windows from daily rollups so old sales age out.
+
+    Only books with a non-zero window or a sale inside the widest window
+    are touched. Commits.
+    """
+    current = today()
+    db.execute(_REFRESH_WINDOWS, {
+        f"since_{name}": _window_start(days, current).isoformat() for name, (_, days) in WINDOWS.items()
+    })
+    db.commit()
+
+
+async def run_sales_window_refresh(session_factory) -> None:
+    """Refresh the windows now and then every `settings.sales_window_refresh_s`; runs until cancelled"""
+    def refresh():
+        with session_factory() as db:
+            refresh_sales_windows(db)
+
+    while True:
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception:
+            logger.exception("Sales window refresh failed")
+        await asyncio.sleep(settings.sales_window_refresh_s)
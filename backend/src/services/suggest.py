@@ -0,0 +1,306 @@
+"""In-memory typeahead index over book titles, author and publisher names.
+
+Every name is normalized (case-folded, accents stripped, split on non-word
+characters) and each of its words gets a posting in a sorted vocabulary,
+so a query word is a prefix range found with two bisects. A query of
+several words keeps the entries matching every one of them. Matches are
+ranked by popularity, i.e. lifetime units sold of the book, or of all
+indexed books of the author or publisher.
+
+Only in-stock books, and authors and publishers of at least one of them,
+are indexed, mirroring what the shop lists. The index is kept per engine,
+loaded from book_search at startup and patched from `books_changed`;
+recent results are cached until the next change. Entries are packed as
+`id * 4 + kind` ints, in `array` postings for words shared by several
+entries, to stay within MEMORY_BUDGET_PER_100K.
+"""
+import heapq
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.core.events import on_books_changed, on_catalog_reset
+from src.models import Author, BookSearch, Publisher
+from src.services.bitmap_index import REBUILD_THRESHOLD, _unpack_ids
+
+BOOK, AUTHOR, PUBLISHER = 0, 1, 2
+KIND_NAMES = {BOOK: "book", AUTHOR: "author", PUBLISHER: "publisher"}
+# Bytes per 100k in-stock books the benchmark holds the index to
+MEMORY_BUDGET_PER_100K = 40 * 1024 * 1024
+CACHED_QUERIES = 1024
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> list[str]:
+    """Lowercase, accent-free words of a name or query"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return [word for word in _SEPARATORS.split(stripped) if word]
+
+
+def _ref(kind: int, entity_id: int) -> int:
+    return entity_id * 4 + kind
+
+
+class SuggestIndex:
+    """Prefix index from words to packed (kind, id) entries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.words: list[str] = []
+        # A word of a single entry maps to the bare ref, most words being rare (e.g. numbers)
+        self.postings: dict[str, int | array] = {}
+        # ref -> display name; popularity of each author and publisher
+        self.names: dict[int, str] = {}
+        self.popularity: dict[int, int] = {}
+        # book id -> (units sold, publisher id, *author ids)
+        self.books: dict[int, tuple] = {}
+        # author / publisher ref -> number of indexed books
+        self.book_counts: dict[int, int] = {}
+        self._cache: OrderedDict[tuple, list] = OrderedDict()
+
+    @staticmethod
+    def _book_rows(db: Session, book_ids=None):
+        query = select(
+            BookSearch.book_id, BookSearch.title, BookSearch.units_sold,
+            BookSearch.author_ids, BookSearch.publisher_id,
+        ).where(BookSearch.in_stock.is_(True))
+        if book_ids is not None:
+            query = query.where(BookSearch.book_id.in_(book_ids))
+        return db.execute(query).all()
+
+    @staticmethod
+    def _names(db: Session, author_ids, publisher_ids) -> dict[int, str]:
+        names = {}
+        if author_ids:
+            for author_id, name in db.execute(select(Author.id, Author.name).where(Author.id.in_(author_ids))):
+                names[_ref(AUTHOR, author_id)] = name
+        if publisher_ids:
+            for publisher_id, name in db.execute(
+                select(Publisher.id, Publisher.name).where(Publisher.id.in_(publisher_ids))
+            ):
+                names[_ref(PUBLISHER, publisher_id)] = name
+        return names
+
+    def load(self, db: Session) -> None:
+        rows = self._book_rows(db)
+        author_ids = {author_id for row in rows for author_id in _unpack_ids(row.author_ids)}
+        names = self._names(db, author_ids, {row.publisher_id for row in rows})
+        with self._lock:
+            self._reset()
+            for book_id, title, units_sold, packed_author_ids, publisher_id in rows:
+                book = (units_sold, publisher_id, *_unpack_ids(packed_author_ids))
+                self._add_book(book_id, title, book, names, index_words=False)
+            # Build each posting once instead of appending word by word
+            postings: dict[str, list[int]] = {}
+            for ref, name in self.names.items():
+                for word in set(normalize(name)):
+                    postings.setdefault(word, []).append(ref)
+            self.postings = {
+                word: refs[0] if len(refs) == 1 else array("q", refs) for word, refs in postings.items()
+            }
+            self.words = sorted(self.postings)
+            self.loaded = True
+
+    def _add_words(self, ref: int, name: str) -> None:
+        for word in set(normalize(name)):
+            posting = self.postings.get(word)
+            if posting is None:
+                self.postings[word] = ref
+                insort(self.words, word)
+            elif isinstance(posting, int):
+                self.postings[word] = array("q", [posting, ref])
+            else:
+                posting.append(ref)
+
+    def _remove_words(self, ref: int, name: str) -> None:
+        for word in set(normalize(name)):
+            posting = self.postings[word]
+            if isinstance(posting, int):
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+            else:
+                posting.remove(ref)
+                if len(posting) == 1:
+                    self.postings[word] = posting[0]
+
+    @staticmethod
+    def _entity_refs(book: tuple) -> list[int]:
+        return [_ref(PUBLISHER, book[1])] + [_ref(AUTHOR, author_id) for author_id in book[2:]]
+
+    def _add_book(self, book_id: int, title: str, book: tuple, names: dict[int, str], index_words=True) -> None:
+        units_sold = book[0]
+        ref = _ref(BOOK, book_id)
+        self.books[book_id] = book
+        self.names[ref] = title
+        if index_words:
+            self._add_words(ref, title)
+        for ref in self._entity_refs(book):
+            self.book_counts[ref] = self.book_counts.get(ref, 0) + 1
+            self.popularity[ref] = self.popularity.get(ref, 0) + units_sold
+            if self.book_counts[ref] == 1 and ref in names:
+                self.names[ref] = names[ref]
+                if index_words:
+                    self._add_words(ref, names[ref])
+
+    def _remove_book(self, book_id: int) -> None:
+        book = self.books.pop(book_id)
+        ref = _ref(BOOK, book_id)
+        self._remove_words(ref, self.names.pop(ref))
+        for ref in self._entity_refs(book):
+            self.book_counts[ref] -= 1
+            self.popularity[ref] -= book[0]
+            if not self.book_counts[ref]:
+                del self.book_counts[ref], self.popularity[ref]
+                name = self.names.pop(ref, None)
+                if name is not None:
+                    self._remove_words(ref, name)
+
+    def apply(self, db: Session, book_ids: set[int]) -> None:
+        """Re-read the given books and the names of their authors and publishers"""
+        if not self.loaded:
+            return
+        if len(book_ids) > REBUILD_THRESHOLD:
+            self.load(db)
+            return
+        rows = self._book_rows(db, book_ids)
+        current = {
+            row.book_id: (row.title, (row.units_sold, row.publisher_id, *_unpack_ids(row.author_ids)))
+            for row in rows
+        }
+        with self._lock:
+            books = [self.books.get(book_id) for book_id in book_ids] + [book for _, book in current.values()]
+        author_ids = {author_id for book in books if book for author_id in book[2:]}
+        names = self._names(db, author_ids, {book[1] for book in books if book})
+
+        with self._lock:
+            self._cache.clear()
+            for book_id in book_ids:
+                if book_id in self.books:
+                    self._remove_book(book_id)
+            for book_id, (title, book) in current.items():
+                self._add_book(book_id, title, book, names)
+            # Authors and publishers renamed while keeping their books
+            for ref, name in names.items():
+                old_name = self.names.get(ref)
+                if old_name is not None and old_name != name:
+                    self._remove_words(ref, old_name)
+                    self.names[ref] = name
+                    self._add_words(ref, name)
+
+    def _popularity(self, ref: int) -> int:
+        if ref & 3 == BOOK:
+            return self.books[ref >> 2][0]
+        return self.popularity[ref]
+
+    def _matching(self, prefix: str) -> set[int]:
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + "\U0010ffff", start)
+        refs = set()
+        for word in self.words[start:end]:
+            posting = self.postings[word]
+            if isinstance(posting, int):
+                refs.add(posting)
+            else:
+                refs.update(posting)
+        return refs
+
+    def suggest(self, query: str, limit: int) -> list[dict]:
+        """Up to `limit` entries with a word starting with each query word, most popular first"""
+        words = normalize(query)
+        if not words:
+            return []
+        key = (" ".join(words), limit)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+            # Rarest word first keeps the intersection small
+            candidates = None
+            for word in sorted(set(words), key=len, reverse=True):
+                refs = self._matching(word)
+                candidates = refs if candidates is None else candidates & refs
+                if not candidates:
+                    break
+            top = heapq.nlargest(limit, candidates, key=lambda ref: (self._popularity(ref), -ref))
+            result = [
+                {
+                    "type": KIND_NAMES[ref & 3],
+                    "id": ref >> 2,
+                    "text": self.names[ref],
+                    "popularity": self._popularity(ref),
+                }
+                for ref in top
+            ]
+            self._cache[key] = result
+            if len(self._cache) > CACHED_QUERIES:
+                self._cache.popitem(last=False)
+            return result
+
+    def memory(self) -> dict:
+        """Approximate bytes held, total and per 100k in-stock books"""
+        with self._lock:
+            words = sys.getsizeof(self.words) + sum(sys.getsizeof(word) for word in self.words)
+            postings = sys.getsizeof(self.postings) + sum(
+                sys.getsizeof(posting) for posting in self.postings.values()
+            )
+            names = sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in self.names.values())
+            counters = sum(sys.getsizeof(d) for d in (self.popularity, self.books, self.book_counts)) + sum(
+                sys.getsizeof(book) for book in self.books.values()
+            )
+            books = len(self.books)
+        total = words + postings + names + counters
+        return {
+            "books": books,
+            "words": len(self.words),
+            "words_bytes": words,
+            "postings_bytes": postings,
+            "names_bytes": names,
+            "counters_bytes": counters,
+            "total_bytes": total,
+            "bytes_per_100k_books": round(total * 100_000 / books) if books else 0,
+        }
+
+
+_indexes: WeakKeyDictionary = WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def suggest_index(db: Session) -> SuggestIndex:
+    """The loaded suggest index for this session's engine"""
+    bind = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(bind)
+        if index is None:
+            index = _indexes[bind] = SuggestIndex()
+    if not index.loaded:
+        index.load(db)
+    return index
+
+
+@on_books_changed
+def _update_suggest_index(db: Session, book_ids: set[int]) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None:
+        index.apply(db, book_ids)
+
+
+@on_catalog_reset
+def _reload_suggest_index(db: Session) -> None:
+    index = _indexes.get(db.get_bind())
+    if index is not None and index.loaded:
+        index.load(db)
@@ -3,7 +3,9 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from src.core.config import settings
 from src.core.database import Base, get_db
+from src.core.slow_queries import slow_query_log
 from src.models.admin import Admin
 from main import app
 
@@ -187,3 +189,36 @@ class TestAdminLogout:
         # Verify token no longer works
         verify_response = client.get(f"/api/v1/admin/verify?token={token}")
         assert verify_response.json()["valid"] == False
+
+
+class TestAdminSlowQueries:
+    def test_slow_queries_capture_plan(self, monkeypatch):
+        """Test that slow statements are grouped by shape with their query plan"""
+        monkeypatch.setattr(settings, "slow_query_ms", 0.0)
+        slow_query_log.reset()
+
+        client.get("/api/v1/books/?search=hobbit")
+        client.get("/api/v1/books/?search=dune")
+
+        login_response = client.post(
+            "/api/v1/admin/login",
+            json={"username": "testadmin", "password": "testpass123"}
+        )
+        token = login_response.json()["session_token"]
+
+        response = client.get(f"/api/v1/admin/slow-queries?token={token}&order_by=count")
+        assert response.status_code == 200
+        shapes = [
+            shape for shape in response.json()
+            if "FROM book_search" in shape["shape"] and "LIKE" in shape["shape"]
+        ]
+        assert shapes
+        assert shapes[0]["count"] == 2
+        assert shapes[0]["last_route"] == "/api/v1/books/"
+        assert shapes[0]["plan"]
+        assert shapes[0]["full_scan"] == False
+
+    def test_slow_queries_invalid_token(self):
+        """Test slow query listing requires an admin session"""
+        response = client.get("/api/v1/admin/slow-queries?token=invalid_token")
+        assert response.status_code == 401
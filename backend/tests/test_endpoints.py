@@ -1,11 +1,22 @@
 """Test cases for API endpoints"""
+import asyncio
+import json
+
+import httpx
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 
 from src.core.config import settings
 from src.core.database import get_db
+from src.core.metrics import MetricsMiddleware, metrics
+from src.api.v1.endpoints import orders as orders_endpoints
+from src.api.v1.endpoints.books import encode_cursor
 from src.api.v1.routes.router import api_v1_router
+from src.models.book_search import recount_units_sold
+from src.services import also_bought as also_bought_service, catalog_snapshot, jobs, live_events, sales
 
 
 @pytest.fixture
@@ -17,6 +28,7 @@ def client(test_db):
         version=settings.app_version,
     )
 
+    test_app.add_middleware(MetricsMiddleware)
     test_app.include_router(api_v1_router, prefix="/api/v1")
 
     def override_get_db():
@@ -48,6 +60,40 @@ class TestHealthEndpoints:
         assert "version" in data
         assert "description" in data
 
+    def test_metrics(self, client, test_db):
+        """Test per-route latency and SQL statement metrics"""
+        metrics.reset()
+        client.get("/api/v1/authors/")
+        client.get("/api/v1/authors/999")
+
+        response = client.get("/api/v1/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'bookstore_http_requests_total{method="GET",route="/api/v1/authors/{author_id}",status="404"} 1' in body
+        assert 'bookstore_sql_statements_per_request_count{method="GET",route="/api/v1/authors/"} 1' in body
+        assert 'bookstore_sql_statements_per_request_sum{method="GET",route="/api/v1/authors/"} 1.0' in body
+        # Connection counts of the application's pool
+        assert "bookstore_db_pool_checked_out " in body
+        assert "bookstore_db_pool_timeouts_total 0" in body
+
+        # A failed statement is not counted and leaves no timing behind for the next one
+        statements = metrics.statements_total
+        with pytest.raises(OperationalError):
+            test_db.execute(text("SELECT * FROM missing_table"))
+        test_db.rollback()
+        test_db.execute(text("SELECT 1"))
+        assert metrics.statements_total == statements + 1
+
+    def test_server_timing_header(self, client, monkeypatch):
+        """Test optional Server-Timing header"""
+        assert "server-timing" not in client.get("/api/v1/authors/").headers
+
+        monkeypatch.setattr(settings, "server_timing", True)
+        header = client.get("/api/v1/authors/").headers["server-timing"]
+        assert header.startswith("app;dur=")
+        assert 'desc="1 queries"' in header
+
 
 class TestAuthorsEndpoints:
     """Test authors endpoints"""
@@ -294,6 +340,681 @@ class TestBooksEndpoints:
         assert data["title"] == "Harry Potter"
 
 
+    def _create_priced_books(self, client, publisher_id, genre_id, prices):
+        ids = []
+        for i, price in enumerate(prices):
+            response = client.post(
+                "/api/v1/books/",
+                json={
+                    "title": f"Book {i}",
+                    "price": price,
+                    "stock": 5,
+                    "isbn": f"price-{i}",
+                    "publisher_id": publisher_id,
+                    "author_ids": [],
+                    "genre_ids": [genre_id] if i % 2 == 0 else []
+                }
+            )
+            ids.append(response.json()["id"])
+        return ids
+
+    def test_price_stats(self, client, publisher_and_author_and_genre):
+        """Test unfiltered price distribution follows catalog changes"""
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        assert client.get("/api/v1/books/price-stats").json()["count"] == 0
+
+        ids = self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0, 30.0, 50.0])
+        response = client.get("/api/v1/books/price-stats?buckets=4")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["min"] == 10.0
+        assert data["max"] == 50.0
+        assert [bucket["count"] for bucket in data["buckets"]] == [1, 1, 1, 1]
+        assert data["buckets"][0] == {"min": 10.0, "max": 20.0, "count": 1}
+
+        client.put(
+            f"/api/v1/books/{ids[3]}",
+            json={
+                "title": "Book 3",
+                "price": 50.0,
+                "stock": 0,
+                "isbn": "price-3",
+                "publisher_id": publisher_id,
+                "author_ids": [],
+                "genre_ids": []
+            }
+        )
+        data = client.get("/api/v1/books/price-stats?buckets=2").json()
+        assert data["max"] == 30.0
+        assert data["count"] == 3
+        assert [bucket["count"] for bucket in data["buckets"]] == [1, 2]
+
+    def test_price_stats_follows_other_sessions(self, client, publisher_and_author_and_genre, test_db, monkeypatch):
+        """Test the price index catches up with writes made outside this process's write paths"""
+        from sqlalchemy.orm import Session
+
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0])
+        assert client.get("/api/v1/books/price-stats").json()["max"] == 20.0
+
+        monkeypatch.setattr(settings, "catalog_snapshot_poll_s", 0.0)
+        with Session(bind=test_db.get_bind()) as other:
+            other.execute(text("UPDATE books SET price = 45.0 WHERE id = :id"), {"id": ids[1]})
+            other.commit()
+        data = client.get("/api/v1/books/price-stats").json()
+        assert (data["min"], data["max"], data["count"]) == (10.0, 45.0, 2)
+
+    def test_price_stats_filtered(self, client, publisher_and_author_and_genre):
+        """Test price distribution for a filter context"""
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0, 30.0, 50.0])
+
+        response = client.get(f"/api/v1/books/price-stats?buckets=2&genre_ids={genre_id}")
+        data = response.json()
+        assert data["min"] == 10.0
+        assert data["max"] == 30.0
+        assert [bucket["count"] for bucket in data["buckets"]] == [1, 1]
+
+        data = client.get("/api/v1/books/price-stats?search=nothing").json()
+        assert data == {"min": None, "max": None, "count": 0, "buckets": []}
+
+
+    def test_list_books_filters_and_author_search(self, client, publisher_and_author_and_genre):
+        """Test listing filters and author-name search run on the book_search projection"""
+        publisher_id, author_id, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0, 30.0])
+        client.put(
+            f"/api/v1/books/{ids[1]}",
+            json={
+                "title": "Book 1",
+                "price": 20.0,
+                "stock": 5,
+                "isbn": "price-1",
+                "publisher_id": publisher_id,
+                "author_ids": [author_id],
+                "genre_ids": [genre_id]
+            }
+        )
+
+        data = client.get(f"/api/v1/books/?genre_ids={genre_id}&genre_ids=999").json()
+        assert [book["id"] for book in data["items"]] == ids
+        assert data["total"] == 3
+
+        data = client.get("/api/v1/books/?search=rowl").json()
+        assert [book["id"] for book in data["items"]] == [ids[1]]
+        assert data["items"][0]["authors"][0]["name"] == "J.K. Rowling"
+
+        client.put(f"/api/v1/authors/{author_id}", json={"name": "Robert Galbraith"})
+        assert client.get("/api/v1/books/?search=rowl").json()["total"] == 0
+        assert client.get("/api/v1/books/?search=galb").json()["total"] == 1
+
+        data = client.get(f"/api/v1/books/?author_ids={author_id}&max_price=15").json()
+        assert data["total"] == 0
+
+        client.request("DELETE", "/api/v1/books/bulk-delete", json={"book_ids": [ids[0]]})
+        data = client.get(f"/api/v1/books/?genre_ids={genre_id}&page=1&limit=1").json()
+        assert data["total"] == 2
+        assert data["pages"] == 2
+        assert [book["id"] for book in data["items"]] == [ids[1]]
+
+
+    def test_list_books_fuzzy_search(self, client, publisher_and_author_and_genre, monkeypatch):
+        """Test misspelled searches fall back to trigram matches on titles and author names"""
+        publisher_id, author_id, genre_id = publisher_and_author_and_genre
+        tolkien_id = client.post("/api/v1/authors/", json={"name": "J.R.R. Tolkien"}).json()["id"]
+        for title, author, stock in [
+            ("The Hobbit", tolkien_id, 5),
+            ("The Silmarillion", tolkien_id, 0),
+            ("Harry Potter and the Chamber of Secrets", author_id, 5),
+        ]:
+            client.post("/api/v1/books/", json={
+                "title": title, "description": "A tale of a dragon", "price": 10.0, "stock": stock,
+                "isbn": title, "publisher_id": publisher_id, "author_ids": [author], "genre_ids": [genre_id],
+            })
+
+        def search(query, **params):
+            response = client.get("/api/v1/books/", params={"search": query, **params})
+            assert response.status_code == 200
+            data = response.json()
+            return [book["title"] for book in data["items"]], data["fuzzy"]
+
+        assert search("Tolkein") == (["The Hobbit"], True)
+        assert search("hobit") == (["The Hobbit"], True)
+        assert search("rowlnig chamber") == (["Harry Potter and the Chamber of Secrets"], True)
+        assert search("Tolkein", fuzzy=False) == ([], False)
+        assert search("Tolkein", genre_ids=genre_id + 1) == ([], False)
+        # Descriptions are matched exactly only
+        assert search("dragn") == ([], False)
+        assert search("dragon") == (["The Hobbit", "Harry Potter and the Chamber of Secrets"], False)
+        monkeypatch.setattr(settings, "fuzzy_search_min_results", 0)
+        assert search("Tolkein") == ([], False)
+        monkeypatch.undo()
+
+        client.put(f"/api/v1/authors/{tolkien_id}", json={"name": "Ursula K. Le Guin"})
+        assert search("ursla") == (["The Hobbit"], True)
+        assert search("Tolkein") == ([], False)
+
+    def test_list_books_bitmap_filters(self, client, publisher_and_author_and_genre):
+        """Test genre_match=all, exact price bounds and paging on the bitmap index"""
+        publisher_id, author_id, genre_id = publisher_and_author_and_genre
+        other_genre_id = client.post("/api/v1/genres/", json={"name": "Horror"}).json()["id"]
+        ids = []
+        for i in range(20):
+            genre_ids = [genre_id, other_genre_id] if i % 3 == 0 else [genre_id]
+            response = client.post(
+                "/api/v1/books/",
+                json={
+                    "title": f"Book {i}",
+                    "price": 10.0 + i * 0.5,
+                    "stock": 5,
+                    "isbn": f"bitmap-{i}",
+                    "publisher_id": publisher_id,
+                    "author_ids": [author_id],
+                    "genre_ids": genre_ids
+                }
+            )
+            ids.append(response.json()["id"])
+
+        genres = f"genre_ids={genre_id}&genre_ids={other_genre_id}"
+        assert client.get(f"/api/v1/books/?{genres}").json()["total"] == 20
+        data = client.get(f"/api/v1/books/?{genres}&genre_match=all&limit=100").json()
+        assert [book["id"] for book in data["items"]] == ids[::3]
+
+        data = client.get("/api/v1/books/?min_price=11.0&max_price=12.4&limit=100").json()
+        assert [book["price"] for book in data["items"]] == [11.0, 11.5, 12.0]
+        # Non-finite bounds filter like the SQL comparisons would: NaN matches nothing
+        for params, total in [
+            ("min_price=inf", 0), ("min_price=1e309", 0), ("max_price=nan", 0),
+            ("max_price=inf", 20), ("min_price=-inf&max_price=10.4", 1),
+        ]:
+            response = client.get(f"/api/v1/books/?{params}")
+            assert response.status_code == 200
+            assert response.json()["total"] == total, params
+
+        data = client.get(f"/api/v1/books/?author_ids={author_id}&page=4&limit=6").json()
+        assert data["pages"] == 4
+        assert [book["id"] for book in data["items"]] == ids[18:]
+
+        client.request("DELETE", f"/api/v1/genres/{other_genre_id}")
+        data = client.get(f"/api/v1/books/?{genres}&genre_match=all").json()
+        assert data["total"] == 0
+
+
+    def test_list_books_sorted(self, client, publisher_and_author_and_genre, test_db, monkeypatch):
+        """Test sort orders and that the snapshot replays writes made outside the API"""
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [30.0, 10.0, 20.0])
+
+        def listed(query):
+            return [book["id"] for book in client.get(f"/api/v1/books/?{query}").json()["items"]]
+
+        assert listed("sort=price_asc") == [ids[1], ids[2], ids[0]]
+        assert listed("sort=price_desc") == [ids[0], ids[2], ids[1]]
+        assert listed("sort=title") == ids
+        assert listed("sort=newest") == ids[::-1]
+        assert listed(f"sort=price_desc&genre_ids={genre_id}&limit=1&page=2") == [ids[2]]
+
+        # Another process writing to the same database
+        monkeypatch.setattr(settings, "catalog_snapshot_poll_s", 0.0)
+        test_db.execute(
+            text("UPDATE books SET price = 5.0, published_year = 2020 WHERE id = :id"), {"id": ids[0]}
+        )
+        test_db.commit()
+        assert listed("sort=price_asc") == [ids[0], ids[1], ids[2]]
+        assert listed("sort=newest")[0] == ids[0]
+
+    @pytest.mark.parametrize("snapshot", [True, False])
+    def test_list_books_bestselling_and_cursor(
+        self, client, publisher_and_author_and_genre, monkeypatch, snapshot
+    ):
+        """Test the bestselling order follows orders and cursors walk every sort order"""
+        monkeypatch.setattr(settings, "catalog_snapshot", snapshot)
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [30.0, 10.0, 20.0, 10.0, 40.0])
+
+        def checkout(quantities):
+            return client.post("/api/v1/orders/", json={
+                "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                "postal_code": "00001", "total_price": 10.0,
+                "items": [{"book_id": ids[i], "quantity": quantity} for i, quantity in quantities.items()],
+            })
+
+        assert checkout({2: 3, 4: 1}).status_code == 201
+        order_id = checkout({1: 2}).json()["id"]
+        ranked = [book["id"] for book in client.get("/api/v1/books/?sort=bestselling").json()["items"]]
+        assert ranked == [ids[2], ids[1], ids[4], ids[3], ids[0]]
+
+        client.request("DELETE", "/api/v1/orders/bulk-delete", json={"order_ids": [order_id]})
+        ranked = [book["id"] for book in client.get("/api/v1/books/?sort=bestselling").json()["items"]]
+        assert ranked[:2] == [ids[2], ids[4]]
+
+        for sort in [None, "price_asc", "price_desc", "title", "newest", "bestselling"]:
+            params = {"sort": sort} if sort else {}
+            expected = [book["id"] for book in client.get("/api/v1/books/", params=params).json()["items"]]
+            walked, cursor = [], None
+            while True:
+                page_params = {**params, "limit": 2, "cursor": cursor} if cursor else {**params, "limit": 2}
+                data = client.get("/api/v1/books/", params=page_params).json()
+                walked += [book["id"] for book in data["items"]]
+                cursor = data["next_cursor"]
+                if cursor is None:
+                    break
+            assert walked == expected
+
+        first = client.get("/api/v1/books/?sort=title&limit=2").json()["next_cursor"]
+        assert client.get(f"/api/v1/books/?sort=price_asc&cursor={first}").status_code == 400
+        assert client.get("/api/v1/books/?cursor=garbage").status_code == 400
+        # Forged cursors with values of the wrong type, or a far-off id, are turned away or cheap
+        for sort, after in [
+            ("price_asc", ["abc", 1]), ("title", [3, 1]), ("newest", [None, 1]),
+            ("bestselling", [[1], 1]), (None, [1, 2]), (None, [2 ** 64, 2 ** 64]),
+        ]:
+            params = {"cursor": encode_cursor(sort, *after), **({"sort": sort} if sort else {})}
+            assert client.get("/api/v1/books/", params=params).status_code == 400
+        far = encode_cursor(None, 2 ** 62, 2 ** 62)
+        assert client.get("/api/v1/books/", params={"cursor": far}).json()["items"] == []
+
+    def test_bestsellers(self, client, publisher_and_author_and_genre, test_db):
+        """Test bestseller rankings follow orders and rolling windows age out old sales"""
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0, 30.0])
+
+        def checkout(quantities):
+            return client.post("/api/v1/orders/", json={
+                "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                "postal_code": "00001", "total_price": 10.0,
+                "items": [{"book_id": ids[i], "quantity": quantity} for i, quantity in quantities.items()],
+            }).json()["id"]
+
+        def ranked(query=""):
+            data = client.get(f"/api/v1/books/bestsellers?{query}").json()
+            return [(entry["book"]["id"], entry["units_sold"]) for entry in data]
+
+        checkout({0: 1, 1: 4})
+        order_id = checkout({2: 2})
+        assert ranked() == [(ids[1], 4), (ids[2], 2), (ids[0], 1)]
+        assert ranked(f"genre_id={genre_id}") == [(ids[2], 2), (ids[0], 1)]
+        assert ranked("window=7d&limit=1") == [(ids[1], 4)]
+
+        # Sales from ten days ago leave the 7-day window at the next refresh
+        test_db.execute(
+            text("UPDATE book_sales_daily SET day = date('now', '-10 days') WHERE book_id = :id"), {"id": ids[1]}
+        )
+        sales.refresh_sales_windows(test_db)
+        assert ranked("window=7d") == [(ids[2], 2), (ids[0], 1)]
+        assert ranked("window=30d") == [(ids[1], 4), (ids[2], 2), (ids[0], 1)]
+
+        client.request("DELETE", "/api/v1/orders/bulk-delete", json={"order_ids": [order_id]})
+        assert ranked("window=7d") == [(ids[0], 1)]
+        assert ranked() == [(ids[1], 4), (ids[0], 1)]
+
+    @pytest.mark.parametrize("snapshot", [True, False])
+    def test_get_books_batch(self, client, publisher_and_author_and_genre, test_db, monkeypatch, snapshot):
+        """Test batch lookups keep the requested order, report missing ids and follow writes"""
+        monkeypatch.setattr(settings, "catalog_snapshot", snapshot)
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0, 30.0])
+
+        def batch(book_ids):
+            response = client.get("/api/v1/books/batch", params={"ids": book_ids})
+            assert response.status_code == 200
+            data = response.json()
+            items = [(book["id"], book["stock"], book["publisher"]["name"]) for book in data["items"]]
+            return items, data["missing"]
+
+        assert batch([ids[2], 999, ids[0], ids[2]]) == (
+            [(ids[2], 5, "Penguin Books"), (ids[0], 5, "Penguin Books")], [999],
+        )
+        client.put(f"/api/v1/books/{ids[0]}", json={
+            "title": "Book 0", "price": 10.0, "stock": 0, "isbn": "price-0",
+            "publisher_id": publisher_id, "author_ids": [], "genre_ids": [genre_id],
+        })
+        client.put(f"/api/v1/publishers/{publisher_id}", json={"name": "Vintage"})
+        assert batch([ids[2], ids[0]]) == ([(ids[2], 5, "Vintage"), (ids[0], 0, "Vintage")], [])
+
+        # Writes from other processes arrive through the snapshot's replay of book_changes
+        monkeypatch.setattr(settings, "catalog_snapshot_poll_s", 0.0)
+        test_db.execute(text("UPDATE books SET stock = 7 WHERE id = :id"), {"id": ids[2]})
+        test_db.commit()
+        assert batch([ids[2]]) == ([(ids[2], 7, "Vintage")], [])
+
+        response = client.post("/api/v1/books/batch", json={"ids": [ids[1], ids[0]]})
+        assert response.status_code == 200
+        assert [book["id"] for book in response.json()["items"]] == [ids[1], ids[0]]
+        assert client.get("/api/v1/books/batch", params={"ids": list(range(1, 102))}).status_code == 422
+        assert client.post("/api/v1/books/batch", json={"ids": []}).status_code == 422
+
+    def test_also_bought(self, client, publisher_and_author_and_genre, test_db):
+        """Test co-purchase recommendations follow orders and survive a rebuild"""
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [10.0, 20.0, 30.0, 40.0])
+
+        def checkout(indexes):
+            return client.post("/api/v1/orders/", json={
+                "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                "postal_code": "00001", "total_price": 10.0,
+                "items": [{"book_id": ids[i], "quantity": 1} for i in indexes],
+            }).json()["id"]
+
+        def also_bought(index, query=""):
+            response = client.get(f"/api/v1/books/{ids[index]}/also-bought?{query}")
+            assert response.status_code == 200
+            return [(entry["book"]["id"], entry["orders"]) for entry in response.json()]
+
+        assert also_bought(0) == []
+        checkout([0, 1, 2])
+        order_id = checkout([0, 2])
+        assert also_bought(0) == [(ids[2], 2), (ids[1], 1)]
+        assert also_bought(0, "limit=1") == [(ids[2], 2)]
+
+        client.post("/api/v1/orders/items", json={"order_id": order_id, "book_id": ids[3], "quantity": 1})
+        assert also_bought(3) == [(ids[2], 1), (ids[0], 1)]
+        assert also_bought(0) == [(ids[2], 2), (ids[3], 1), (ids[1], 1)]
+
+        client.request("DELETE", "/api/v1/orders/bulk-delete", json={"order_ids": [order_id]})
+        assert also_bought(0) == [(ids[2], 1), (ids[1], 1)]
+        assert also_bought(3) == []
+
+        assert also_bought_service.rebuild_co_purchases(test_db, batch_orders=1) == 6
+        assert also_bought(0) == [(ids[2], 1), (ids[1], 1)]
+        assert client.get("/api/v1/books/999/also-bought").status_code == 404
+
+    def test_also_bought_miss_racing_invalidation(self, test_db):
+        """Test a top-K read before an invalidation is not cached after it"""
+        index = also_bought_service.AlsoBoughtIndex()
+
+        class RacingSession:
+            def execute(self, statement):
+                index.invalidate({1})
+                return test_db.execute(statement)
+
+        assert index.top(RacingSession(), 1) == ()
+        index.top(test_db, 2)
+        assert list(index._top) == [2]
+
+    def test_list_books_stale_snapshot_falls_back_to_sql(
+        self, client, publisher_and_author_and_genre, test_db, monkeypatch
+    ):
+        """Test listings are served from SQL while the snapshot reloads"""
+        publisher_id, _, genre_id = publisher_and_author_and_genre
+        ids = self._create_priced_books(client, publisher_id, genre_id, [30.0, 10.0, 20.0])
+        assert client.get("/api/v1/books/?sort=price_asc").json()["total"] == 3
+
+        reloads = []
+        monkeypatch.setattr(settings, "catalog_snapshot_poll_s", 0.0)
+        monkeypatch.setattr(catalog_snapshot, "MAX_PENDING_CHANGES", 0)
+        monkeypatch.setattr(catalog_snapshot.CatalogSnapshot, "start_reload", lambda self: reloads.append(self))
+        test_db.execute(text("UPDATE books SET stock = 0 WHERE id = :id"), {"id": ids[1]})
+        test_db.commit()
+
+        data = client.get("/api/v1/books/?sort=price_asc").json()
+        assert reloads
+        assert data["total"] == 2
+        assert [book["id"] for book in data["items"]] == [ids[2], ids[0]]
+
+    def test_snapshot_does_not_keep_engine_alive(self):
+        """Test a snapshot is dropped with the engine it was built for"""
+        import gc
+        import weakref
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+        from src.core.database import Base
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with Session(bind=engine) as db:
+            assert catalog_snapshot.catalog_snapshot(db) is not None
+        engine.dispose()
+        engine_ref = weakref.ref(engine)
+        del engine, db
+        gc.collect()
+        assert engine_ref() is None
+
+
+class TestSearchEndpoints:
+    """Test search endpoints"""
+
+    def test_suggest(self, client):
+        """Test typeahead matches word prefixes, ranks by sales and follows catalog writes"""
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        author_id = client.post("/api/v1/authors/", json={"name": "Gabriel García Márquez"}).json()["id"]
+
+        def create_book(title, stock=5):
+            return client.post("/api/v1/books/", json={
+                "title": title, "price": 10.0, "stock": stock, "isbn": title,
+                "publisher_id": publisher_id, "author_ids": [author_id], "genre_ids": [],
+            }).json()
+
+        def suggest(q, limit=8):
+            response = client.get("/api/v1/search/suggest", params={"q": q, "limit": limit})
+            assert response.status_code == 200
+            return [(entry["type"], entry["text"]) for entry in response.json()]
+
+        solitude = create_book("One Hundred Years of Solitude")
+        cholera = create_book("Love in the Time of Cholera")
+        assert suggest("garc") == [("author", "Gabriel García Márquez")]
+        assert suggest("time lov") == [("book", "Love in the Time of Cholera")]
+        assert suggest("pengu") == [("publisher", "Penguin Books")]
+        assert suggest("xyz") == []
+        assert client.get("/api/v1/search/suggest?q=").status_code == 422
+
+        client.post("/api/v1/orders/", json={
+            "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+            "postal_code": "00001", "total_price": 10.0,
+            "items": [{"book_id": cholera["id"], "quantity": 2}],
+        })
+        assert suggest("o", limit=2) == [
+            ("book", "Love in the Time of Cholera"), ("book", "One Hundred Years of Solitude"),
+        ]
+        assert client.get("/api/v1/search/suggest?q=garcia").json()[0]["popularity"] == 2
+
+        create_book("Of Love and Other Demons")
+        assert suggest("love") == [("book", "Love in the Time of Cholera"), ("book", "Of Love and Other Demons")]
+
+        client.put(f"/api/v1/authors/{author_id}", json={"name": "Gabo"})
+        assert suggest("garc") == []
+        assert suggest("gab") == [("author", "Gabo")]
+
+        client.put(f"/api/v1/books/{solitude['id']}", json={
+            "title": solitude["title"], "price": 10.0, "stock": 0, "isbn": solitude["isbn"],
+            "publisher_id": publisher_id, "author_ids": [author_id], "genre_ids": [],
+        })
+        assert suggest("solit") == []
+
+
+class TestBulkImportEndpoints:
+    """Test bulk book import endpoint"""
+
+    @pytest.fixture
+    def references(self, client):
+        """Create a publisher, an author and a genre to reference from rows"""
+        publisher_id = client.post(
+            "/api/v1/publishers/", json={"name": "Penguin Books"}
+        ).json()["id"]
+        author_id = client.post(
+            "/api/v1/authors/", json={"name": "Terry Pratchett"}
+        ).json()["id"]
+        genre_id = client.post(
+            "/api/v1/genres/", json={"name": "Fantasy"}
+        ).json()["id"]
+        return publisher_id, author_id, genre_id
+
+    def test_bulk_import_ndjson(self, client, references):
+        """Test importing NDJSON rows across several chunks"""
+        publisher_id, author_id, genre_id = references
+        rows = [
+            {
+                "title": f"Discworld {i}",
+                "price": 9.99 + i,
+                "stock": 5,
+                "isbn": f"isbn-{i}",
+                "publisher_id": publisher_id,
+                "author_ids": [author_id],
+                "genre_ids": [genre_id],
+            }
+            for i in range(5)
+        ]
+        body = "\n".join(json.dumps(row) for row in rows) + "\n"
+
+        response = client.post(
+            "/api/v1/books/bulk?chunk_size=2",
+            content=body,
+            headers={"content-type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["inserted"], data["failed"], data["errors"]) == (5, 0, [])
+
+        books = client.get("/api/v1/books/?limit=10").json()
+        assert books["total"] == 5
+        assert data["ids"] == [book["id"] for book in books["items"]]
+        assert books["items"][0]["authors"][0]["id"] == author_id
+        assert books["items"][0]["genres"][0]["id"] == genre_id
+
+    def test_bulk_import_reports_row_errors(self, client, references):
+        """Test that invalid rows are reported while valid rows are inserted"""
+        publisher_id, author_id, _ = references
+        lines = [
+            json.dumps({"title": "Mort", "price": 8.5, "isbn": "dup", "publisher_id": publisher_id}),
+            "{not json",
+            json.dumps({"title": "Eric", "price": -1, "publisher_id": publisher_id}),
+            json.dumps({"title": "Sourcery", "price": 7.0, "publisher_id": 999}),
+            json.dumps({"title": "Pyramids", "price": 7.0, "publisher_id": publisher_id, "author_ids": [999]}),
+            json.dumps({"title": "Mort again", "price": 8.5, "isbn": "dup", "publisher_id": publisher_id}),
+        ]
+
+        response = client.post(
+            "/api/v1/books/bulk",
+            content="\n".join(lines).encode() + b'\n{"title": "M\xf6rt"}',
+            headers={"content-type": "application/x-ndjson"},
+        )
+        data = response.json()
+        assert data["inserted"] == 1
+        assert data["failed"] == 6
+        assert [err["row"] for err in data["errors"]] == [2, 3, 4, 5, 6, 7]
+        assert data["errors"][2]["error"] == "Publisher not found"
+        assert data["errors"][3]["error"] == "One or more authors not found"
+        assert "already exists" in data["errors"][4]["error"]
+        assert data["errors"][5]["error"] == "Invalid UTF-8"
+
+    def test_bulk_import_csv(self, client, references):
+        """Test importing CSV rows with `;`-separated ids and quoted newlines"""
+        publisher_id, author_id, genre_id = references
+        body = (
+            "title,description,price,stock,isbn,publisher_id,author_ids,genre_ids\n"
+            f'Guards! Guards!,"City watch,\nin Ankh-Morpork",10.5,3,,{publisher_id},{author_id},{genre_id}\n'
+            f"Men at Arms,,11.0,0,,{publisher_id},,\n"
+        )
+
+        response = client.post(
+            "/api/v1/books/bulk",
+            content=body,
+            headers={"content-type": "text/csv"},
+        )
+        data = response.json()
+        assert (data["inserted"], data["failed"], data["errors"]) == (2, 0, [])
+
+        metadata = client.get("/api/v1/books/metadata").json()
+        titles = {book["title"]: book for book in metadata["books"]["items"]}
+        assert titles["Guards! Guards!"]["description"] == "City watch,\nin Ankh-Morpork"
+        assert titles["Men at Arms"]["authors"] == []
+        assert data["ids"] == [titles["Guards! Guards!"]["id"], titles["Men at Arms"]["id"]]
+
+        # An undecodable row fails alone
+        response = client.post(
+            "/api/v1/books/bulk",
+            content=(
+                b"title,price,publisher_id\n"
+                b"Feet of Cl\xe4y,9.0," + str(publisher_id).encode() + b"\n"
+                b"Jingo,9.0," + str(publisher_id).encode() + b"\n"
+            ),
+            headers={"content-type": "text/csv"},
+        )
+        data = response.json()
+        assert (data["inserted"], data["failed"], len(data["ids"])) == (1, 1, 1)
+        assert data["errors"] == [{"row": 1, "error": "Invalid UTF-8"}]
+
+
+class TestBulkUpsertEndpoints:
+    """Test ISBN-keyed bulk upsert endpoint"""
+
+    @pytest.fixture
+    def existing_book(self, client):
+        """Create a publisher and one book with an ISBN"""
+        publisher_id = client.post(
+            "/api/v1/publishers/", json={"name": "Penguin Books"}
+        ).json()["id"]
+        author_id = client.post(
+            "/api/v1/authors/", json={"name": "Terry Pratchett"}
+        ).json()["id"]
+        book = client.post(
+            "/api/v1/books/",
+            json={
+                "title": "Mort",
+                "price": 10.0,
+                "stock": 5,
+                "isbn": "isbn-mort",
+                "publisher_id": publisher_id,
+                "author_ids": [author_id],
+            }
+        ).json()
+        return publisher_id, book
+
+    def test_upsert_counts(self, client, existing_book):
+        """Test inserted/updated/unchanged counts and partial updates"""
+        publisher_id, book = existing_book
+        lines = [
+            {"isbn": "isbn-mort", "price": 12.5},
+            {"isbn": "isbn-mort", "stock": 5},
+            {"isbn": "isbn-new", "title": "Eric", "price": 8.0, "publisher_id": publisher_id},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines)
+
+        response = client.put(
+            "/api/v1/books/upsert",
+            content=body,
+            headers={"content-type": "application/x-ndjson"},
+        )
+        data = response.json()
+        assert response.status_code == 200
+        assert (data["inserted"], data["updated"], data["unchanged"]) == (1, 1, 0)
+
+        updated = client.get(f"/api/v1/books/{book['id']}").json()
+        assert updated["price"] == 12.5
+        assert updated["stock"] == 5
+        assert updated["title"] == "Mort"
+        assert len(updated["authors"]) == 1
+
+    def test_upsert_skips_unchanged_rows(self, client, existing_book):
+        """Test that rows matching current values are counted as unchanged"""
+        response = client.put(
+            "/api/v1/books/upsert",
+            content="isbn,price,stock\nisbn-mort,10.0,5\n",
+            headers={"content-type": "text/csv"},
+        )
+        data = response.json()
+        assert (data["inserted"], data["updated"], data["unchanged"]) == (0, 0, 1)
+
+    def test_upsert_reports_row_errors(self, client, existing_book):
+        """Test errors for incomplete new rows and unknown publishers"""
+        lines = [
+            {"isbn": "isbn-new", "price": 8.0},
+            {"isbn": "isbn-mort", "publisher_id": 999},
+            {"isbn": "isbn-mort", "price": None},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines)
+
+        data = client.put(
+            "/api/v1/books/upsert",
+            content=body,
+            headers={"content-type": "application/x-ndjson"},
+        ).json()
+        assert data["failed"] == 3
+        assert data["errors"][0]["error"] == "New ISBN requires title, publisher_id"
+        assert data["errors"][1]["error"] == "Publisher not found"
+        assert data["errors"][2]["error"] == "price cannot be null"
+
+
 class TestOrdersEndpoints:
     """Test orders endpoints"""
 
@@ -340,3 +1061,354 @@ class TestOrdersEndpoints:
         data = response.json()
         assert data["customer_name"] == "John Doe"
         assert data["id"] == order_id
+
+    def test_quote_and_quoted_checkout(self, client, monkeypatch):
+        """Test quotes price carts server-side and checkout charges the signed quote"""
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        ids = [
+            client.post("/api/v1/books/", json={
+                "title": f"Book {i}", "price": price, "stock": 2, "isbn": f"quote-{i}",
+                "publisher_id": publisher_id, "author_ids": [], "genre_ids": [],
+            }).json()["id"]
+            for i, price in enumerate([10.0, 25.5])
+        ]
+        customer = {
+            "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street", "postal_code": "00001",
+        }
+
+        def quote(items):
+            response = client.post("/api/v1/orders/quote", json={"items": items})
+            assert response.status_code == 200
+            return response.json()
+
+        short = quote([{"book_id": ids[0], "quantity": 3}, {"book_id": 999, "quantity": 1}])
+        assert [line["status"] for line in short["lines"]] == ["insufficient_stock", "not_found"]
+        assert not short["available"] and short["quote"] is None
+
+        items = [{"book_id": ids[0], "quantity": 1}, {"book_id": ids[1], "quantity": 2}]
+        data = quote(items)
+        assert data["available"]
+        assert (data["subtotal"], data["tax"], data["shipping"], data["total"]) == (61.0, 14.03, 4.99, 80.02)
+        assert [line["line_total"] for line in data["lines"]] == [10.0, 51.0]
+
+        # Quoted prices hold even if the catalog price changes before checkout
+        client.put(f"/api/v1/books/{ids[1]}", json={
+            "title": "Book 1", "price": 99.0, "stock": 2, "isbn": "quote-1",
+            "publisher_id": publisher_id, "author_ids": [], "genre_ids": [],
+        })
+        response = client.post("/api/v1/orders/", json={**customer, "items": items, "quote": data["quote"]})
+        assert response.status_code == 201
+        order = response.json()
+        assert order["total_price"] == 80.02
+        assert sorted(item["price_at_purchase"] for item in order["items"]) == [10.0, 25.5]
+        assert client.get(f"/api/v1/books/{ids[1]}").json()["stock"] == 0
+
+        # Stock taken meanwhile, tampered or mismatched quotes are refused
+        response = client.post("/api/v1/orders/", json={**customer, "items": items, "quote": data["quote"]})
+        assert response.status_code == 400
+        assert "Insufficient stock for 'Book 1'" in response.json()["detail"]
+        assert client.get(f"/api/v1/books/{ids[0]}").json()["stock"] == 1
+        token = quote([{"book_id": ids[0], "quantity": 1}])["quote"]
+        for items, token in [
+            ([{"book_id": ids[0], "quantity": 1}], token[:-2] + "xx"),
+            ([{"book_id": ids[0], "quantity": 2}], token),
+        ]:
+            response = client.post("/api/v1/orders/", json={**customer, "items": items, "quote": token})
+            assert response.status_code in (400, 422)
+        monkeypatch.setattr(settings, "quote_ttl_s", -1)
+        expired = quote([{"book_id": ids[0], "quantity": 1}])["quote"]
+        response = client.post(
+            "/api/v1/orders/", json={**customer, "items": [{"book_id": ids[0], "quantity": 1}], "quote": expired}
+        )
+        assert response.status_code == 400
+        assert "expired" in response.json()["detail"]
+
+        # Without a quote the client's total is ignored and current prices are charged
+        response = client.post("/api/v1/orders/", json={
+            **customer, "items": [{"book_id": ids[0], "quantity": 1}], "total_price": 0.01,
+        })
+        assert response.json()["total_price"] == 17.29
+
+    def test_group_commit_checkout(self, client, test_db, monkeypatch):
+        """Test checkouts queued to the group commit writer succeed or fail one by one"""
+        monkeypatch.setattr(settings, "checkout_group_commit", True)
+        monkeypatch.setattr(settings, "checkout_batch_wait_ms", 50.0)
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        book_id = client.post("/api/v1/books/", json={
+            "title": "Scarce", "price": 10.0, "stock": 3, "isbn": "scarce",
+            "publisher_id": publisher_id, "author_ids": [], "genre_ids": [],
+        }).json()["id"]
+
+        def checkout(book):
+            return {
+                "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                "postal_code": "00001", "total_price": 10.0, "items": [{"book_id": book, "quantity": 1}],
+            }
+
+        async def place_all():
+            transport = httpx.ASGITransport(app=client.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                responses = await asyncio.gather(
+                    *(http.post("/api/v1/orders/", json=checkout(book)) for book in [book_id] * 5 + [999])
+                )
+                writer = orders_endpoints._checkout_writers[test_db.get_bind()]
+                await writer.close()
+            return responses, writer
+
+        responses, writer = asyncio.run(place_all())
+        # Queued in whatever order the requests got scheduled
+        assert sorted(response.status_code for response in responses) == [201, 201, 201, 400, 400, 404]
+        assert (writer.batches, writer.requests) == (1, 6)
+        assert len({response.json()["id"] for response in responses if response.status_code == 201}) == 3
+        assert client.get(f"/api/v1/books/{book_id}").json()["stock"] == 0
+        assert len(client.get("/api/v1/orders/").json()) == 3
+
+    def test_archive_orders(self, client, test_db):
+        """Test old done orders move to the archive and still count everywhere"""
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        book_ids = [
+            client.post("/api/v1/books/", json={
+                "title": f"Kept {i}", "price": 10.0, "stock": 10, "isbn": f"kept-{i}",
+                "publisher_id": publisher_id, "author_ids": [], "genre_ids": [],
+            }).json()["id"]
+            for i in range(2)
+        ]
+        order_ids = [
+            client.post("/api/v1/orders/", json={
+                "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                "postal_code": "00001", "total_price": 20.0,
+                "items": [{"book_id": book_id, "quantity": 1} for book_id in book_ids],
+            }).json()["id"]
+            for _ in range(4)
+        ]
+        client.put("/api/v1/orders/bulk-status", json={"order_ids": order_ids, "status": "done"})
+        test_db.execute(text("UPDATE orders SET created_at = '2020-01-01 00:00:00' WHERE id != :id"), {"id": order_ids[1]})
+        test_db.commit()
+
+        # Recent and newest orders stay hot
+        response = client.post("/api/v1/orders/archive?older_than_days=30")
+        assert response.json() == {"archived": 2}
+        assert [order["id"] for order in client.get("/api/v1/orders/").json()] == order_ids[1::2]
+        assert [order["id"] for order in client.get("/api/v1/orders/?include_archived=true").json()] == order_ids
+        assert client.get(f"/api/v1/orders/{order_ids[0]}").status_code == 404
+        archived = client.get(f"/api/v1/orders/{order_ids[0]}?include_archived=true").json()
+        assert sorted(item["book"]["title"] for item in archived["items"]) == ["Kept 0", "Kept 1"]
+
+        stats = client.get("/api/v1/stats/").json()
+        assert (stats["total_orders"], stats["archived_orders"], stats["total_revenue"]) == (4, 2, 118.36)
+        assert also_bought_service.rebuild_co_purchases(test_db) == 2
+        also_bought = client.get(f"/api/v1/books/{book_ids[0]}/also-bought").json()
+        assert [(entry["orders"], entry["book"]["id"]) for entry in also_bought] == [(4, book_ids[1])]
+        recount_units_sold(test_db.connection())
+        assert test_db.execute(text("SELECT units_sold FROM book_search")).scalars().all() == [4, 4]
+
+
+class TestJobsEndpoints:
+    """Test background jobs for bulk admin actions"""
+
+    @pytest.fixture
+    def orders(self, client, monkeypatch):
+        """Five one-book orders; bulk actions on more than one order run as jobs of 2-order chunks"""
+        monkeypatch.setattr(settings, "job_inline_max_items", 1)
+        monkeypatch.setattr(settings, "job_chunk_size", 2)
+        monkeypatch.setattr(settings, "job_chunk_pause_ms", 0.0)
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        book_id = client.post("/api/v1/books/", json={
+            "title": "Jobbed", "price": 10.0, "stock": 10, "isbn": "jobbed",
+            "publisher_id": publisher_id, "author_ids": [], "genre_ids": [],
+        }).json()["id"]
+        order_ids = [
+            client.post("/api/v1/orders/", json={
+                "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                "postal_code": "00001", "total_price": 10.0, "items": [{"book_id": book_id, "quantity": 1}],
+            }).json()["id"]
+            for _ in range(5)
+        ]
+        return book_id, order_ids
+
+    def _run(self, client, response):
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.headers["location"] == f"/api/v1/jobs/{job_id}"
+        jobs.wait_for_job(job_id, timeout=10)
+        return client.get(f"/api/v1/jobs/{job_id}").json()
+
+    def test_bulk_actions_run_as_jobs(self, client, orders):
+        """Test large bulk actions return 202 and report chunked progress and results"""
+        book_id, order_ids = orders
+        job = self._run(client, client.put(
+            "/api/v1/orders/bulk-status", json={"order_ids": order_ids, "status": "done"}
+        ))
+        assert (job["kind"], job["status"], job["done"], job["total"]) == ("orders.bulk_status", "done", 5, 5)
+        assert job["result"] == {"updated": 5, "status": "done"}
+        assert {order["status"] for order in client.get("/api/v1/orders/").json()} == {"done"}
+
+        job = self._run(client, client.request(
+            "DELETE", "/api/v1/orders/bulk-delete", json={"order_ids": order_ids[:3]}
+        ))
+        assert job["result"] == {"deleted": 3, "returned_items": 3}
+        assert client.get(f"/api/v1/books/{book_id}").json()["stock"] == 8
+
+        # At or under the threshold the action still runs in the request
+        response = client.request("DELETE", "/api/v1/orders/bulk-delete", json={"order_ids": order_ids[3:4]})
+        assert response.json() == {"deleted": 1, "returned_items": 1}
+
+        job = self._run(client, client.request("DELETE", "/api/v1/books/bulk-delete", json={"book_ids": [book_id, 999]}))
+        assert job["result"] == {"deleted": 1}
+        assert client.get(f"/api/v1/books/{book_id}").status_code == 404
+        assert [job["kind"] for job in client.get("/api/v1/jobs/").json()][:2] == [
+            "books.bulk_delete", "orders.bulk_delete",
+        ]
+
+    def test_cancel_job(self, client, orders, monkeypatch):
+        """Test a cancelled job stops between chunks, keeping the chunks it committed"""
+        _, order_ids = orders
+        monkeypatch.setattr(settings, "job_chunk_size", 1)
+        monkeypatch.setattr(settings, "job_chunk_pause_ms", 300.0)
+        response = client.put("/api/v1/orders/bulk-status", json={"order_ids": order_ids, "status": "done"})
+        job_id = response.json()["id"]
+        cancelled = client.post(f"/api/v1/jobs/{job_id}/cancel").json()
+        assert cancelled["cancel_requested"]
+
+        jobs.wait_for_job(job_id, timeout=10)
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        assert job["status"] == "cancelled"
+        assert job["done"] < 5
+        statuses = [order["status"] for order in client.get("/api/v1/orders/").json()]
+        assert statuses.count("done") == job["done"]
+        assert client.get("/api/v1/jobs/999").status_code == 404
+
+
+class TestChangesEndpoints:
+    """Test the change feed"""
+
+    def test_change_feed(self, client):
+        """Test writes are logged in seq order and can be read by type from a seq"""
+        start = client.get("/api/v1/changes/").json()
+        assert start == {"changes": [], "last_seq": 0, "has_more": False}
+
+        author_id = client.post("/api/v1/authors/", json={"name": "Ann"}).json()["id"]
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        book_id = client.post("/api/v1/books/", json={
+            "title": "Logged", "price": 10.0, "stock": 5, "isbn": "logged",
+            "publisher_id": publisher_id, "author_ids": [author_id], "genre_ids": [],
+        }).json()["id"]
+        client.put(f"/api/v1/authors/{author_id}", json={"name": "Anne"})
+        order_id = client.post("/api/v1/orders/", json={
+            "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+            "postal_code": "00001", "total_price": 10.0, "items": [{"book_id": book_id, "quantity": 1}],
+        }).json()["id"]
+
+        data = client.get("/api/v1/changes/?since=0&types=author&types=order").json()
+        assert [(change["type"], change["id"], change["op"]) for change in data["changes"]] == [
+            ("author", author_id, "insert"), ("author", author_id, "update"),
+            ("order", order_id, "insert"), ("order", order_id, "update"),
+        ]
+        assert not data["has_more"]
+        # The cursor moves past changes of other types too
+        everything = client.get("/api/v1/changes/?since=0").json()
+        assert data["last_seq"] == everything["last_seq"] == everything["changes"][-1]["seq"]
+        assert {"type": "book", "id": book_id, "op": "update"} in [
+            {key: change[key] for key in ("type", "id", "op")} for change in everything["changes"]
+        ]
+
+        page = client.get("/api/v1/changes/?since=0&limit=2").json()
+        assert page["has_more"] and page["last_seq"] == page["changes"][-1]["seq"]
+        client.delete(f"/api/v1/authors/{author_id}")
+        latest = client.get(f"/api/v1/changes/?since={data['last_seq']}&types=author").json()
+        assert [(change["id"], change["op"]) for change in latest["changes"]] == [(author_id, "delete")]
+        assert client.get("/api/v1/changes/?since=0&types=customer").status_code == 400
+
+    def test_change_log_compaction(self, client, monkeypatch):
+        """Test compaction keeps the newest record per entity and turns away clients behind the horizon"""
+        monkeypatch.setattr(settings, "change_log_compact_every", 1)
+        monkeypatch.setattr(settings, "change_log_retain", 2)
+        ids = [client.post("/api/v1/genres/", json={"name": f"Genre {i}"}).json()["id"] for i in range(3)]
+        for name in ["Renamed", "Renamed again"]:
+            client.put(f"/api/v1/genres/{ids[2]}", json={"name": name})
+
+        # This read compacts: three inserts and two updates leave the newest two entities' records
+        client.get("/api/v1/changes/?since=0")
+        response = client.get("/api/v1/changes/?since=0")
+        assert response.status_code == 410
+        data = client.get("/api/v1/changes/?since=1").json()
+        assert [(change["id"], change["op"]) for change in data["changes"]] == [(ids[1], "insert"), (ids[2], "update")]
+
+
+class TestEventsEndpoints:
+    """Test the live event stream"""
+
+    @staticmethod
+    def parse(chunk):
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(("retry", ":")))
+        return fields["event"], json.loads(fields["data"])
+
+    def test_order_events(self, client, monkeypatch):
+        """Test order writes reach a subscriber as events, with heartbeats while idle"""
+        monkeypatch.setattr(settings, "sse_heartbeat_s", 0.05)
+        publisher_id = client.post("/api/v1/publishers/", json={"name": "Penguin Books"}).json()["id"]
+        book_id = client.post("/api/v1/books/", json={
+            "title": "Live", "price": 10.0, "stock": 5, "isbn": "live",
+            "publisher_id": publisher_id, "author_ids": [], "genre_ids": [],
+        }).json()["id"]
+        disconnected = False
+
+        async def is_disconnected():
+            return disconnected
+
+        async def follow():
+            nonlocal disconnected
+            stream = live_events.event_stream(is_disconnected)
+            assert self.parse(await anext(stream)) == ("ready", {})
+            transport = httpx.ASGITransport(app=client.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                order_id = (await http.post("/api/v1/orders/", json={
+                    "customer_name": "Reader", "email": "reader@example.com", "address": "1 Street",
+                    "postal_code": "00001", "total_price": 20.0, "items": [{"book_id": book_id, "quantity": 2}],
+                })).json()["id"]
+                await http.put("/api/v1/orders/bulk-status", json={"order_ids": [order_id], "status": "done"})
+                await http.request("DELETE", "/api/v1/orders/bulk-delete", json={"order_ids": [order_id]})
+            events = [self.parse(await anext(stream)) for _ in range(5)]
+            heartbeat = await anext(stream)
+            disconnected = True
+            rest = [chunk async for chunk in stream]
+            return order_id, events, heartbeat, rest
+
+        order_id, events, heartbeat, rest = asyncio.run(follow())
+        created_type, created = events[0]
+        assert (created_type, created["id"], created["total_price"], created["items"]) == ("order_created", order_id, 29.59, 1)
+        assert events[1:] == [
+            ("stats_delta", {"total_orders": 1, "total_revenue": 29.59}),
+            ("order_status", {"ids": [order_id], "status": "done"}),
+            ("orders_deleted", {"ids": [order_id]}),
+            ("stats_delta", {"total_orders": -1, "total_revenue": -29.59}),
+        ]
+        assert heartbeat == ": heartbeat\n\n"
+        assert rest == []
+        assert live_events.broker.subscribers == 0
+
+    def test_slow_consumer_resyncs(self, monkeypatch):
+        """Test a subscriber that falls behind gets a resync in place of its backlog"""
+        monkeypatch.setattr(settings, "sse_queue_size", 3)
+
+        async def is_disconnected():
+            return False
+
+        async def lag():
+            stream = live_events.event_stream(is_disconnected)
+            await anext(stream)
+            for i in range(5):
+                live_events.publish("order_status", {"ids": [i], "status": "done"})
+            await asyncio.sleep(0)
+            live_events.publish("order_status", {"ids": [5], "status": "done"})
+            await asyncio.sleep(0)
+            events = [self.parse(await anext(stream)) for _ in range(3)]
+            await stream.aclose()
+            return events
+
+        assert asyncio.run(lag()) == [
+            ("resync", {"dropped": 3}),
+            ("order_status", {"ids": [4], "status": "done"}),
+            ("order_status", {"ids": [5], "status": "done"}),
+        ]
+        assert live_events.broker.subscribers == 0
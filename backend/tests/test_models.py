@@ -250,3 +250,80 @@ class TestOrder:
         # Check that order items are deleted
         remaining_items = test_db.query(OrderItem).all()
         assert len(remaining_items) == 0
+
+
+class TestDatabasePool:
+    """Test the configurable connection pool"""
+
+    def test_queue_pool_stats(self, tmp_path, monkeypatch):
+        """Test pool settings apply and exhaustion shows in the pool stats and metrics"""
+        from sqlalchemy import exc
+        from src.core.config import settings
+        from src.core.database import create_db_engine, pool_stats
+        from src.core.metrics import metrics
+
+        monkeypatch.setattr(settings, "db_pool_size", 2)
+        monkeypatch.setattr(settings, "db_max_overflow", 1)
+        monkeypatch.setattr(settings, "db_pool_timeout_s", 0.05)
+        metrics.reset()
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+
+        connections = [engine.connect() for _ in range(3)]
+        assert pool_stats(engine.pool) == {
+            "pool": "TimedQueuePool", "size": 2, "checked_out": 3, "checked_in": 0,
+            "overflow": 1, "max_overflow": 1, "waiting": 0,
+        }
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        assert metrics.pool_timeouts == 1
+        assert metrics.pool_wait.count == 4
+        for connection in connections:
+            connection.close()
+        assert pool_stats(engine.pool)["checked_in"] == 2
+        engine.dispose()
+
+    def test_static_pool(self, monkeypatch):
+        """Test an in-memory database shared through a static pool"""
+        from sqlalchemy import text
+        from src.core.config import settings
+        from src.core.database import create_db_engine, pool_stats
+
+        monkeypatch.setattr(settings, "db_pool_class", "static")
+        engine = create_db_engine("sqlite://")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        assert pool_stats(engine.pool) == {"pool": "StaticPool"}
+        engine.dispose()
+
+
+class TestIndexes:
+    """Test managed indexes and the index advisor"""
+
+    def test_ensure_indexes_creates_missing_index(self, test_db):
+        """Test indexes added to a model reach an existing database"""
+        from sqlalchemy import inspect, text
+        from src.core.database import ensure_indexes
+
+        bind = test_db.get_bind()
+        test_db.execute(text("DROP INDEX ix_book_genre_genre_id"))
+        test_db.commit()
+
+        ensure_indexes(bind)
+
+        names = {index["name"] for index in inspect(bind).get_indexes("book_genre")}
+        assert "ix_book_genre_genre_id" in names
+
+    def test_index_advisor_finds_no_scans(self):
+        """Test the advisor explains every endpoint and no query scans or sorts"""
+        from src.core.index_advisor import Finding, analyze
+
+        findings = analyze()
+
+        routes = {finding.route for finding in findings}
+        assert "/api/v1/books/" in routes
+        assert "/api/v1/orders/" in routes
+        assert [finding.shape for finding in findings if finding.flagged] == []
+        assert Finding("r", "SELECT x FROM t WHERE y = ?", full_scans=["SCAN t"]).flagged
+        assert not Finding("r", "SELECT x FROM t", full_scans=["SCAN t"]).flagged
@@ -0,0 +1,97 @@
+import { useRef } from 'react';
+import { fetchWithAuth } from './auth';
+
+export type ChangeType = 'book' | 'author' | 'genre' | 'publisher' | 'order';
+
+export interface Change {
+  seq: number;
+  type: ChangeType;
+  id: number;
+  op: 'insert' | 'update' | 'delete';
+}
+
+interface ChangeFeed {
+  changes: Change[];
+  last_seq: number;
+  has_more: boolean;
+}
+
+export interface ListDelta<T> {
+  removed: Set<number>;
+  upserted: Map<number, T>;
+}
+
+const fetchFeed = async (query: string): Promise<ChangeFeed | null> => {
+  const response = await fetchWithAuth(`/api/v1/changes/?${query}`);
+  // The log was compacted past our seq; only a full reload is safe
+  if (response.status === 410) return null;
+  if (!response.ok) throw new Error('Failed to fetch changes');
+  return response.json();
+};
+
+// Follows GET /changes for some entity types. Call `mark` right before loading a full list,
+// then `pull` after mutations for what changed since; null means reload the list
+export const useChangeFeed = (types: ChangeType[]) => {
+  const since = useRef<number | null>(null);
+
+  const mark = async () => {
+    const feed = await fetchFeed('');
+    since.current = feed ? feed.last_seq : null;
+  };
+
+  const pull = async (): Promise<Change[] | null> => {
+    if (since.current === null) return null;
+    const changes: Change[] = [];
+    let feed: ChangeFeed | null;
+    do {
+      const params = new URLSearchParams({ since: String(since.current) });
+      types.forEach(type => params.append('types', type));
+      feed = await fetchFeed(params.toString());
+      if (!feed) return null;
+      changes.push(...feed.changes);
+      since.current = feed.last_seq;
+    } while (feed.has_more);
+    return changes;
+  };
+
+  return { mark, pull };
+};
+
+// Fetches the current state of every changed entity; ones gone meanwhile count as removed
+export const loadDelta = async <T extends { id: number }>(
+  changes: Change[],
+  itemUrl: (id: number) => string,
+): Promise<ListDelta<T>> => {
+  const removed = new Set<number>();
+  const upserted = new Map<number, T>();
+  const latest = new Map<number, Change>();
+  changes.forEach(change => latest.set(change.id, change));
+  await Promise.all(Array.from(latest.values()).map(async change => {
+    if (change.op === 'delete') {
+      removed.add(change.id);
+      return;
+    }
+    const response = await fetchWithAuth(itemUrl(change.id));
+    if (response.status === 404) {
+      removed.add(change.id);
+    } else if (response.ok) {
+      upserted.set(change.id, await response.json());
+    }
+  }));
+  return { removed, upserted };
+};
+
+// Applies a delta to a list: updated items in place, new ones appended
+export const applyDelta = <T extends { id: number }>(items: T[], delta: ListDelta<T>): T[] => {
+  const seen = new Set<number>();
+  const next = items
+    .filter(item => !delta.removed.has(item.id))
+    .map(item => {
+      seen.add(item.id);
+      return delta.upserted.get(item.id) ?? item;
+    });
+  delta.upserted.forEach((item, id) => {
+    if (!seen.has(id)) next.push(item);
+  });
+  return next;
+};
@@ -0,0 +1,77 @@
+import { useEffect, useRef } from 'react';
+import { fetchWithAuth } from './auth';
+
+export type LiveEventType =
+  | 'order_created'
+  | 'order_updated'
+  | 'order_status'
+  | 'orders_deleted'
+  | 'orders_archived'
+  | 'stats_delta'
+  | 'resync';
+
+export interface StatsDelta {
+  total_orders: number;
+  total_revenue: number;
+}
+
+type LiveEventHandler = (type: LiveEventType, data: any) => void;
+
+// Reads GET /events/stream and hands each event to `onEvent`. EventSource cannot send the
+// auth header, so the stream is read with fetch and reopened after the server's retry delay.
+// Events may have been missed while disconnected, so a reconnect is reported as a resync,
+// same as when the server dropped events this client was too slow to take
+export const useLiveEvents = (onEvent: LiveEventHandler) => {
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+
+  useEffect(() => {
+    const abort = new AbortController();
+    let retryMs = 3000;
+    let connected = false;
+
+    const dispatch = (block: string) => {
+      let type = 'message';
+      const data: string[] = [];
+      block.split('\n').forEach(line => {
+        if (line.startsWith('retry: ')) retryMs = Number(line.slice(7)) || retryMs;
+        else if (line.startsWith('event: ')) type = line.slice(7);
+        else if (line.startsWith('data: ')) data.push(line.slice(6));
+      });
+      if (data.length === 0) return; // Heartbeat
+      if (type === 'ready') {
+        if (connected) handler.current('resync', {});
+        connected = true;
+        return;
+      }
+      handler.current(type as LiveEventType, JSON.parse(data.join('\n')));
+    };
+
+    const follow = async () => {
+      while (!abort.signal.aborted) {
+        try {
+          const response = await fetchWithAuth('/api/v1/events/stream', { signal: abort.signal });
+          if (!response.ok || !response.body) throw new Error('Failed to open event stream');
+          const reader = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = '';
+          for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const blocks = buffer.split('\n\n');
+            buffer = blocks.pop() ?? '';
+            blocks.forEach(dispatch);
+          }
+        } catch {
+          // Reconnect below unless unmounted
+        }
+        if (abort.signal.aborted) return;
+        await new Promise(resolve => setTimeout(resolve, retryMs));
+      }
+    };
+
+    follow();
+    return () => abort.abort();
+  }, []);
+};
@@ -0,0 +1,28 @@
+import { fetchWithAuth } from './auth';
+
+export interface Job {
+  id: number;
+  kind: string;
+  status: 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+  total: number;
+  done: number;
+  result: Record<string, unknown> | null;
+  error: string | null;
+}
+
+// Bulk actions on many items answer 202 with a background job; poll it until it finishes
+export const waitForJob = async (response: Response, intervalMs = 1000): Promise<Job | null> => {
+  if (response.status !== 202) return null;
+
+  let job: Job = await response.json();
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+    const poll = await fetchWithAuth(`/api/v1/jobs/${job.id}`);
+    if (!poll.ok) throw new Error('Failed to check job status');
+    job = await poll.json();
+  }
+  if (job.status !== 'done') {
+    throw new Error(job.error || `Job ${job.status} after ${job.done} of ${job.total} items`);
+  }
+  return job;
+};
@@ -1,4 +1,5 @@
 import { fetchWithAuth } from '../api/auth';
+import { StatsDelta, useLiveEvents } from '../api/events';
 import React, { useState, useEffect } from 'react';
 
 export const AdminDashboard: React.FC = () => {
@@ -14,6 +15,17 @@ export const AdminDashboard: React.FC = () => {
     fetchStats();
   }, []);
 
+  // Order totals follow the live stream; anything missed is reloaded on resync
+  useLiveEvents((type, data) => {
+    if (type === 'stats_delta') {
+      const delta = data as StatsDelta;
+      setTotalOrders(current => current + delta.total_orders);
+      setTotalRevenue(current => current + delta.total_revenue);
+    } else if (type === 'resync' || type === 'orders_archived') {
+      fetchStats();
+    }
+  });
+
   const fetchStats = async () => {
     try {
       const response = await fetchWithAuth('/api/v1/stats/');
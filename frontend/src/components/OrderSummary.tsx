@@ -1,30 +1,76 @@
 import { fetchWithAuth } from '../api/auth';
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useCart } from '../context/CartContext';
 import CustomerInfo, { CustomerData } from './CustomerInfo';
 import PaymentConfirmation from './PaymentConfirmation';
 import SuccessScreen from './SuccessScreen';
 import FailureScreen from './FailureScreen';
 
+interface CartQuote {
+  lines: { book_id: number; status: 'ok' | 'insufficient_stock' | 'not_found'; stock: number }[];
+  subtotal: number;
+  tax: number;
+  shipping: number;
+  total: number;
+  available: boolean;
+  quote: string | null;
+}
+
 interface OrderSummaryProps {
   isOpen: boolean;
   onClose: () => void;
 }
 
 const OrderSummary: React.FC<OrderSummaryProps> = ({ isOpen, onClose }) => {
-  const { items, total, updateQuantity, clearCart } = useCart();
+  const { items, total, updateQuantity, clearCart, refreshItems } = useCart();
   const [currentStep, setCurrentStep] = useState<'summary' | 'customer' | 'payment' | 'success' | 'failure'>('summary');
   const [customerData, setCustomerData] = useState<CustomerData | null>(null);
   const [orderId, setOrderId] = useState<string | null>(null);
   const [errorMessage, setErrorMessage] = useState<string>('');
+  const [quote, setQuote] = useState<CartQuote | null>(null);
+
+  // Show current prices and stock before checkout
+  useEffect(() => {
+    if (isOpen) refreshItems();
+  }, [isOpen]);
+
+  // Server-side totals and stock check; the signed quote is charged at checkout
+  useEffect(() => {
+    if (!isOpen || items.length === 0) {
+      setQuote(null);
+      return;
+    }
+    let cancelled = false;
+    fetchWithAuth('/api/v1/orders/quote', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        items: items.map(item => ({ book_id: item.book.id, quantity: item.quantity }))
+      })
+    })
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => {
+        if (!cancelled) setQuote(data);
+      })
+      .catch(() => {
+        if (!cancelled) setQuote(null);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [isOpen, items]);
 
   if (!isOpen) return null;
 
+  // Local estimate until the quote arrives
   const TAX_RATE = 0.23; // 23% VAT for Poland
-  const subtotal = total;
-  const tax = subtotal * TAX_RATE;
-  const shipping = 4.99; // Fixed shipping cost in PLN
-  const finalTotal = Math.floor((subtotal + tax + shipping) * 100) / 100;
+  const subtotal = quote ? quote.subtotal : total;
+  const tax = quote ? quote.tax : subtotal * TAX_RATE;
+  const shipping = quote ? quote.shipping : 4.99; // Fixed shipping cost in PLN
+  const finalTotal = quote ? quote.total : Math.floor((subtotal + tax + shipping) * 100) / 100;
+  const unavailable = quote ? quote.lines.filter(line => line.status !== 'ok') : [];
 
   const handleCheckout = () => {
     setCurrentStep('customer');
@@ -54,6 +100,7 @@ const OrderSummary: React.FC<OrderSummaryProps> = ({ isOpen, onClose }) => {
         address: customerData.address,
         postal_code: customerData.postal_code,
         total_price: finalTotal,
+        quote: quote?.quote ?? undefined,
         items: items.map(item => ({
           book_id: item.book.id,
           quantity: item.quantity
@@ -229,6 +276,18 @@ const OrderSummary: React.FC<OrderSummaryProps> = ({ isOpen, onClose }) => {
                   </div>
                 </div>
 
+                {unavailable.length > 0 && (
+                  <p className="mb-4 text-sm text-red-400">
+                    Some items are no longer available in the requested quantity:{' '}
+                    {unavailable
+                      .map(line => {
+                        const item = items.find(cartItem => cartItem.book.id === line.book_id);
+                        return `${item?.book.title ?? line.book_id} (${line.stock} left)`;
+                      })
+                      .join(', ')}
+                  </p>
+                )}
+
                 {/* Action buttons */}
                 <div className="flex gap-4 pt-6 border-t border-gray-800">
                   <button
@@ -239,7 +298,8 @@ const OrderSummary: React.FC<OrderSummaryProps> = ({ isOpen, onClose }) => {
                   </button>
                   <button
                     onClick={handleCheckout}
-                    className="flex-1 px-5 py-2.5 rounded-lg bg-white text-black hover:bg-black hover:text-white font-semibold transition-colors cursor-pointer"
+                    disabled={unavailable.length > 0}
+                    className="flex-1 px-5 py-2.5 rounded-lg bg-white text-black hover:bg-black hover:text-white font-semibold transition-colors cursor-pointer disabled:opacity-50 disabled:cursor-not-allowed"
                   >
                     Proceed to Checkout
                   </button>
@@ -1,6 +1,7 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { Book } from '../types/book';
 import { useAuth } from './AuthContext';
+import { fetchWithAuth } from '../api/auth';
 
 export interface CartItem {
   book: Book;
@@ -13,6 +14,7 @@ interface CartContextType {
   removeItem: (bookId: number) => void;
   updateQuantity: (bookId: number, quantity: number) => void;
   clearCart: () => void;
+  refreshItems: () => Promise<void>;
   total: number;
   itemCount: number;
   isAdmin: boolean;
@@ -24,12 +26,38 @@ export const CartProvider: React.FC<{ children: React.ReactNode }> = ({ children
   const [items, setItems] = useState<CartItem[]>([]);
   const { isAuthenticated } = useAuth();
 
+  // Replace saved books with their current price and stock in one request; drop deleted books
+  const refreshItems = async (cartItems: CartItem[] = items) => {
+    if (cartItems.length === 0) return;
+    try {
+      const response = await fetchWithAuth('/api/v1/books/batch', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ ids: cartItems.map((item) => item.book.id) }),
+      });
+      if (!response.ok) return;
+      const data: { items: Book[]; missing: number[] } = await response.json();
+      const books = new Map(data.items.map((book) => [book.id, book]));
+      setItems((prevItems) =>
+        prevItems
+          .filter((item) => !data.missing.includes(item.book.id))
+          .map((item) => ({ ...item, book: books.get(item.book.id) ?? item.book }))
+      );
+    } catch (error) {
+      console.error('Error refreshing cart:', error);
+    }
+  };
+
   // Load from localStorage on mount
   useEffect(() => {
     const savedCart = localStorage.getItem('cart');
     if (savedCart) {
       try {
-        setItems(JSON.parse(savedCart));
+        const savedItems: CartItem[] = JSON.parse(savedCart);
+        setItems(savedItems);
+        refreshItems(savedItems);
       } catch (error) {
         console.error('Error loading cart from localStorage:', error);
       }
@@ -93,6 +121,7 @@ export const CartProvider: React.FC<{ children: React.ReactNode }> = ({ children
         removeItem,
         updateQuantity,
         clearCart,
+        refreshItems: () => refreshItems(),
         total,
         itemCount,
         isAdmin: isAuthenticated,
@@ -1,4 +1,5 @@
 import { fetchWithAuth } from '../api/auth';
+import { applyDelta, loadDelta, useChangeFeed } from '../api/changes';
 import React, { useState, useEffect } from 'react';
 
 interface Author {
@@ -25,12 +26,15 @@ export const Authors: React.FC = () => {
     bio: '',
   });
 
+  const changeFeed = useChangeFeed(['author']);
+
   useEffect(() => {
     fetchAuthors();
   }, []);
 
   const fetchAuthors = async () => {
     try {
+      await changeFeed.mark();
       const response = await fetchWithAuth('/api/v1/authors/');
       if (!response.ok) throw new Error('Failed to fetch authors');
       const data = await response.json();
@@ -43,6 +47,14 @@ export const Authors: React.FC = () => {
     }
   };
 
+  // Applies what changed since the last load or sync instead of refetching everything
+  const syncAuthors = async () => {
+    const changes = await changeFeed.pull();
+    if (changes === null) return fetchAuthors();
+    const delta = await loadDelta<Author>(changes, id => `/api/v1/authors/${id}`);
+    setAuthors(current => applyDelta(current, delta));
+  };
+
   const toggleSelection = (id: number) => {
     const newSelected = new Set(selectedIds);
     if (newSelected.has(id)) {
@@ -99,7 +111,7 @@ export const Authors: React.FC = () => {
         bio: '',
       });
       setShowAddForm(false);
-      await fetchAuthors();
+      await syncAuthors();
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to add author';
       setError(errorMessage);
@@ -142,7 +154,7 @@ export const Authors: React.FC = () => {
       });
       setShowEditForm(false);
       setEditingAuthorId(null);
-      await fetchAuthors();
+      await syncAuthors();
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to update author';
       setError(errorMessage);
@@ -172,7 +184,7 @@ export const Authors: React.FC = () => {
       setError('');
       setSelectedIds(new Set());
       setShowDeleteConfirm(false);
-      await fetchAuthors();
+      await syncAuthors();
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to delete authors');
       setShowDeleteConfirm(false);
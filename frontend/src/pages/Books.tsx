@@ -1,4 +1,6 @@
 import { fetchWithAuth } from '../api/auth';
+import { waitForJob } from '../api/jobs';
+import { applyDelta, loadDelta, useChangeFeed } from '../api/changes';
 import React, { useState, useEffect } from 'react';
 
 interface Author {
@@ -58,12 +60,15 @@ export const Books: React.FC = () => {
   const [authors, setAuthors] = useState<Author[]>([]);
   const [genres, setGenres] = useState<Genre[]>([]);
 
+  const changeFeed = useChangeFeed(['book']);
+
   useEffect(() => {
     fetchBooksData();
   }, []);
 
   const fetchBooksData = async () => {
     try {
+      await changeFeed.mark();
       const response = await fetchWithAuth('/api/v1/books/metadata?limit=100');
       if (!response.ok) throw new Error('Failed to fetch books data');
       const data = await response.json();
@@ -79,6 +84,14 @@ export const Books: React.FC = () => {
     }
   };
 
+  // Applies what changed since the last load or sync instead of refetching everything
+  const syncBooks = async () => {
+    const changes = await changeFeed.pull();
+    if (changes === null) return fetchBooksData();
+    const delta = await loadDelta<Book>(changes, id => `/api/v1/books/${id}`);
+    setBooks(current => applyDelta(current, delta));
+  };
+
   const toggleSelection = (id: number) => {
     const newSelected = new Set(selectedIds);
     if (newSelected.has(id)) {
@@ -150,7 +163,7 @@ export const Books: React.FC = () => {
         genre_ids: [],
       });
       setShowAddForm(false);
-      await fetchBooksData();
+      await syncBooks();
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to add book';
       setError(errorMessage);
@@ -215,7 +228,7 @@ export const Books: React.FC = () => {
       });
       setShowEditForm(false);
       setEditingBookId(null);
-      await fetchBooksData();
+      await syncBooks();
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to update book';
       setError(errorMessage);
@@ -243,11 +256,12 @@ export const Books: React.FC = () => {
       });
 
       if (!response.ok) throw new Error('Failed to delete books');
+      await waitForJob(response);
 
       setError('');
       setSelectedIds(new Set());
       setShowDeleteConfirm(false);
-      await fetchBooksData();
+      await syncBooks();
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to delete books');
       setShowDeleteConfirm(false);
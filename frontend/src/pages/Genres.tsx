@@ -1,4 +1,5 @@
 import { fetchWithAuth } from '../api/auth';
+import { applyDelta, loadDelta, useChangeFeed } from '../api/changes';
 import React, { useState, useEffect } from 'react';
 
 interface Genre {
@@ -25,12 +26,15 @@ export const Genres: React.FC = () => {
     description: '',
   });
 
+  const changeFeed = useChangeFeed(['genre']);
+
   useEffect(() => {
     fetchGenres();
   }, []);
 
   const fetchGenres = async () => {
     try {
+      await changeFeed.mark();
       const response = await fetchWithAuth('/api/v1/genres/');
       if (!response.ok) throw new Error('Failed to fetch genres');
       const data = await response.json();
@@ -43,6 +47,14 @@ export const Genres: React.FC = () => {
     }
   };
 
+  // Applies what changed since the last load or sync instead of refetching everything
+  const syncGenres = async () => {
+    const changes = await changeFeed.pull();
+    if (changes === null) return fetchGenres();
+    const delta = await loadDelta<Genre>(changes, id => `/api/v1/genres/${id}`);
+    setGenres(current => applyDelta(current, delta));
+  };
+
   const toggleSelection = (id: number) => {
     const newSelected = new Set(selectedIds);
     if (newSelected.has(id)) {
@@ -99,7 +111,7 @@ export const Genres: React.FC = () => {
         description: '',
       });
       setShowAddForm(false);
-      await fetchGenres();
+      await syncGenres();
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to add genre';
       setError(errorMessage);
@@ -142,7 +154,7 @@ export const Genres: React.FC = () => {
       });
       setShowEditForm(false);
       setEditingGenreId(null);
-      await fetchGenres();
+      await syncGenres();
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to update genre';
       setError(errorMessage);
@@ -172,7 +184,7 @@ export const Genres: React.FC = () => {
       setError('');
       setSelectedIds(new Set());
       setShowDeleteConfirm(false);
-      await fetchGenres();
+      await syncGenres();
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to delete genres');
       setShowDeleteConfirm(false);
@@ -1,4 +1,7 @@
 import { fetchWithAuth } from '../api/auth';
+import { waitForJob } from '../api/jobs';
+import { applyDelta, loadDelta, useChangeFeed } from '../api/changes';
+import { useLiveEvents } from '../api/events';
 import React, { useState, useEffect } from 'react';
 
 interface OrderItem {
@@ -37,12 +40,15 @@ export const Orders: React.FC = () => {
   const [showDeleteConfirm, setShowDeleteConfirm] = useState(false);
   const [deleteCount, setDeleteCount] = useState(0);
 
+  const changeFeed = useChangeFeed(['order']);
+
   useEffect(() => {
     fetchOrders();
   }, []);
 
   const fetchOrders = async () => {
     try {
+      await changeFeed.mark();
       const response = await fetchWithAuth('/api/v1/orders/');
       if (!response.ok) throw new Error('Failed to fetch orders');
       const data = await response.json();
@@ -54,6 +60,20 @@ export const Orders: React.FC = () => {
     }
   };
 
+  // Applies what changed since the last load or sync instead of refetching everything
+  const syncOrders = async () => {
+    const changes = await changeFeed.pull();
+    if (changes === null) return fetchOrders();
+    const delta = await loadDelta<Order>(changes, id => `/api/v1/orders/${id}`);
+    setOrders(current => applyDelta(current, delta));
+  };
+
+  // Orders placed or changed elsewhere show up without a reload
+  useLiveEvents(type => {
+    if (type === 'resync') fetchOrders();
+    else if (type !== 'stats_delta') syncOrders();
+  });
+
   const toggleSelection = (id: number) => {
     const newSelected = new Set(selectedIds);
     if (newSelected.has(id)) {
@@ -101,10 +121,11 @@ export const Orders: React.FC = () => {
       });
 
       if (!response.ok) throw new Error('Failed to update status');
+      await waitForJob(response);
 
       setError('');
       setSelectedIds(new Set());
-      await fetchOrders(); // Refresh the list
+      await syncOrders(); // Refresh the list
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to update status');
     }
@@ -131,11 +152,12 @@ export const Orders: React.FC = () => {
       });
 
       if (!response.ok) throw new Error('Failed to delete orders');
+      await waitForJob(response);
 
       setError('');
       setSelectedIds(new Set());
       setShowDeleteConfirm(false);
-      await fetchOrders(); // Refresh the list
+      await syncOrders(); // Refresh the list
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to delete orders');
       setShowDeleteConfirm(false);
@@ -12,6 +12,15 @@ interface PaginatedResponse {
   page: number;
   limit: number;
   pages: number;
+  next_cursor: string | null;
+  fuzzy: boolean;
+}
+
+interface PriceStats {
+  min: number | null;
+  max: number | null;
+  count: number;
+  buckets: { min: number; max: number; count: number }[];
 }
 
 interface Genre {
@@ -31,12 +40,22 @@ interface Publisher {
 
 const ITEMS_PER_PAGE = 12;
 
+const SORT_OPTIONS = [
+  { value: '', label: 'Default' },
+  { value: 'bestselling', label: 'Bestselling' },
+  { value: 'newest', label: 'Newest' },
+  { value: 'price_asc', label: 'Price: low to high' },
+  { value: 'price_desc', label: 'Price: high to low' },
+  { value: 'title', label: 'Title' },
+];
+
 const Shop: React.FC = () => {
   const [books, setBooks] = useState<Book[]>([]);
   const [genres, setGenres] = useState<Genre[]>([]);
   const [authors, setAuthors] = useState<Author[]>([]);
   const [publishers, setPublishers] = useState<Publisher[]>([]);
   const [totalPages, setTotalPages] = useState(0);
+  const [fuzzyResults, setFuzzyResults] = useState(false);
   const [loading, setLoading] = useState(true);
   const [currentPage, setCurrentPage] = useState(1);
   const [selectedBook, setSelectedBook] = useState<Book | null>(null);
@@ -46,6 +65,8 @@ const Shop: React.FC = () => {
   const [selectedPublishers, setSelectedPublishers] = useState<number[]>([]);
   const [minPrice, setMinPrice] = useState<number | null>(null);
   const [maxPrice, setMaxPrice] = useState<number | null>(null);
+  const [priceStats, setPriceStats] = useState<PriceStats | null>(null);
+  const [sort, setSort] = useState('');
   const [showFilters, setShowFilters] = useState(false);
   const [expandedGenres, setExpandedGenres] = useState(false);
   const [expandedAuthors, setExpandedAuthors] = useState(false);
@@ -97,6 +118,26 @@ const Shop: React.FC = () => {
     return () => window.removeEventListener('searchUpdate', handleSearch);
   }, []);
 
+  // Price bounds for the slider follow every filter except the price itself
+  useEffect(() => {
+    const fetchPriceStats = async () => {
+      try {
+        const params = new URLSearchParams();
+        if (searchQuery) params.append('search', searchQuery);
+        selectedGenres.forEach(id => params.append('genre_ids', id.toString()));
+        selectedAuthors.forEach(id => params.append('author_ids', id.toString()));
+        selectedPublishers.forEach(id => params.append('publisher_ids', id.toString()));
+
+        const response = await fetchWithAuth(`/api/v1/books/price-stats?${params.toString()}`);
+        setPriceStats(await response.json());
+      } catch (error) {
+        console.error('Error fetching price stats:', error);
+      }
+    };
+
+    fetchPriceStats();
+  }, [searchQuery, selectedGenres, selectedAuthors, selectedPublishers]);
+
   useEffect(() => {
     const fetchBooks = async () => {
       setLoading(true);
@@ -113,6 +154,7 @@ const Shop: React.FC = () => {
         selectedPublishers.forEach(id => params.append('publisher_ids', id.toString()));
         if (minPrice !== null) params.append('min_price', minPrice.toString());
         if (maxPrice !== null) params.append('max_price', maxPrice.toString());
+        if (sort) params.append('sort', sort);
 
         const response = await fetchWithAuth(
           `/api/v1/books/?${params.toString()}`
@@ -120,6 +162,7 @@ const Shop: React.FC = () => {
         const data: PaginatedResponse = await response.json();
         setBooks(data.items);
         setTotalPages(data.pages);
+        setFuzzyResults(data.fuzzy);
       } catch (error) {
         console.error('Error fetching books:', error);
       } finally {
@@ -128,7 +171,7 @@ const Shop: React.FC = () => {
     };
 
     fetchBooks();
-  }, [currentPage, searchQuery, selectedGenres, selectedAuthors, selectedPublishers, minPrice, maxPrice]);
+  }, [currentPage, searchQuery, selectedGenres, selectedAuthors, selectedPublishers, minPrice, maxPrice, sort]);
 
   const handlePageChange = (page: number) => {
     setCurrentPage(page);
@@ -307,8 +350,8 @@ const Shop: React.FC = () => {
                         setMaxPrice(max);
                         setCurrentPage(1);
                       }}
-                      minBound={0}
-                      maxBound={1000}
+                      minBound={priceStats?.min != null ? Math.floor(priceStats.min) : 0}
+                      maxBound={priceStats?.max != null ? Math.ceil(priceStats.max) : 1000}
                     />
                   </div>
                 )}
@@ -317,9 +360,34 @@ const Shop: React.FC = () => {
           )}
         </div>
 
+      {/* Sort order */}
+      <div className="mb-6 flex justify-end items-center gap-2">
+        <label htmlFor="sort" className="text-sm text-gray-400">Sort by</label>
+        <select
+          id="sort"
+          value={sort}
+          onChange={(e) => {
+            setSort(e.target.value);
+            setCurrentPage(1);
+          }}
+          className="bg-neutral-900 border border-gray-800 rounded-lg px-3 py-1.5 text-sm text-white cursor-pointer"
+        >
+          {SORT_OPTIONS.map(option => (
+            <option key={option.value} value={option.value}>{option.label}</option>
+          ))}
+        </select>
+      </div>
+
       {/* Loading state */}
       {loading && <LoadingScreen />}
 
+      {/* Typo-tolerant matches notice */}
+      {!loading && fuzzyResults && (
+        <div className="mb-4 text-sm text-gray-400">
+          Few books match &quot;{searchQuery}&quot; exactly; showing similar titles and authors too
+        </div>
+      )}
+
       {/* No books message */}
       {!loading && books.length === 0 && (
         <div className="flex justify-center items-center min-h-[calc(100vh-200px)]">
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""HTTP load generator with shop and admin scenarios.
+
+Start the API locally, e.g.
+
+    cd backend && uvicorn main:app --port 8000
+
+then run
+
+    python scripts/loadtest.py --base-url http://localhost:8000/api/v1 \\
+        --duration 60 --rate browse=20 --rate checkout=2 --report load-report.json
+
+Arrivals are open-loop: each scenario starts new sessions as a Poisson
+process at its configured rate, independent of how fast the server answers,
+so overload shows up as growing latency and errors instead of a slower
+client. Scenarios mirror the flows in seed.py and the frontend pages.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+DEFAULT_RATES = {
+    "browse": 10.0,
+    "filter": 5.0,
+    "search": 5.0,
+    "checkout": 1.0,
+    "admin_dashboard": 0.5,
+    "admin_bulk": 0.2,
+}
+SEARCH_TERMS = ["harry", "the", "fantasy", "king", "dune", "gods", "space", "murder", "crimson", "empire"]
+
+
+@dataclass
+class Catalog:
+    """Ids discovered before the run, plus orders created during it"""
+    book_ids: list[int] = field(default_factory=list)
+    genre_ids: list[int] = field(default_factory=list)
+    author_ids: list[int] = field(default_factory=list)
+    publisher_ids: list[int] = field(default_factory=list)
+    order_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Sample:
+    scenario: str
+    request: str
+    seconds: float
+    status: int
+    error: str | None = None
+
+
+class Recorder:
+    """Collects one sample per HTTP request"""
+
+    def __init__(self):
+        self.samples: list[Sample] = []
+        self.dropped: dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, scenario: str, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.samples.append(Sample(scenario, name, time.perf_counter() - start, 0, type(e).__name__))
+            return None
+        error = None
+        if response.status_code >= 400:
+            error = "database is locked" if "database is locked" in response.text else f"HTTP {response.status_code}"
+        self.samples.append(Sample(scenario, name, time.perf_counter() - start, response.status_code, error))
+        return response
+
+
+async def scenario_browse(client, recorder, catalog, rng):
+    """Shop landing page, a few pages, then a book detail"""
+    response = await recorder.request(client, "browse", "list_books", "GET", "/books/", params={"page": rng.randint(1, 5)})
+    if response is not None and response.status_code == 200:
+        items = response.json()["items"]
+        if items:
+            book_id = rng.choice(items)["id"]
+            await recorder.request(client, "browse", "get_book", "GET", f"/books/{book_id}")
+
+
+async def scenario_filter(client, recorder, catalog, rng):
+    """Sidebar filters on the shop page"""
+    params = {"page": 1}
+    if catalog.genre_ids:
+        params["genre_ids"] = rng.sample(catalog.genre_ids, min(2, len(catalog.genre_ids)))
+    if catalog.author_ids and rng.random() < 0.5:
+        params["author_ids"] = [rng.choice(catalog.author_ids)]
+    if catalog.publisher_ids and rng.random() < 0.3:
+        params["publisher_ids"] = [rng.choice(catalog.publisher_ids)]
+    low = rng.choice([0, 5, 10, 15])
+    params["min_price"] = low
+    params["max_price"] = low + rng.choice([10, 20, 50])
+    await recorder.request(client, "filter", "list_books_filtered", "GET", "/books/", params=params)
+
+
+async def scenario_search(client, recorder, catalog, rng):
+    """Search box: a couple of progressively longer queries"""
+    term = rng.choice(SEARCH_TERMS)
+    for length in (3, len(term)):
+        await recorder.request(client, "search", "list_books_search", "GET", "/books/", params={"search": term[:length]})
+
+
+async def scenario_checkout(client, recorder, catalog, rng):
+    """Add in-stock books to the cart and check out"""
+    response = await recorder.request(client, "checkout", "list_books", "GET", "/books/", params={"page": rng.randint(1, 3)})
+    if response is None or response.status_code != 200:
+        return
+    books = [book for book in response.json()["items"] if book["stock"] > 0]
+    if not books:
+        return
+    cart = rng.sample(books, min(rng.randint(1, 3), len(books)))
+    items = [{"book_id": book["id"], "quantity": 1} for book in cart]
+    order = {
+        "customer_name": "Load Test",
+        "email": "load@example.com",
+        "phone": "+1234567890",
+        "address": "1 Load Street",
+        "postal_code": "00001",
+        "total_price": round(sum(book["price"] for book in cart), 2),
+        "items": items,
+    }
+    response = await recorder.request(client, "checkout", "create_order", "POST", "/orders/", json=order)
+    if response is not None and response.status_code == 201:
+        catalog.order_ids.append(response.json()["id"])
+
+
+async def scenario_admin_dashboard(client, recorder, catalog, rng):
+    """Admin dashboard and list pages"""
+    await recorder.request(client, "admin_dashboard", "stats", "GET", "/stats/")
+    await recorder.request(client, "admin_dashboard", "books_metadata", "GET", "/books/metadata", params={"page": rng.randint(1, 3)})
+    await recorder.request(client, "admin_dashboard", "list_orders", "GET", "/orders/")
+
+
+async def scenario_admin_bulk(client, recorder, catalog, rng):
+    """Mark a batch of recent orders as done"""
+    if not catalog.order_ids:
+        return
+    order_ids = catalog.order_ids[-20:]
+    await recorder.request(
+        client, "admin_bulk", "bulk_status", "PUT", "/orders/bulk-status",
+        json={"order_ids": order_ids, "status": rng.choice(["pending", "done"])},
+    )
+
+
+SCENARIOS = {
+    "browse": scenario_browse,
+    "filter": scenario_filter,
+    "search": scenario_search,
+    "checkout": scenario_checkout,
+    "admin_dashboard": scenario_admin_dashboard,
+    "admin_bulk": scenario_admin_bulk,
+}
+
+
+async def discover_catalog(client: httpx.AsyncClient) -> Catalog:
+    """Fetch the ids scenarios pick from"""
+    catalog = Catalog()
+    for attr, path in (("genre_ids", "/genres/"), ("author_ids", "/authors/"), ("publisher_ids", "/publishers/")):
+        response = await client.get(path)
+        response.raise_for_status()
+        setattr(catalog, attr, [row["id"] for row in response.json()][:500])
+    response = await client.get("/books/", params={"limit": 100})
+    response.raise_for_status()
+    catalog.book_ids = [book["id"] for book in response.json()["items"]]
+    return catalog
+
+
+async def arrivals(name, rate, deadline, client, recorder, catalog, rng, in_flight, tasks):
+    """Start sessions of one scenario as a Poisson process until the deadline"""
+    scenario = SCENARIOS[name]
+    while True:
+        await asyncio.sleep(rng.expovariate(rate))
+        if time.perf_counter() >= deadline:
+            return
+        if in_flight.locked():
+            recorder.dropped[name] = recorder.dropped.get(name, 0) + 1
+            continue
+
+        async def session():
+            async with in_flight:
+                await scenario(client, recorder, catalog, random.Random(rng.random()))
+
+        tasks.append(asyncio.create_task(session()))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict:
+    latencies = [sample.seconds * 1000 for sample in samples]
+    errors = [sample for sample in samples if sample.error]
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "database_locked": sum(1 for sample in errors if sample.error == "database is locked"),
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "max_ms": round(max(latencies), 2) if latencies else None,
+    }
+
+
+def build_report(recorder: Recorder, elapsed: float, args, rates: dict[str, float]) -> dict:
+    by_scenario: dict[str, list[Sample]] = {}
+    by_request: dict[str, list[Sample]] = {}
+    for sample in recorder.samples:
+        by_scenario.setdefault(sample.scenario, []).append(sample)
+        by_request.setdefault(sample.request, []).append(sample)
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "duration_s": args.duration,
+            "rates": rates,
+            "max_in_flight": args.max_in_flight,
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 2),
+        "total": summarize(recorder.samples, elapsed),
+        "scenarios": {name: summarize(samples, elapsed) for name, samples in sorted(by_scenario.items())},
+        "requests": {name: summarize(samples, elapsed) for name, samples in sorted(by_request.items())},
+        "dropped_sessions": recorder.dropped,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n📊 {report['total']['requests']} requests in {report['elapsed_s']}s")
+    print(f"{'request':<22}{'count':>8}{'rps':>9}{'err %':>8}{'locked':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, row in report["requests"].items():
+        print(
+            f"{name:<22}{row['requests']:>8}{row['throughput_rps']:>9.2f}{row['error_rate'] * 100:>8.2f}"
+            f"{row['database_locked']:>8}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+    if report["dropped_sessions"]:
+        print(f"⚠️  Sessions dropped at the in-flight limit: {report['dropped_sessions']}")
+
+
+def parse_rates(values: list[str]) -> dict[str, float]:
+    rates = dict(DEFAULT_RATES)
+    for value in values:
+        name, _, rate = value.partition("=")
+        if name not in SCENARIOS or not rate:
+            raise SystemExit(f"Invalid --rate {value!r}; scenarios: {', '.join(SCENARIOS)}")
+        rates[name] = float(rate)
+    return {name: rate for name, rate in rates.items() if rate > 0}
+
+
+async def run(args) -> dict:
+    rates = parse_rates(args.rate)
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        catalog = await discover_catalog(client)
+        print(f"🚀 Running {', '.join(f'{n}@{r}/s' for n, r in rates.items())} for {args.duration}s")
+        in_flight = asyncio.Semaphore(args.max_in_flight)
+        tasks: list[asyncio.Task] = []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            arrivals(name, rate, deadline, client, recorder, catalog, random.Random(rng.random()), in_flight, tasks)
+            for name, rate in rates.items()
+        ))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return build_report(recorder, elapsed, args, rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate arrivals")
+    parser.add_argument("--rate", action="append", default=[], metavar="SCENARIO=PER_SECOND",
+                        help=f"arrival rate override; scenarios: {', '.join(SCENARIOS)}")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="concurrent sessions before arrivals are dropped")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", help="write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
-"""Seed script to populate database with test data"""
-import requests
+"""Seed script to populate database with test data
+
+By default the script seeds a small demo catalog through the HTTP API.
+With --direct it writes a synthetic catalog of any size straight into the
+database with SQLAlchemy Core bulk inserts, e.g.
+
+    python scripts/seed.py --direct --books 1000000 --orders 1000000
+
+Direct mode imports the backend package, so run it where the backend
+dependencies are installed and the database file is reachable.
+"""
+import argparse
+import json
 import time
 import sys
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:  # Only needed for HTTP mode
+    requests = None
 
 BASE_URL = "http://backend:8000/api/v1"
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
 MAX_RETRIES = 30
 RETRY_DELAY = 1
 
@@ -334,16 +352,28 @@ def seed_books(authors, genres, publishers):
         },
     ]
 
-    books = []
-    for book_data in books_data:
-        response = requests.post(f"{BASE_URL}/books", json=book_data)
-        if response.status_code == 201:
-            books.append(response.json())
-            print(f"  ✅ {book_data['title']}")
-        else:
-            print(f"  ❌ Failed to create {book_data['title']}: {response.text}")
+    # Send all books in one streamed NDJSON request
+    body = "\n".join(json.dumps(book_data) for book_data in books_data)
+    response = requests.post(
+        f"{BASE_URL}/books/bulk",
+        data=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    if response.status_code != 200:
+        print(f"  ❌ Bulk import failed: {response.text}")
+        return []
+
+    result = response.json()
+    for error in result["errors"]:
+        title = books_data[error["row"] - 1]["title"]
+        print(f"  ❌ Failed to create {title}: {error['error']}")
+    print(f"  ✅ Imported {result['inserted']} books")
 
-    return books
+    # The books just created, whatever their stock; GET /books/ lists one page of in-stock books
+    if not result["ids"]:
+        return []
+    response = requests.post(f"{BASE_URL}/books/batch", json={"ids": result["ids"]})
+    return response.json().get("items", []) if response.status_code == 200 else []
 
 
 def seed_orders(books):
@@ -396,10 +426,78 @@ def seed_orders(books):
         print(f"  ❌ Failed to create order: {response.text}")
 
 
+def seed_direct(args):
+    """Generate a synthetic catalog directly in the database"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from sqlalchemy import create_engine, func, select
+    from src.core.database import Base, DATABASE_URL
+    from src.models import Book, Order
+    from src.services.catalog_generator import CatalogSize, generate_catalog
+
+    url = args.database_url or DATABASE_URL
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        existing_books = conn.scalar(select(func.count()).select_from(Book))
+        existing_orders = conn.scalar(select(func.count()).select_from(Order))
+    if existing_books or existing_orders:
+        print(f"  ℹ️  Database already has {existing_books} books and {existing_orders} orders, skipping seed")
+        return
+
+    size = CatalogSize(
+        books=args.books,
+        orders=args.orders,
+        authors=args.authors,
+        genres=args.genres,
+        publishers=args.publishers,
+    )
+    print(f"📦 Generating {size} (seed {args.seed}) into {url}")
+    start = time.perf_counter()
+    generate_catalog(
+        engine,
+        size,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        book_skew=args.book_skew,
+        author_skew=args.author_skew,
+    )
+    print(f"  ✅ Done in {time.perf_counter() - start:.1f}s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Populate the bookstore database with test data")
+    parser.add_argument("--direct", action="store_true",
+                        help="write a synthetic catalog through SQLAlchemy instead of the HTTP API")
+    parser.add_argument("--database-url", help="direct mode: database URL (defaults to the backend's)")
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--authors", type=int, default=1_000)
+    parser.add_argument("--genres", type=int, default=40)
+    parser.add_argument("--publishers", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed; the same seed gives the same data")
+    parser.add_argument("--book-skew", type=float, default=3.0,
+                        help="how strongly order lines concentrate on popular books (1 = uniform)")
+    parser.add_argument("--author-skew", type=float, default=2.0,
+                        help="how strongly books concentrate on prolific authors (1 = uniform)")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="rows per executemany batch")
+    return parser.parse_args()
+
+
 def main():
     """Main seed function"""
+    args = parse_args()
     print("🌱 Starting database seed...\n")
 
+    if args.direct:
+        seed_direct(args)
+        print("\n✨ Seed completed!")
+        return
+
+    if requests is None:
+        print("❌ HTTP mode needs the 'requests' package")
+        sys.exit(1)
+
     if not wait_for_api():
         sys.exit(1)
 
@@ -414,5 +512,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-